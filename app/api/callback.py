@@ -1,68 +1,73 @@
 """回调场景执行 API"""
+import json
+from collections import ChainMap
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Query, Request
 
 from app.models.schemas import (
-    CallbackResponse, Scene, SceneSummary, ReloadResponse
+    CallbackResponse, BatchResponse, JobResponse, MatrixResponse, Scene, SceneSummary, ReloadResponse
 )
 from app.services.scene_loader import scene_loader
 from app.services.http_sender import http_sender
+from app.services.batch_runner import batch_runner, latency_stats
+from app.services.matrix import Matrix, MatrixResult, build_matrix
+from app.api.jobs import submit_job
 from app.config import config
 
 router = APIRouter(prefix="/api", tags=["callback"])
 
+# 不作为模板变量的保留查询参数
+RESERVED_PARAMS = frozenset({"env", "dry_run", "async", "delay", "capture_body"})
+BATCH_RESERVED_PARAMS = RESERVED_PARAMS | {"concurrency", "rate", "include_results"}
+
 
 def _merge_variables(
     scene: Scene,
     env: str,
     query_params: dict,
-    body_params: Optional[dict]
-) -> dict:
+    body_params: Optional[dict],
+    reserved_params: frozenset = RESERVED_PARAMS,
+) -> ChainMap:
     """合并变量，优先级: defaults < env < query params < body params
 
+    defaults 与环境变量由 SceneLoader 在加载时预先合并并冻结，这里只把本次
+    请求的参数叠加在其上 (ChainMap 视图，不复制基础层; 写入只落在请求层)。
+
     Args:
         scene: 场景配置
         env: 环境名称
         query_params: URL 查询参数
         body_params: JSON body 参数
+        reserved_params: 不作为变量的保留查询参数
 
     Returns:
-        合并后的变量字典
+        合并后的变量映射
     """
-    variables = {}
-
-    # 1. 场景默认值
-    if scene.defaults:
-        variables.update(scene.defaults)
-
-    # 2. 环境变量
-    env_vars = scene_loader.get_env_variables(env)
-    if env_vars:
-        variables.update(env_vars)
-
-    # 3. URL 查询参数 (排除保留参数)
-    reserved_params = {"env", "dry_run"}
-    for key, value in query_params.items():
-        if key not in reserved_params:
-            variables[key] = value
-
-    # 4. JSON body 参数
+    # URL 查询参数 (排除保留参数) < JSON body 参数
+    overlay = {key: value for key, value in query_params.items() if key not in reserved_params}
     if body_params:
-        variables.update(body_params)
-
-    return variables
+        overlay.update(body_params)
+    return ChainMap(overlay, scene_loader.base_variables(scene, env))
 
 
-@router.post("/callback/{scene_id}", response_model=CallbackResponse)
+@router.post(
+    "/callback/{scene_id}",
+    response_model=CallbackResponse,
+    responses={202: {"model": JobResponse, "description": "异步模式: 已提交后台任务"}},
+)
 async def execute_callback(
     scene_id: str,
     request: Request,
     env: str = Query(default=None, description="目标环境"),
     dry_run: bool = Query(default=False, description="仅预览不发送"),
+    async_mode: bool = Query(default=False, alias="async", description="异步执行，立即返回任务 ID"),
+    delay: float = Query(default=0.0, ge=0, le=86400, description="延迟执行秒数 (隐含异步执行)"),
+    capture_body: Optional[bool] = Query(default=None, description="是否保留响应体，不传时按场景配置"),
 ):
     """执行单个回调场景
 
     变量优先级: 场景 defaults < 环境变量 < URL query params < JSON body
+    异步模式下通过 GET /api/jobs/{job_id} 查询结果。
     """
     # 获取场景
     scene = scene_loader.get_scene(scene_id)
@@ -85,8 +90,206 @@ async def execute_callback(
     query_params = dict(request.query_params)
     variables = _merge_variables(scene, env, query_params, body_params)
 
+    # 异步模式: 交给后台任务队列
+    if async_mode or delay > 0:
+        return await submit_job(
+            "callback",
+            scene.id,
+            lambda: http_sender.send(scene, variables, dry_run, env=env, capture_body=capture_body),
+            delay,
+        )
+
     # 执行回调
-    return await http_sender.send(scene, variables, dry_run)
+    return await http_sender.send(scene, variables, dry_run, env=env, capture_body=capture_body)
+
+
+async def _iter_variable_sets(request: Request):
+    """逐项解析批量变量集合
+
+    支持 JSON 数组，或 Content-Type 为 application/x-ndjson 的逐行 JSON 流。
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith(("application/x-ndjson", "application/jsonl")):
+        buffer = b""
+        line_no = 0
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                line_no += 1
+                if line.strip():
+                    yield _parse_variable_set(line, line_no)
+        if buffer.strip():
+            yield _parse_variable_set(buffer, line_no + 1)
+        return
+
+    try:
+        items = await request.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="请求体必须是 JSON 数组或 NDJSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="请求体必须是 JSON 数组或 NDJSON")
+    for index, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            raise HTTPException(status_code=400, detail=f"第 {index} 项不是 JSON 对象")
+        yield item
+
+
+def _parse_variable_set(line: bytes, line_no: int) -> dict:
+    """解析 NDJSON 中的一行"""
+    try:
+        item = json.loads(line)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"第 {line_no} 行不是合法的 JSON")
+    if not isinstance(item, dict):
+        raise HTTPException(status_code=400, detail=f"第 {line_no} 行不是 JSON 对象")
+    return item
+
+
+@router.post("/callback/{scene_id}/batch", response_model=BatchResponse)
+async def execute_callback_batch(
+    scene_id: str,
+    request: Request,
+    env: str = Query(default=None, description="目标环境"),
+    dry_run: bool = Query(default=False, description="仅预览不发送"),
+    concurrency: int = Query(default=None, ge=1, le=1000, description="最大并发数"),
+    rate: float = Query(default=None, gt=0, description="目标速率 (次/秒)，不传则不限速"),
+    include_results: bool = Query(default=False, description="返回每次执行结果"),
+    capture_body: Optional[bool] = Query(default=None, description="是否保留响应体，不传时按场景配置"),
+):
+    """批量执行同一回调场景
+
+    Body 为变量集合 (JSON 数组或 NDJSON)，每项覆盖在公共变量之上:
+    场景 defaults < 环境变量 < URL query params < 每项变量
+    """
+    scene = scene_loader.get_scene(scene_id)
+    if not scene:
+        raise HTTPException(status_code=404, detail=f"场景不存在: {scene_id}")
+
+    if env is None:
+        env = config.default_env
+    if concurrency is None:
+        concurrency = config.batch_concurrency
+
+    # 公共变量只合并一次，每项变量在发送时覆盖
+    query_params = dict(request.query_params)
+    base_variables = _merge_variables(scene, env, query_params, None, BATCH_RESERVED_PARAMS)
+
+    result = await batch_runner.run(
+        scene,
+        _iter_variable_sets(request),
+        base_variables=base_variables,
+        dry_run=dry_run,
+        env=env,
+        concurrency=concurrency,
+        rate=rate,
+        keep_results=include_results,
+        capture_body=capture_body,
+    )
+
+    return BatchResponse(
+        success=result.total > 0 and result.failed_count == 0,
+        scene_id=scene.id,
+        scene_name=scene.name,
+        total=result.total,
+        success_count=result.success_count,
+        failed_count=result.failed_count,
+        duration_ms=result.duration_ms,
+        rps=result.rps,
+        latency=latency_stats(result.histogram),
+        status_counts=result.status_counts,
+        results=result.results,
+    )
+
+
+async def _parse_matrix_request(request: Request, default: Optional[dict]) -> tuple[Matrix, dict]:
+    """解析矩阵请求 body: {"matrix": {...}, "variables": {...}}，两项均可省略
+
+    body 中的 matrix 替换配置中的矩阵 (不允许数据文件轴)，variables 为公共变量。
+
+    Returns:
+        (矩阵, 公共变量)
+    """
+    body = {}
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = await request.json()
+        except Exception:
+            raise HTTPException(status_code=400, detail="请求体不是合法的 JSON")
+        if not isinstance(body, dict):
+            raise HTTPException(status_code=400, detail="请求体必须是 JSON 对象")
+
+    spec = body.get("matrix")
+    variables = body.get("variables") or {}
+    if not isinstance(variables, dict):
+        raise HTTPException(status_code=400, detail="variables 必须是 JSON 对象")
+    if spec is None:
+        if default is None:
+            raise HTTPException(status_code=400, detail="未配置 matrix，请在请求体中提供")
+        return build_matrix(default), variables
+    try:
+        return build_matrix(spec, allow_files=False), variables
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post(
+    "/callback/{scene_id}/matrix",
+    response_model=MatrixResponse,
+    responses={202: {"model": JobResponse, "description": "异步模式: 已提交后台任务"}},
+)
+async def execute_callback_matrix(
+    scene_id: str,
+    request: Request,
+    env: str = Query(default=None, description="目标环境"),
+    dry_run: bool = Query(default=False, description="仅预览不发送"),
+    concurrency: int = Query(default=None, ge=1, le=1000, description="最大并发数"),
+    rate: float = Query(default=None, gt=0, description="目标速率 (次/秒)，不传则不限速"),
+    include_results: bool = Query(default=False, description="返回每次执行结果"),
+    capture_body: Optional[bool] = Query(default=None, description="是否保留响应体，不传时按场景配置"),
+    async_mode: bool = Query(default=False, alias="async", description="异步执行，立即返回任务 ID"),
+    delay: float = Query(default=0.0, ge=0, le=86400, description="延迟执行秒数 (隐含异步执行)"),
+):
+    """按参数矩阵执行回调场景: 各轴取值的每个组合发送一次
+
+    组合在发送时逐个生成，不预先展开; 结果按轴取值汇总。
+    变量优先级: 场景 defaults < 环境变量 < URL query params < body.variables < 矩阵变量
+    """
+    scene = scene_loader.get_scene(scene_id)
+    if not scene:
+        raise HTTPException(status_code=404, detail=f"场景不存在: {scene_id}")
+
+    if env is None:
+        env = config.default_env
+    if concurrency is None:
+        concurrency = config.batch_concurrency
+
+    matrix, body_params = await _parse_matrix_request(request, scene.matrix)
+    query_params = dict(request.query_params)
+    base_variables = _merge_variables(scene, env, query_params, body_params, BATCH_RESERVED_PARAMS)
+
+    async def run() -> MatrixResponse:
+        result = await batch_runner.run(
+            scene,
+            matrix,
+            base_variables=base_variables,
+            dry_run=dry_run,
+            env=env,
+            concurrency=concurrency,
+            rate=rate,
+            capture_body=capture_body,
+            result=MatrixResult(matrix.axis_names, keep_results=include_results),
+        )
+        return result.to_response(scene.id, scene.name, matrix.size())
+
+    if async_mode or delay > 0:
+        return await submit_job("callback", scene.id, run, delay)
+
+    try:
+        return await run()
+    except (ValueError, OSError) as e:
+        # 数据文件在执行中途读取失败
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/scenes", response_model=list[SceneSummary])
@@ -118,13 +321,13 @@ async def get_scene(scene_id: str):
 async def reload_scenes():
     """重新加载场景配置"""
     try:
-        scene_loader.reload()
-        conf = scene_loader.config
+        changes = await scene_loader.reload_async()
         return ReloadResponse(
             success=True,
             message="配置重载成功",
-            scenes_count=len(conf.scenes) if conf else 0,
-            scenarios_count=len(conf.scenarios) if conf else 0,
+            scenes_count=scene_loader.scenes_count,
+            scenarios_count=scene_loader.scenarios_count,
+            changes=changes,
         )
     except Exception as e:
         return ReloadResponse(
@@ -0,0 +1,100 @@
+"""回调记录查询 API"""
+import asyncio
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.models.schemas import HistoryRecord, HistoryResponse
+from app.services.history import history_store
+
+router = APIRouter(prefix="/api", tags=["history"])
+
+# 导出时每次从分段文件读取的记录数
+EXPORT_CHUNK = 500
+
+
+@router.get("/history", response_model=HistoryResponse)
+async def list_history(
+    scene: Optional[str] = Query(default=None, description="场景 ID"),
+    env: Optional[str] = Query(default=None, description="环境名称"),
+    status: Optional[int] = Query(default=None, description="响应状态码"),
+    success: Optional[bool] = Query(default=None, description="是否成功"),
+    since: Optional[datetime] = Query(default=None, description="起始时间 (ISO 8601 或 Unix 时间戳)"),
+    until: Optional[datetime] = Query(default=None, description="结束时间 (ISO 8601 或 Unix 时间戳)"),
+    limit: int = Query(default=100, ge=1, le=1000, description="返回条数"),
+    offset: int = Query(default=0, ge=0, description="跳过条数"),
+):
+    """查询已发送的回调 (最近的在前)
+
+    过滤在内存索引上完成，只从分段文件读取返回的记录。
+    """
+    matched = history_store.query(
+        scene_id=scene,
+        env=env,
+        status=status,
+        success=success,
+        since=since.timestamp() if since else None,
+        until=until.timestamp() if until else None,
+    )
+    page = []
+    total = 0
+    for entry in matched:
+        if offset <= total < offset + limit:
+            page.append(entry)
+        total += 1
+    records = await asyncio.to_thread(history_store.read, page)
+    return HistoryResponse(total=total, records=records)
+
+
+@router.get("/history/export")
+async def export_history(
+    scene: Optional[str] = Query(default=None, description="场景 ID"),
+    env: Optional[str] = Query(default=None, description="环境名称"),
+    status: Optional[int] = Query(default=None, description="响应状态码"),
+    success: Optional[bool] = Query(default=None, description="是否成功"),
+    since: Optional[datetime] = Query(default=None, description="起始时间 (ISO 8601 或 Unix 时间戳)"),
+    until: Optional[datetime] = Query(default=None, description="结束时间 (ISO 8601 或 Unix 时间戳)"),
+):
+    """按发送时间顺序导出录制序列 (NDJSON)，可直接用于 POST /api/replay
+
+    每行: {"t": 相对首条记录的秒数, "scene": 场景 ID, "env": 环境, "variables": {...}}
+    """
+    entries = sorted(
+        history_store.query(
+            scene_id=scene,
+            env=env,
+            status=status,
+            success=success,
+            since=since.timestamp() if since else None,
+            until=until.timestamp() if until else None,
+        ),
+        key=lambda entry: entry.ts,
+    )
+
+    async def lines():
+        first_ts = entries[0].ts if entries else 0.0
+        for start in range(0, len(entries), EXPORT_CHUNK):
+            records = await asyncio.to_thread(history_store.read, entries[start:start + EXPORT_CHUNK])
+            yield "".join(
+                json.dumps({
+                    "t": round(record.ts - first_ts, 6),
+                    "scene": record.scene_id,
+                    "env": record.env,
+                    "variables": record.variables,
+                }, ensure_ascii=False) + "\n"
+                for record in records
+            )
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/history/{record_id}", response_model=HistoryRecord)
+async def get_history(record_id: int):
+    """获取单条回调记录"""
+    entry = history_store.get(record_id)
+    records = await asyncio.to_thread(history_store.read, [entry]) if entry else []
+    if not records:
+        raise HTTPException(status_code=404, detail=f"记录不存在: {record_id}")
+    return records[0]
@@ -0,0 +1,35 @@
+"""后台任务查询 API"""
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse
+
+from app.models.schemas import JobResponse
+from app.services.job_queue import job_queue, JobFactory, QueueFullError
+
+router = APIRouter(prefix="/api", tags=["jobs"])
+
+
+async def submit_job(kind: str, target: str, factory: JobFactory, delay: float) -> JSONResponse:
+    """提交后台任务，立即返回 202 与任务状态; 队列已满时返回 429"""
+    try:
+        job = await job_queue.submit(kind, target, factory, delay)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return JSONResponse(status_code=202, content=job.model_dump())
+
+
+@router.get("/jobs", response_model=list[JobResponse])
+async def list_jobs(
+    status: Optional[str] = Query(default=None, description="按状态过滤"),
+):
+    """列出后台任务 (最近提交的在前)"""
+    return job_queue.list_jobs(status)
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """获取后台任务状态与结果"""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {job_id}")
+    return job
@@ -0,0 +1,75 @@
+"""压测 API"""
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from app.models.schemas import LoadProfile, LoadResponse, JobResponse
+from app.services.scene_loader import scene_loader
+from app.services.load_runner import load_runner
+from app.api.callback import _merge_variables, RESERVED_PARAMS
+from app.api.jobs import submit_job
+from app.config import config
+
+router = APIRouter(prefix="/api", tags=["load"])
+
+LOAD_RESERVED_PARAMS = RESERVED_PARAMS | {
+    "profile", "rps", "duration", "start_rps", "steps", "concurrency",
+}
+
+
+@router.post(
+    "/load/{scene_id}",
+    response_model=LoadResponse,
+    responses={202: {"model": JobResponse, "description": "异步模式: 已提交后台任务"}},
+)
+async def run_load(
+    scene_id: str,
+    request: Request,
+    rps: float = Query(gt=0, le=100000, description="目标速率 (次/秒)，ramp/step 的终点速率"),
+    duration: float = Query(default=10.0, gt=0, le=3600, description="持续秒数"),
+    profile: str = Query(default="constant", pattern="^(constant|ramp|step)$", description="速率曲线"),
+    start_rps: float = Query(default=0.0, ge=0, description="ramp/step 的起始速率"),
+    steps: int = Query(default=5, ge=1, le=100, description="step 曲线的阶梯数"),
+    concurrency: int = Query(default=500, ge=1, le=10000, description="最大在途请求数"),
+    env: str = Query(default=None, description="目标环境"),
+    dry_run: bool = Query(default=False, description="仅渲染不发送"),
+    async_mode: bool = Query(default=False, alias="async", description="异步执行，立即返回任务 ID"),
+    delay: float = Query(default=0.0, ge=0, le=86400, description="延迟执行秒数 (隐含异步执行)"),
+    capture_body: Optional[bool] = Query(default=None, description="是否保留响应体，不传时按场景配置"),
+):
+    """按速率曲线对单个场景压测
+
+    变量优先级与单次回调相同: 场景 defaults < 环境变量 < URL query params < JSON body
+    """
+    scene = scene_loader.get_scene(scene_id)
+    if not scene:
+        raise HTTPException(status_code=404, detail=f"场景不存在: {scene_id}")
+
+    if env is None:
+        env = config.default_env
+
+    body_params = None
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body_params = await request.json()
+        except Exception:
+            pass
+
+    query_params = dict(request.query_params)
+    variables = _merge_variables(scene, env, query_params, body_params, LOAD_RESERVED_PARAMS)
+    load_profile = LoadProfile(
+        profile=profile,
+        rps=rps,
+        duration=duration,
+        start_rps=start_rps,
+        steps=steps,
+        concurrency=concurrency,
+    )
+
+    async def run() -> LoadResponse:
+        result = await load_runner.run(scene, variables, load_profile, dry_run, env, capture_body)
+        return result.to_response(scene, load_profile)
+
+    if async_mode or delay > 0:
+        return await submit_job("load", scene.id, run, delay)
+
+    return await run()
@@ -0,0 +1,162 @@
+"""接收端 mock API
+
+第三方接收方的替身: 被测系统把第三方地址指向 http://<callback-tool>/mock/<任意路径>，
+按预设规则返回响应; 测试通过 /api/receiver/wait 等待请求到达并断言内容。
+"""
+import asyncio
+import json
+import time
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from app.models.schemas import ReceivedRequest, ReceivedRequestList, ReceiverRule
+from app.services.receiver import receiver
+from app.services.renderer import renderer
+
+router = APIRouter(tags=["receiver"])
+
+MOCK_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"]
+
+
+def _parse_headers(values: list[str]) -> dict[str, str]:
+    """解析 name:value 形式的请求头过滤条件"""
+    headers = {}
+    for value in values:
+        name, sep, pattern = value.partition(":")
+        if not sep or not name.strip():
+            raise HTTPException(status_code=400, detail=f"请求头过滤条件格式应为 name:value: {value}")
+        headers[name.strip()] = pattern.strip()
+    return headers
+
+
+@router.api_route("/mock/{path:path}", methods=MOCK_METHODS, include_in_schema=False)
+async def mock_endpoint(path: str, request: Request):
+    """接收任意请求: 记录后按命中规则返回预设响应，没有命中规则时返回 200"""
+    path = "/" + path
+    body = await request.body()
+    headers = dict(request.headers)
+    query = dict(request.query_params)
+    matched = receiver.match_rule(request.method, path, headers)
+    request_id = receiver.next_id()
+    rule_name, response = matched if matched else (None, None)
+
+    receiver.record(ReceivedRequest(
+        id=request_id,
+        ts=time.time(),
+        method=request.method,
+        path=path,
+        query=query,
+        headers=headers,
+        body=body[:receiver.body_bytes].decode("utf-8", errors="replace"),
+        body_bytes=len(body),
+        rule=rule_name,
+        response_status=response.status if response else 200,
+    ))
+
+    if response is None:
+        return {"ok": True, "request_id": request_id}
+
+    if response.latency_ms:
+        await asyncio.sleep(response.latency_ms / 1000)
+
+    # 模板变量: 查询参数 < JSON 请求体字段 < 内置的请求信息
+    variables = dict(query)
+    if body and headers.get("content-type", "").startswith("application/json"):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            variables.update(data)
+    variables.update({"_path": path, "_method": request.method, "_request_id": request_id})
+
+    return Response(
+        content=renderer.render(response.body, variables) if response.body else b"",
+        status_code=response.status,
+        headers=renderer.render_dict(response.headers, variables),
+    )
+
+
+@router.get("/api/receiver/rules", response_model=dict[str, ReceiverRule])
+async def list_rules():
+    """列出接收端规则 (按匹配顺序)"""
+    return receiver.rules()
+
+
+@router.put("/api/receiver/rules/{name}", response_model=ReceiverRule)
+async def set_rule(name: str, rule: ReceiverRule):
+    """注册或替换接收端规则
+
+    规则按注册顺序匹配，命中后依次返回 responses 中的响应，用完后重复最后一个;
+    替换规则会重置响应序列。
+    """
+    # 预编译响应模板，生成器参数错误时直接拒绝
+    try:
+        for response in rule.responses:
+            renderer.compile(response.body)
+            for value in response.headers.values():
+                renderer.compile(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    receiver.set_rule(name, rule)
+    return rule
+
+
+@router.delete("/api/receiver/rules/{name}")
+async def delete_rule(name: str):
+    """删除接收端规则"""
+    if not receiver.delete_rule(name):
+        raise HTTPException(status_code=404, detail=f"规则不存在: {name}")
+    return {"deleted": name}
+
+
+@router.delete("/api/receiver/rules")
+async def clear_rules():
+    """删除全部接收端规则"""
+    receiver.clear_rules()
+    return {"cleared": True}
+
+
+@router.get("/api/receiver/requests", response_model=ReceivedRequestList)
+async def list_requests(
+    method: Optional[str] = Query(default=None, description="HTTP 方法"),
+    path: Optional[str] = Query(default=None, description="路径 (/mock 之后的部分)，支持 * ? 通配"),
+    header: list[str] = Query(default=[], description="请求头过滤 name:value，值支持通配，可重复"),
+    since_id: int = Query(default=0, ge=0, description="只返回 ID 大于该值的请求"),
+    limit: int = Query(default=100, ge=1, le=1000, description="返回条数"),
+):
+    """查询接收端收到的请求 (最近的在前)"""
+    matched = receiver.query(method, path, _parse_headers(header), since_id)
+    page = []
+    total = 0
+    for request in matched:
+        if total < limit:
+            page.append(request)
+        total += 1
+    return ReceivedRequestList(total=total, requests=page)
+
+
+@router.delete("/api/receiver/requests")
+async def clear_requests():
+    """清空已收到的请求 (规则保留)"""
+    receiver.clear()
+    return {"cleared": True}
+
+
+@router.get("/api/receiver/wait", response_model=ReceivedRequest, responses={408: {"description": "等待超时"}})
+async def wait_for_request(
+    method: Optional[str] = Query(default=None, description="HTTP 方法"),
+    path: Optional[str] = Query(default=None, description="路径 (/mock 之后的部分)，支持 * ? 通配"),
+    header: list[str] = Query(default=[], description="请求头过滤 name:value，值支持通配，可重复"),
+    since_id: int = Query(default=0, ge=0, description="只匹配 ID 大于该值的请求"),
+    timeout: float = Query(default=30.0, gt=0, le=300, description="最长等待秒数"),
+):
+    """长轮询等待匹配的请求
+
+    缓冲区中已有匹配请求时立即返回最早的一个; 否则挂起直到匹配的请求到达，
+    超时返回 408。连续等待多个请求时以上一次返回的 id 作为 since_id。
+    """
+    request = await receiver.wait_for(method, path, _parse_headers(header), since_id, timeout)
+    if request is None:
+        raise HTTPException(status_code=408, detail="等待超时，未收到匹配的请求")
+    return request
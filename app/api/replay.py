@@ -0,0 +1,43 @@
+"""回放 API"""
+from fastapi import APIRouter, Query, Request
+
+from app.models.schemas import ReplayResponse, JobResponse
+from app.services.replay import replay_runner
+from app.api.callback import _iter_variable_sets
+from app.api.jobs import submit_job
+
+router = APIRouter(prefix="/api", tags=["replay"])
+
+
+@router.post(
+    "/replay",
+    response_model=ReplayResponse,
+    responses={202: {"model": JobResponse, "description": "异步模式: 已提交后台任务"}},
+)
+async def replay(
+    request: Request,
+    speed: float = Query(default=1.0, ge=0, le=10000, description="速度倍数: 1 为原始间隔，10 为 10 倍速，0 为尽快发送"),
+    concurrency: int = Query(default=100, ge=1, le=10000, description="最大在途请求数"),
+    env: str = Query(default=None, description="目标环境，该环境的变量覆盖录制的同名变量"),
+    dry_run: bool = Query(default=False, description="仅渲染不发送"),
+    async_mode: bool = Query(default=False, alias="async", description="异步执行，立即返回任务 ID"),
+):
+    """回放录制序列
+
+    Body 为 GET /api/history/export 导出的 NDJSON (Content-Type: application/x-ndjson)
+    或同结构的 JSON 数组。NDJSON 边读边发，不会整体载入内存。
+    """
+    if async_mode:
+        # 后台执行时请求体已不可读，先读入内存
+        events = [item async for item in _iter_variable_sets(request)]
+    else:
+        events = _iter_variable_sets(request)
+
+    async def run() -> ReplayResponse:
+        result = await replay_runner.run(events, speed, concurrency, env, dry_run)
+        return result.to_replay_response(speed, concurrency)
+
+    if async_mode:
+        return await submit_job("replay", "replay", run, 0.0)
+
+    return await run()
@@ -1,28 +1,208 @@
 """批量场景执行 API"""
 import asyncio
-from typing import Optional
+import json
+import time
+from typing import AsyncIterator, Optional
 from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
 from app.models.schemas import (
-    ScenarioResponse, ScenarioSummary, Scenario
+    CallbackResponse, JobResponse, MatrixResponse, ScenarioResponse, ScenarioSummary, Scenario, SceneStep
 )
 from app.services.scene_loader import scene_loader
 from app.services.http_sender import http_sender
+from app.services.extractor import compile_extractors
+from app.services.batch_runner import batch_runner
+from app.services.matrix import MatrixItem, MatrixResult
+from app.api.callback import _merge_variables, _parse_matrix_request
+from app.api.jobs import submit_job
 from app.config import config
 
 router = APIRouter(prefix="/api", tags=["scenario"])
 
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
 
-@router.post("/scenario/{scenario_id}", response_model=ScenarioResponse)
+
+async def _execute_step(
+    step: SceneStep,
+    env: str,
+    common_vars: dict,
+    dry_run: bool,
+    extracted: dict,
+) -> CallbackResponse:
+    """执行单个步骤"""
+    # 获取场景
+    scene = scene_loader.get_scene(step.scene)
+    if not scene:
+        return CallbackResponse(
+            success=False,
+            message=f"场景不存在: {step.scene}",
+            scene_id=step.scene,
+            scene_name="",
+        )
+
+    # 合并变量: defaults < env < common_vars < 前序步骤提取的变量
+    variables = _merge_variables(scene, env, {}, {**common_vars, **extracted} if extracted else common_vars)
+
+    # 执行回调
+    return await http_sender.send(scene, variables, dry_run, env=env, extractors=compile_extractors(step.extract))
+
+
+async def _run_steps(
+    scenario: Scenario,
+    env: str,
+    common_vars: dict,
+    dry_run: bool,
+    extracted: dict,
+) -> AsyncIterator[tuple[int, CallbackResponse]]:
+    """按依赖图并发执行步骤，每完成一步即产出 (步骤下标, 结果)
+
+    步骤在其全部依赖完成且依赖各自的 delay_after 结束后开始。步骤提取的变量
+    写入 extracted，对之后开始的步骤可见 (依赖链上的步骤一定能看到)。
+
+    步骤执行抛出异常时，依赖它的步骤 (直接或间接) 以失败结果跳过，异常在
+    产出到该步骤时重新抛出; 每个步骤无论结果如何都会标记完成，不会有步骤永久等待。
+    """
+    finished = {step.id: asyncio.Event() for step in scenario.steps}
+    aborted: set[str] = set()
+    completed: asyncio.Queue = asyncio.Queue()
+
+    async def run(index: int, step: SceneStep):
+        try:
+            for dep in step.depends_on or []:
+                await finished[dep].wait()
+            skipped = [dep for dep in step.depends_on or [] if dep in aborted]
+            if skipped:
+                aborted.add(step.id)
+                await completed.put((index, CallbackResponse(
+                    success=False,
+                    message=f"依赖的步骤执行异常，已跳过: {', '.join(skipped)}",
+                    scene_id=step.scene,
+                    error_type="Skipped",
+                )))
+                return
+
+            try:
+                result = await _execute_step(step, env, common_vars, dry_run, extracted)
+            except Exception as e:
+                aborted.add(step.id)
+                await completed.put((index, e))
+                return
+            if result.extracted:
+                extracted.update(result.extracted)
+            await completed.put((index, result))
+
+            # 步骤后延迟，仅推迟依赖本步骤的后续步骤
+            if step.delay_after > 0 and not dry_run:
+                await asyncio.sleep(step.delay_after)
+        finally:
+            finished[step.id].set()
+
+    tasks = [asyncio.create_task(run(i, step)) for i, step in enumerate(scenario.steps)]
+    try:
+        for _ in range(len(tasks)):
+            index, result = await completed.get()
+            if isinstance(result, Exception):
+                raise result
+            yield index, result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _stream_steps(
+    scenario: Scenario,
+    env: str,
+    common_vars: dict,
+    dry_run: bool,
+    stream: str,
+) -> AsyncIterator[str]:
+    """以 NDJSON 或 SSE 格式流式输出每步结果，最后输出汇总"""
+    def encode(event: str, data: dict) -> str:
+        payload = json.dumps(data, ensure_ascii=False)
+        if stream == "sse":
+            return f"event: {event}\ndata: {payload}\n\n"
+        return json.dumps({"event": event, **data}, ensure_ascii=False) + "\n"
+
+    index = 0
+    success_count = 0
+    extracted: dict = {}
+    try:
+        async for step_index, result in _run_steps(scenario, env, common_vars, dry_run, extracted):
+            if result.success:
+                success_count += 1
+            yield encode("step", {
+                "index": step_index,
+                "step_id": scenario.steps[step_index].id,
+                "result": result.model_dump(),
+            })
+            index += 1
+    except Exception as e:
+        # 响应头已发出，无法再返回 500，以 error 事件结束流
+        yield encode("error", {"message": str(e), "error_type": type(e).__name__})
+        return
+
+    yield encode("summary", {
+        "success": success_count == index,
+        "scenario_id": scenario.id,
+        "scenario_name": scenario.name,
+        "total_steps": len(scenario.steps),
+        "completed_steps": success_count,
+        "extracted": extracted,
+    })
+
+
+async def _collect_steps(
+    scenario: Scenario,
+    env: str,
+    common_vars: dict,
+    dry_run: bool,
+) -> ScenarioResponse:
+    """执行全部步骤并汇总结果"""
+    # 执行每个步骤，结果按步骤顺序返回
+    results: list[Optional[CallbackResponse]] = [None] * len(scenario.steps)
+    extracted: dict = {}
+    async for step_index, result in _run_steps(scenario, env, common_vars, dry_run, extracted):
+        results[step_index] = result
+
+    # 统计结果
+    success_count = sum(1 for r in results if r.success)
+    all_success = success_count == len(results)
+
+    return ScenarioResponse(
+        success=all_success,
+        scenario_id=scenario.id,
+        scenario_name=scenario.name,
+        total_steps=len(scenario.steps),
+        completed_steps=success_count,
+        results=results,
+        extracted=extracted,
+    )
+
+
+@router.post(
+    "/scenario/{scenario_id}",
+    response_model=ScenarioResponse,
+    responses={202: {"model": JobResponse, "description": "异步模式: 已提交后台任务"}},
+)
 async def execute_scenario(
     scenario_id: str,
     request: Request,
     env: str = Query(default=None, description="目标环境"),
     dry_run: bool = Query(default=False, description="仅预览不发送"),
+    stream: Optional[str] = Query(
+        default=None, pattern="^(ndjson|sse)$", description="流式输出每步结果: ndjson 或 sse"
+    ),
+    async_mode: bool = Query(default=False, alias="async", description="异步执行，立即返回任务 ID"),
+    delay: float = Query(default=0.0, ge=0, le=86400, description="延迟执行秒数 (隐含异步执行)"),
 ):
     """执行批量场景
 
     Body 中的变量将应用到所有步骤
+    异步模式下通过 GET /api/jobs/{job_id} 查询结果。
     """
     # 获取批量场景
     scenario = scene_loader.get_scenario(scenario_id)
@@ -40,50 +220,86 @@ async def execute_scenario(
             common_vars = await request.json()
         except Exception:
             pass
+        if not isinstance(common_vars, dict):
+            raise HTTPException(status_code=400, detail="请求体必须是 JSON 对象")
 
-    # 执行每个步骤
-    results = []
-    for step in scenario.steps:
-        # 获取场景
-        scene = scene_loader.get_scene(step.scene)
-        if not scene:
-            results.append({
-                "success": False,
-                "message": f"场景不存在: {step.scene}",
-                "scene_id": step.scene,
-                "scene_name": "",
-            })
-            continue
+    # 流式模式: 每步完成即输出，不缓存结果
+    if stream:
+        return StreamingResponse(
+            _stream_steps(scenario, env, common_vars, dry_run, stream),
+            media_type=STREAM_MEDIA_TYPES[stream],
+        )
 
-        # 合并变量: defaults < env < common_vars
-        variables = {}
-        if scene.defaults:
-            variables.update(scene.defaults)
-        env_vars = scene_loader.get_env_variables(env)
-        if env_vars:
-            variables.update(env_vars)
-        variables.update(common_vars)
+    # 异步模式: 交给后台任务队列
+    if async_mode or delay > 0:
+        return await submit_job(
+            "scenario", scenario.id, lambda: _collect_steps(scenario, env, common_vars, dry_run), delay
+        )
 
-        # 执行回调
-        result = await http_sender.send(scene, variables, dry_run)
-        results.append(result)
+    return await _collect_steps(scenario, env, common_vars, dry_run)
 
-        # 步骤间延迟
-        if step.delay_after > 0 and not dry_run:
-            await asyncio.sleep(step.delay_after)
 
-    # 统计结果
-    success_count = sum(1 for r in results if r.success)
-    all_success = success_count == len(results)
+def _scenario_status(response: ScenarioResponse) -> str:
+    """批量场景一次执行的状态分类: ok，或 首个失败步骤:状态码/错误类型"""
+    if response.success:
+        return "ok"
+    for result in response.results:
+        if not result.success:
+            reason = result.response_status if result.response_status is not None else result.error_type
+            return f"{result.scene_id}:{reason or result.message}"
+    return "incomplete"
 
-    return ScenarioResponse(
-        success=all_success,
-        scenario_id=scenario.id,
-        scenario_name=scenario.name,
-        total_steps=len(scenario.steps),
-        completed_steps=success_count,
-        results=results,
-    )
+
+@router.post(
+    "/scenario/{scenario_id}/matrix",
+    response_model=MatrixResponse,
+    responses={202: {"model": JobResponse, "description": "异步模式: 已提交后台任务"}},
+)
+async def execute_scenario_matrix(
+    scenario_id: str,
+    request: Request,
+    env: str = Query(default=None, description="目标环境"),
+    dry_run: bool = Query(default=False, description="仅预览不发送"),
+    concurrency: int = Query(default=None, ge=1, le=1000, description="最多同时执行的组合数"),
+    rate: float = Query(default=None, gt=0, description="目标速率 (组合/秒)，不传则不限速"),
+    async_mode: bool = Query(default=False, alias="async", description="异步执行，立即返回任务 ID"),
+    delay: float = Query(default=0.0, ge=0, le=86400, description="延迟执行秒数 (隐含异步执行)"),
+):
+    """按参数矩阵执行批量场景: 各轴取值的每个组合执行一遍全部步骤
+
+    Body: {"matrix": {...}, "variables": {...}}，均可省略; 矩阵变量覆盖公共变量。
+    结果按轴取值汇总，status_counts 按首个失败步骤分类。
+    """
+    scenario = scene_loader.get_scenario(scenario_id)
+    if not scenario:
+        raise HTTPException(status_code=404, detail=f"批量场景不存在: {scenario_id}")
+
+    if env is None:
+        env = config.default_env
+    if concurrency is None:
+        concurrency = config.batch_concurrency
+
+    matrix, common_vars = await _parse_matrix_request(request, scenario.matrix)
+    result = MatrixResult(matrix.axis_names)
+
+    async def handle(item: MatrixItem):
+        start = time.perf_counter()
+        response = await _collect_steps(scenario, env, {**common_vars, **item}, dry_run)
+        result.record(response.success, _scenario_status(response), (time.perf_counter() - start) * 1000, item)
+
+    async def run() -> MatrixResponse:
+        started = time.perf_counter()
+        await batch_runner.pump(matrix, handle, concurrency, rate)
+        result.duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        return result.to_response(scenario.id, scenario.name, matrix.size())
+
+    if async_mode or delay > 0:
+        return await submit_job("scenario", scenario.id, run, delay)
+
+    try:
+        return await run()
+    except (ValueError, OSError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/scenarios", response_model=list[ScenarioSummary])
@@ -10,12 +10,61 @@ class AppConfig(BaseSettings):
     host: str = Field(default="0.0.0.0")
     port: int = Field(default=8000)
 
-    # 场景配置文件路径
+    # 场景配置文件路径，也可以是目录 (其中的 *.yaml/*.yml) 或 glob
     scenes_file: str = Field(default="scenes.yaml")
 
+    # 监听场景配置文件变更并自动增量重载
+    scenes_watch: bool = Field(default=False)
+    scenes_watch_interval: float = Field(default=1.0, description="轮询/去抖间隔秒数")
+
+    # 场景索引的磁盘缓存 (只含偏移与摘要)，源文件未变化时冷启动跳过逐行扫描
+    scenes_cache: bool = Field(default=True)
+    scenes_cache_dir: str = Field(default=".scenes_cache", description="缓存目录")
+
     # 默认环境
     default_env: str = Field(default="test")
 
+    # 出站 HTTP 连接池
+    http_timeout: float = Field(default=30.0, description="请求超时秒数")
+    http_max_connections: int = Field(default=200, description="连接池最大连接数")
+    http_max_connections_per_host: int = Field(default=50, description="单个目标主机最大并发连接数")
+    http_max_keepalive_connections: int = Field(default=100, description="最大保活空闲连接数")
+    http_keepalive_expiry: float = Field(default=30.0, description="空闲连接保活秒数")
+    http2: bool = Field(default=True, description="目标支持时启用 HTTP/2 (需安装 h2)")
+    http_capture_bytes: int = Field(default=2000, description="响应体最多保留的字节数，其余只计数不缓存")
+    http_extract_max_bytes: int = Field(default=1024 * 1024, description="批量场景步骤配置了提取规则时最多读取的响应体字节数")
+
+    # 目标主机熔断: 连续失败 (超时、连接错误、5xx) 达到阈值后快速失败
+    circuit_breaker_threshold: int = Field(default=5, description="连续失败次数阈值，0 表示不熔断")
+    circuit_breaker_reset_timeout: float = Field(default=30.0, description="熔断后多少秒放行探测请求")
+
+    # 批量发送默认并发数
+    batch_concurrency: int = Field(default=50, description="批量发送默认并发数")
+
+    # 参数矩阵: 每个轴最多单独汇总的取值数，其余计入 _other
+    matrix_max_axis_values: int = Field(default=1000, description="矩阵每轴最多汇总的取值数")
+
+    # 多进程发送后端 (批量与压测)，0 表示在 API 进程内发送
+    sender_processes: int = Field(default=0, description="发送 worker 进程数")
+    sender_process_concurrency: int = Field(default=200, description="每个 worker 进程的最大在途请求数")
+
+    # 后台任务队列
+    job_workers: int = Field(default=10, description="后台任务 worker 数")
+    job_queue_size: int = Field(default=1000, description="排队/计划中任务上限，超出返回 429")
+    job_history_size: int = Field(default=1000, description="保留的已完成任务数")
+
+    # 回调记录 (GET /api/history)
+    history_enabled: bool = Field(default=True, description="记录每次发送的请求与响应")
+    history_dir: str = Field(default=".history", description="分段日志目录")
+    history_segment_bytes: int = Field(default=16 * 1024 * 1024, description="单个分段文件大小上限")
+    history_max_bytes: int = Field(default=256 * 1024 * 1024, description="保留的总字节数")
+    history_max_age: float = Field(default=7 * 86400, description="保留秒数")
+    history_flush_interval: float = Field(default=0.5, description="批量写入间隔秒数")
+
+    # 接收端 mock (/mock/...)，收到的请求保存在内存环形缓冲区
+    receiver_capacity: int = Field(default=10000, ge=1, description="保留的请求数 (至少 1)")
+    receiver_body_bytes: int = Field(default=64 * 1024, description="单个请求体最多保留的字节数")
+
     class Config:
         env_prefix = "APP_"
 
@@ -0,0 +1,92 @@
+"""压测命令行入口
+
+使用方式:
+    python -m app.loadgen payment-success --rps 200 --duration 30
+    python -m app.loadgen payment-success --profile ramp --start-rps 10 --rps 500 --duration 60 --var orderId=ORD1
+"""
+import argparse
+import asyncio
+import json
+
+from app.config import config
+from app.models.schemas import LoadProfile
+from app.services.http_sender import http_sender
+from app.services.load_runner import load_runner, PROFILES
+from app.services.process_sender import process_sender
+from app.services.scene_loader import scene_loader
+from app.api.callback import _merge_variables
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.loadgen", description="按速率曲线压测单个场景")
+    parser.add_argument("scene_id", help="场景 ID")
+    parser.add_argument("--rps", type=float, required=True, help="目标速率 (次/秒)，ramp/step 的终点速率")
+    parser.add_argument("--duration", type=float, default=10.0, help="持续秒数")
+    parser.add_argument("--profile", choices=PROFILES, default="constant", help="速率曲线")
+    parser.add_argument("--start-rps", type=float, default=0.0, help="ramp/step 的起始速率")
+    parser.add_argument("--steps", type=int, default=5, help="step 曲线的阶梯数")
+    parser.add_argument("--concurrency", type=int, default=500, help="最大在途请求数")
+    parser.add_argument("--processes", type=int, default=config.sender_processes, help="发送 worker 进程数，0 表示单进程")
+    parser.add_argument("--env", default=config.default_env, help="目标环境")
+    parser.add_argument("--scenes", default=config.scenes_file, help="场景配置文件")
+    parser.add_argument("--var", action="append", default=[], metavar="KEY=VALUE", help="场景变量，可重复")
+    parser.add_argument("--dry-run", action="store_true", help="仅渲染不发送")
+    parser.add_argument("--no-capture-body", dest="capture_body", action="store_const", const=False, default=None,
+                        help="不保留响应体，只记录字节数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    scene_loader.load(args.scenes)
+    scene = scene_loader.get_scene(args.scene_id)
+    if not scene:
+        raise SystemExit(f"场景不存在: {args.scene_id}")
+
+    overrides = dict(item.split("=", 1) for item in args.var)
+    variables = _merge_variables(scene, args.env, {}, overrides)
+    profile = LoadProfile(
+        profile=args.profile,
+        rps=args.rps,
+        duration=args.duration,
+        start_rps=args.start_rps,
+        steps=args.steps,
+        concurrency=args.concurrency,
+    )
+
+    process_sender.processes = args.processes
+    await http_sender.start()
+    await process_sender.start()
+    try:
+        result = await load_runner.run(scene, variables, profile, args.dry_run, args.env, args.capture_body)
+    finally:
+        await process_sender.close()
+        await http_sender.close()
+    return result.to_response(scene, profile).model_dump()
+
+
+def print_report(report: dict) -> None:
+    profile = report["profile"]
+    latency = report["latency_ms"]
+    print(f"场景: {report['scene_id']} ({report['scene_name']})")
+    print(f"曲线: {profile['profile']}  目标 {profile['rps']} rps  持续 {profile['duration']}s")
+    print(f"发送: {report['total']}  成功 {report['success_count']}  失败 {report['failed_count']}")
+    print(f"吞吐: {report['throughput_rps']} rps  耗时 {report['elapsed_s']}s  接收 {report['bytes_received']} 字节")
+    print("延迟(ms): " + "  ".join(f"{key}={value}" for key, value in latency.items()))
+    if report["status_counts"]:
+        print("状态码: " + "  ".join(f"{key}={value}" for key, value in report["status_counts"].items()))
+    if report["error_counts"]:
+        print("异常: " + "  ".join(f"{key}={value}" for key, value in report["error_counts"].items()))
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
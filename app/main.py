@@ -1,10 +1,20 @@
 """FastAPI 主入口"""
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from app.api import callback, scenario
-from app.services.scene_loader import scene_loader
+from app.api import callback, scenario, jobs, load, history, replay, receiver
+from app.services.scene_loader import SceneConfigError, SceneReloadingError, scene_loader
+from app.services.http_sender import http_sender
+from app.services.job_queue import job_queue
+from app.services.history import history_store
+from app.services.rate_limiter import rate_limiter
+from app.services.receiver import receiver as mock_receiver
+from app.services.signer import signer
+from app.services.process_sender import process_sender
+from app.services.metrics import metrics
+from app.services.scene_watcher import scene_watcher
 from app.config import config
 
 
@@ -14,16 +24,31 @@ async def lifespan(app: FastAPI):
     # 启动时加载场景配置
     try:
         scene_loader.load(config.scenes_file)
-        scenes_count = len(scene_loader.config.scenes)
-        scenarios_count = len(scene_loader.config.scenarios)
+        scenes_count = scene_loader.scenes_count
+        scenarios_count = scene_loader.scenarios_count
         print(f"✅ 场景配置加载完成: {scenes_count} 个场景, {scenarios_count} 个批量场景")
+        scene_loader.schedule_save_cache()
     except FileNotFoundError as e:
         print(f"⚠️  {e}")
         print("   请复制 scenes.example.yaml 为 scenes.yaml 并配置场景")
     except Exception as e:
         print(f"❌ 场景配置加载失败: {e}")
 
+    # 启动共享 HTTP 连接池
+    await http_sender.start()
+    await job_queue.start()
+    await process_sender.start()
+    await history_store.start()
+    if config.scenes_watch:
+        await scene_watcher.start(config.scenes_file)
+
     yield
+
+    await scene_watcher.close()
+    await job_queue.close()
+    await process_sender.close()
+    await history_store.close()
+    await http_sender.close()
     print("👋 应用关闭")
 
 
@@ -43,9 +68,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(SceneReloadingError)
+async def scene_reloading_handler(request: Request, exc: SceneReloadingError):
+    """配置文件已变化、正在后台重建索引"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(SceneConfigError)
+async def scene_config_error_handler(request: Request, exc: SceneConfigError):
+    """场景首次解析时发现的配置错误，与加载阶段的错误一样给出原因"""
+    return JSONResponse(status_code=500, content={"detail": f"场景配置加载失败: {exc}"})
+
+
 # 注册路由
 app.include_router(callback.router)
 app.include_router(scenario.router)
+app.include_router(jobs.router)
+app.include_router(load.router)
+app.include_router(history.router)
+app.include_router(replay.router)
+app.include_router(receiver.router)
 
 
 @app.get("/")
@@ -62,6 +104,13 @@ async def root():
             "callback": "/api/callback/{scene_id}",
             "scenario": "/api/scenario/{scenario_id}",
             "reload": "/api/scenes/reload",
+            "jobs": "/api/jobs/{job_id}",
+            "load": "/api/load/{scene_id}",
+            "history": "/api/history",
+            "replay": "/api/replay",
+            "mock": "/mock/{path}",
+            "receiver": "/api/receiver/requests",
+            "metrics": "/metrics",
         }
     }
 
@@ -73,11 +122,28 @@ async def health():
     return {
         "status": "healthy",
         "scenes_loaded": conf is not None,
-        "scenes_count": len(conf.scenes) if conf else 0,
-        "scenarios_count": len(conf.scenarios) if conf else 0,
+        "scenes_count": scene_loader.scenes_count,
+        "scenarios_count": scene_loader.scenarios_count,
+        "http_pool": http_sender.pool_stats(),
+        "circuit_breakers": http_sender.breaker_stats(),
+        "rate_limits": rate_limiter.stats(),
+        "jobs": job_queue.stats(),
+        "sender_processes": process_sender.stats(),
+        "history": history_store.stats(),
+        "receiver": mock_receiver.stats(),
+        "signing_keys": signer.stats(),
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus 文本格式指标"""
+    return PlainTextResponse(
+        metrics.render_text(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
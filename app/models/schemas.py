@@ -1,6 +1,36 @@
 """数据模型定义"""
 from typing import Optional, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, StrictStr
+
+
+class RetryPolicy(BaseModel):
+    """场景重试策略"""
+    max_attempts: int = Field(default=3, ge=1, description="最大发送次数 (含首次)")
+    backoff: str = Field(default="exponential", pattern="^(exponential|linear|fixed)$", description="退避曲线")
+    initial_delay: float = Field(default=0.5, ge=0, description="首次重试前等待秒数")
+    multiplier: float = Field(default=2.0, ge=1, description="exponential 的倍数")
+    max_delay: float = Field(default=30.0, ge=0, description="单次等待上限秒数")
+    jitter: float = Field(default=0.1, ge=0, le=1, description="随机抖动比例，0.1 表示 ±10%")
+    retry_on: list[int] = Field(default_factory=lambda: [429, 500, 502, 503, 504], description="需要重试的状态码")
+    retry_on_errors: bool = Field(default=True, description="超时与连接错误是否重试")
+
+
+class RateLimit(BaseModel):
+    """令牌桶限流配置"""
+    rate: float = Field(gt=0, description="每秒发送数")
+    burst: Optional[int] = Field(default=None, ge=1, description="突发容量，默认与 rate 相同")
+
+
+class SigningConfig(BaseModel):
+    """请求签名配置 (对渲染后的请求体签名，结果写入请求头)"""
+    preset: Optional[str] = Field(default=None, description="预设: github / stripe / slack / shopify / wechatpay")
+    algorithm: Optional[str] = Field(default=None, description="hmac-sha256 / hmac-sha1 / hmac-sha512 / rsa-sha256，默认 hmac-sha256")
+    key: Optional[str] = Field(default=None, description="HMAC 密钥或 PEM 私钥 (支持模板变量，如 {{notify_secret}})")
+    key_file: Optional[str] = Field(default=None, description="密钥文件路径 (HMAC 密钥或 PEM 私钥)")
+    key_id: Optional[str] = Field(default=None, description="密钥 ID，解析结果按其缓存 (wechatpay 预设中作为证书序列号)")
+    encoding: Optional[str] = Field(default=None, description="签名编码: hex / base64")
+    payload: Optional[str] = Field(default=None, description="签名原文模板，默认 {{_body}}")
+    headers: Optional[dict[str, str]] = Field(default=None, description="签名头模板，默认 X-Signature: {{_signature}}")
 
 
 class Scene(BaseModel):
@@ -13,12 +43,24 @@ class Scene(BaseModel):
     headers: dict[str, str] = Field(default_factory=dict, description="请求头")
     body: str = Field(default="", description="请求体 (支持模板变量)")
     defaults: dict[str, Any] = Field(default_factory=dict, description="默认变量值")
+    retry: Optional[RetryPolicy] = Field(default=None, description="重试策略，未配置时只发送一次")
+    rate_limit: Optional[RateLimit] = Field(default=None, description="场景限流，超出速率的请求排队等待")
+    capture_body: bool = Field(default=True, description="是否保留响应体 (关闭时只记录字节数)")
+    matrix: Optional[dict[str, Any]] = Field(default=None, description="参数矩阵，各轴取值的每个组合发送一次")
+    signing: Optional[SigningConfig] = Field(default=None, description="请求签名，对渲染后的请求体计算签名头")
 
 
 class SceneStep(BaseModel):
     """批量场景中的单个步骤"""
+    id: str = Field(default="", description="步骤 ID (默认为场景 ID)")
     scene: str = Field(description="场景 ID")
-    delay_after: float = Field(default=0.0, description="执行后延迟秒数")
+    delay_after: float = Field(default=0.0, description="执行后延迟秒数，依赖本步骤的步骤在延迟结束后才开始")
+    depends_on: Optional[list[str]] = Field(default=None, description="依赖的步骤 ID，未指定时依赖上一阶段的全部步骤")
+    parallel_group: Optional[str] = Field(default=None, description="并行组，相邻的同组步骤构成一个阶段并发执行")
+    extract: dict[str, StrictStr] = Field(
+        default_factory=dict,
+        description="从响应中提取变量供后续步骤使用: 变量名 → $.json.path / header:Name / regex:pattern",
+    )
 
 
 class Scenario(BaseModel):
@@ -27,6 +69,7 @@ class Scenario(BaseModel):
     name: str = Field(description="批量场景名称")
     description: str = Field(default="", description="批量场景描述")
     steps: list[SceneStep] = Field(default_factory=list, description="执行步骤")
+    matrix: Optional[dict[str, Any]] = Field(default=None, description="参数矩阵，各轴取值的每个组合执行一遍全部步骤")
 
 
 class ScenesConfig(BaseModel):
@@ -47,8 +90,13 @@ class CallbackResponse(BaseModel):
     request_headers: Optional[dict[str, str]] = Field(default=None, description="请求头")
     request_body: Optional[str] = Field(default=None, description="请求体")
     response_status: Optional[int] = Field(default=None, description="响应状态码")
-    response_body: Optional[str] = Field(default=None, description="响应体")
+    response_body: Optional[str] = Field(default=None, description="响应体 (最多保留 http_capture_bytes 字节)")
+    response_bytes: Optional[int] = Field(default=None, description="响应体总字节数 (传输大小，未解压)")
     duration_ms: Optional[float] = Field(default=None, description="耗时毫秒")
+    error_type: Optional[str] = Field(default=None, description="发送异常类型，如 ConnectTimeout")
+    timings: Optional[dict[str, float]] = Field(default=None, description="分阶段耗时毫秒 (render_ms / send_ms / total_ms)")
+    attempts: Optional[int] = Field(default=None, description="发送次数 (含重试)，场景未配置重试策略时为空")
+    extracted: Optional[dict[str, Any]] = Field(default=None, description="按步骤的 extract 规则从响应中提取的变量")
 
 
 class ScenarioResponse(BaseModel):
@@ -59,6 +107,99 @@ class ScenarioResponse(BaseModel):
     total_steps: int = Field(description="总步骤数")
     completed_steps: int = Field(description="已完成步骤数")
     results: list[CallbackResponse] = Field(default_factory=list, description="每步执行结果")
+    extracted: dict[str, Any] = Field(default_factory=dict, description="各步骤提取的全部变量")
+
+
+class LatencyStats(BaseModel):
+    """延迟统计 (毫秒)"""
+    min: float = 0.0
+    avg: float = 0.0
+    p50: float = 0.0
+    p90: float = 0.0
+    p99: float = 0.0
+    max: float = 0.0
+
+
+class BatchResponse(BaseModel):
+    """批量回调执行响应"""
+    success: bool = Field(description="是否全部成功")
+    scene_id: str = Field(description="场景 ID")
+    scene_name: str = Field(description="场景名称")
+    total: int = Field(description="发送总数")
+    success_count: int = Field(description="成功数")
+    failed_count: int = Field(description="失败数")
+    duration_ms: float = Field(description="总耗时毫秒")
+    rps: float = Field(description="实际速率 (次/秒)")
+    latency: LatencyStats = Field(description="单次发送延迟统计")
+    status_counts: dict[str, int] = Field(default_factory=dict, description="按状态码/错误分类计数")
+    results: list[CallbackResponse] = Field(default_factory=list, description="每次执行结果 (include_results=true 时返回)")
+
+
+class AxisValueStats(BaseModel):
+    """矩阵单个轴取值的汇总"""
+    total: int = Field(description="执行次数")
+    success_count: int = Field(description="成功数")
+    failed_count: int = Field(description="失败数")
+    avg_ms: float = Field(description="平均耗时毫秒")
+    max_ms: float = Field(description="最大耗时毫秒")
+
+
+class MatrixResponse(BaseModel):
+    """参数矩阵执行响应"""
+    success: bool = Field(description="是否全部成功")
+    target_id: str = Field(description="场景或批量场景 ID")
+    target_name: str = Field(description="场景或批量场景名称")
+    combinations: Optional[int] = Field(default=None, description="组合总数，包含数据文件轴时为空")
+    total: int = Field(description="执行总数")
+    success_count: int = Field(description="成功数")
+    failed_count: int = Field(description="失败数")
+    duration_ms: float = Field(description="总耗时毫秒")
+    rps: float = Field(description="实际速率 (组合/秒)")
+    latency_ms: dict[str, float] = Field(default_factory=dict, description="延迟分位 (min/mean/p50/p90/p99/p999/max)")
+    status_counts: dict[str, int] = Field(default_factory=dict, description="按状态码/错误分类计数")
+    axes: dict[str, dict[str, AxisValueStats]] = Field(default_factory=dict, description="按轴取值汇总: 轴名 -> 取值 -> 统计")
+    results: list[CallbackResponse] = Field(default_factory=list, description="每次执行结果 (include_results=true 时返回)")
+
+
+class LoadProfile(BaseModel):
+    """压测速率曲线"""
+    profile: str = Field(default="constant", description="速率曲线: constant / ramp / step")
+    rps: float = Field(description="目标速率 (次/秒)，ramp/step 的终点速率")
+    duration: float = Field(description="持续秒数")
+    start_rps: float = Field(default=0.0, description="ramp/step 的起始速率")
+    steps: int = Field(default=5, description="step 曲线的阶梯数")
+    concurrency: int = Field(default=500, description="最大在途请求数")
+
+
+class LoadResponse(BaseModel):
+    """压测结果"""
+    success: bool = Field(description="是否全部成功")
+    scene_id: str = Field(description="场景 ID")
+    scene_name: str = Field(description="场景名称")
+    profile: LoadProfile = Field(description="速率曲线")
+    total: int = Field(description="发送总数")
+    success_count: int = Field(description="成功数")
+    failed_count: int = Field(description="失败数")
+    elapsed_s: float = Field(description="实际耗时秒数")
+    throughput_rps: float = Field(description="实际吞吐 (次/秒)")
+    bytes_received: int = Field(default=0, description="响应体总字节数")
+    latency_ms: dict[str, float] = Field(default_factory=dict, description="延迟分位 (min/mean/p50/p90/p99/p999/max)")
+    status_counts: dict[str, int] = Field(default_factory=dict, description="按 HTTP 状态码计数")
+    error_counts: dict[str, int] = Field(default_factory=dict, description="按异常类型计数")
+
+
+class JobResponse(BaseModel):
+    """后台任务状态"""
+    id: str = Field(description="任务 ID")
+    kind: str = Field(description="任务类型: callback / scenario")
+    target: str = Field(description="场景或批量场景 ID")
+    status: str = Field(description="状态: scheduled / queued / running / succeeded / failed")
+    created_at: float = Field(description="提交时间 (Unix 时间戳)")
+    scheduled_at: float = Field(description="计划执行时间 (Unix 时间戳)")
+    started_at: Optional[float] = Field(default=None, description="开始执行时间")
+    finished_at: Optional[float] = Field(default=None, description="完成时间")
+    result: Optional[dict[str, Any]] = Field(default=None, description="执行结果")
+    error: Optional[str] = Field(default=None, description="错误信息")
 
 
 class SceneSummary(BaseModel):
@@ -84,3 +225,82 @@ class ReloadResponse(BaseModel):
     message: str
     scenes_count: int = Field(default=0, description="场景数量")
     scenarios_count: int = Field(default=0, description="批量场景数量")
+    changes: dict[str, list[str]] = Field(
+        default_factory=dict,
+        description="变更摘要: added / changed / removed 为场景与批量场景 ID，environments 为有变化的环境名",
+    )
+
+
+class HistoryRecord(BaseModel):
+    """回调记录"""
+    id: int = Field(description="记录 ID (递增)")
+    ts: float = Field(description="发送开始时间 (Unix 时间戳)")
+    scene_id: str = Field(description="场景 ID")
+    env: str = Field(description="环境名称")
+    variables: dict[str, Any] = Field(default_factory=dict, description="渲染变量")
+    result: CallbackResponse = Field(description="执行结果 (含渲染后的请求与响应)")
+
+
+class HistoryResponse(BaseModel):
+    """回调记录查询响应"""
+    total: int = Field(description="匹配的记录数")
+    records: list[HistoryRecord] = Field(default_factory=list, description="记录 (最近的在前)")
+
+
+class ReplayResponse(BaseModel):
+    """回放结果"""
+    success: bool = Field(description="是否全部成功")
+    mode: str = Field(description="original / scaled / asap")
+    speed: float = Field(description="速度倍数，0 表示尽快发送")
+    concurrency: int = Field(description="最大在途请求数")
+    total: int = Field(description="发送总数")
+    success_count: int = Field(description="成功数")
+    failed_count: int = Field(description="失败数")
+    skipped: int = Field(default=0, description="无法回放的项数")
+    skipped_reasons: dict[str, int] = Field(default_factory=dict, description="按原因统计的跳过数 (invalid / scene_not_found)")
+    elapsed_s: float = Field(description="实际耗时秒数")
+    throughput_rps: float = Field(description="实际吞吐 (次/秒)")
+    bytes_received: int = Field(default=0, description="响应体总字节数")
+    latency_ms: dict[str, float] = Field(default_factory=dict, description="延迟分位 (min/mean/p50/p90/p99/p999/max)")
+    lag_ms: dict[str, float] = Field(default_factory=dict, description="实际发出时间相对计划时间的滞后分位")
+    status_counts: dict[str, int] = Field(default_factory=dict, description="按 HTTP 状态码计数")
+    error_counts: dict[str, int] = Field(default_factory=dict, description="按异常类型计数")
+
+
+class ReceiverResponse(BaseModel):
+    """接收端的预设响应"""
+    status: int = Field(default=200, ge=100, le=599, description="响应状态码")
+    headers: dict[str, str] = Field(default_factory=dict, description="响应头 (支持模板变量)")
+    body: str = Field(default="", description="响应体 (支持模板变量: 请求的查询参数、JSON 字段与 _path/_method/_request_id)")
+    latency_ms: float = Field(default=0.0, ge=0, le=600000, description="响应前等待毫秒数")
+
+
+class ReceiverRule(BaseModel):
+    """接收端规则: 按方法与路径匹配请求并返回预设响应"""
+    method: Optional[str] = Field(default=None, description="HTTP 方法，不填匹配全部")
+    path: str = Field(default="*", description="路径 (/mock 之后的部分)，支持 * ? 通配")
+    match_headers: dict[str, str] = Field(default_factory=dict, description="需要匹配的请求头 (值支持通配)")
+    responses: list[ReceiverResponse] = Field(
+        default_factory=lambda: [ReceiverResponse()], min_length=1,
+        description="按顺序返回的响应，用完后重复最后一个",
+    )
+
+
+class ReceivedRequest(BaseModel):
+    """接收端收到的请求"""
+    id: int = Field(description="请求 ID (递增)")
+    ts: float = Field(description="接收时间 (Unix 时间戳)")
+    method: str = Field(description="HTTP 方法")
+    path: str = Field(description="路径 (/mock 之后的部分)")
+    query: dict[str, str] = Field(default_factory=dict, description="查询参数")
+    headers: dict[str, str] = Field(default_factory=dict, description="请求头 (名称小写)")
+    body: str = Field(default="", description="请求体 (最多保留 receiver_body_bytes 字节)")
+    body_bytes: int = Field(default=0, description="请求体总字节数")
+    rule: Optional[str] = Field(default=None, description="命中的规则名")
+    response_status: int = Field(description="返回的状态码")
+
+
+class ReceivedRequestList(BaseModel):
+    """接收端请求查询响应"""
+    total: int = Field(description="匹配的请求数")
+    requests: list[ReceivedRequest] = Field(default_factory=list, description="请求 (最近的在前)")
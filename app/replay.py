@@ -0,0 +1,70 @@
+"""回放命令行入口
+
+使用方式:
+    curl "http://localhost:8000/api/history/export?since=2024-01-01T00:00:00" > capture.ndjson
+    python -m app.replay capture.ndjson --speed 10 --env staging
+    python -m app.replay capture.ndjson --speed 0 --concurrency 200 --json
+"""
+import argparse
+import asyncio
+import json
+
+from app.config import config
+from app.services.http_sender import http_sender
+from app.services.process_sender import process_sender
+from app.services.replay import replay_runner, read_capture
+from app.services.scene_loader import scene_loader
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.replay", description="回放录制的回调序列")
+    parser.add_argument("capture", help="录制文件 (NDJSON，GET /api/history/export 导出)")
+    parser.add_argument("--speed", type=float, default=1.0, help="速度倍数: 1 为原始间隔，0 为尽快发送")
+    parser.add_argument("--concurrency", type=int, default=100, help="最大在途请求数")
+    parser.add_argument("--processes", type=int, default=config.sender_processes, help="发送 worker 进程数，0 表示单进程")
+    parser.add_argument("--env", default=None, help="目标环境，该环境的变量覆盖录制的同名变量")
+    parser.add_argument("--scenes", default=config.scenes_file, help="场景配置文件")
+    parser.add_argument("--dry-run", action="store_true", help="仅渲染不发送")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    scene_loader.load(args.scenes)
+    process_sender.processes = args.processes
+    await http_sender.start()
+    await process_sender.start()
+    try:
+        result = await replay_runner.run(
+            read_capture(args.capture), args.speed, args.concurrency, args.env, args.dry_run
+        )
+    finally:
+        await process_sender.close()
+        await http_sender.close()
+    return result.to_replay_response(args.speed, args.concurrency).model_dump()
+
+
+def print_report(report: dict) -> None:
+    print(f"模式: {report['mode']}  速度 {report['speed']}x  并发上限 {report['concurrency']}")
+    print(f"发送: {report['total']}  成功 {report['success_count']}  失败 {report['failed_count']}  跳过 {report['skipped']}")
+    print(f"吞吐: {report['throughput_rps']} rps  耗时 {report['elapsed_s']}s")
+    print("延迟(ms): " + "  ".join(f"{key}={value}" for key, value in report["latency_ms"].items()))
+    if report["lag_ms"]:
+        print("调度滞后(ms): " + "  ".join(f"{key}={value}" for key, value in report["lag_ms"].items()))
+    if report["status_counts"]:
+        print("状态码: " + "  ".join(f"{key}={value}" for key, value in report["status_counts"].items()))
+    if report["error_counts"]:
+        print("异常: " + "  ".join(f"{key}={value}" for key, value in report["error_counts"].items()))
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
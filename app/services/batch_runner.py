@@ -0,0 +1,187 @@
+"""批量并发发送服务"""
+import asyncio
+import time
+from collections import ChainMap
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable, Mapping, Optional, Union
+
+from app.models.schemas import Scene, CallbackResponse, LatencyStats
+from app.services.histogram import LatencyHistogram
+from app.services.process_sender import bulk_sender
+
+VariableSets = Union[Iterable[dict], AsyncIterable[dict]]
+
+
+def latency_stats(histogram: LatencyHistogram) -> LatencyStats:
+    """由延迟直方图计算延迟统计 (毫秒)"""
+    if not histogram.total:
+        return LatencyStats()
+    summary = histogram.summary()
+    return LatencyStats(
+        min=round(summary["min"], 2),
+        avg=round(summary["mean"], 2),
+        p50=round(summary["p50"], 2),
+        p90=round(summary["p90"], 2),
+        p99=round(summary["p99"], 2),
+        max=round(summary["max"], 2),
+    )
+
+
+async def _aiter(items: VariableSets):
+    """将同步/异步可迭代对象统一为异步迭代"""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+class BatchResult:
+    """批量执行结果汇总 (延迟记录在直方图中，内存与发送总量无关)"""
+
+    def __init__(self, keep_results: bool = False):
+        self.keep_results = keep_results
+        self.total = 0
+        self.success_count = 0
+        self.status_counts: dict[str, int] = {}
+        self.histogram = LatencyHistogram()
+        self.results: list[CallbackResponse] = []
+        self.duration_ms = 0.0
+
+    def add(self, result: CallbackResponse, latency_ms: float, item: Optional[dict] = None) -> None:
+        """记录单次发送结果"""
+        self.total += 1
+        if result.success:
+            self.success_count += 1
+        if result.response_status is not None:
+            key = str(result.response_status)
+        else:
+            key = result.error_type or result.message
+        self.status_counts[key] = self.status_counts.get(key, 0) + 1
+        self.histogram.record(latency_ms)
+        if self.keep_results:
+            self.results.append(result)
+
+    @property
+    def failed_count(self) -> int:
+        return self.total - self.success_count
+
+    @property
+    def rps(self) -> float:
+        if self.duration_ms <= 0:
+            return 0.0
+        return round(self.total / (self.duration_ms / 1000), 2)
+
+
+class BatchRunner:
+    """以有限并发和目标速率批量执行同一场景
+
+    生产者按速率从变量集合中取数放入有界队列，固定数量的 worker 消费并发送，
+    因此输入可以是流式的，内存占用与总量无关。启用多进程发送时由 ProcessSender 发送。
+    """
+
+    async def run(
+        self,
+        scene: Scene,
+        variable_sets: VariableSets,
+        base_variables: Optional[Mapping[str, Any]] = None,
+        dry_run: bool = False,
+        concurrency: int = 50,
+        rate: Optional[float] = None,
+        keep_results: bool = False,
+        env: str = "",
+        capture_body: Optional[bool] = None,
+        result: Optional[Any] = None,
+    ) -> BatchResult:
+        """批量执行
+
+        Args:
+            scene: 场景配置
+            variable_sets: 每次发送的变量 (同步或异步可迭代)
+            base_variables: 公共基础变量，每项变量覆盖其上
+            dry_run: 仅渲染不发送
+            concurrency: 最大并发数
+            rate: 目标速率 (次/秒)，None 表示不限速
+            keep_results: 是否保留每次的 CallbackResponse
+            env: 环境名称，用于指标标签
+            capture_body: 是否保留响应体，None 时按场景的 capture_body
+            result: 结果汇总对象 (需实现 add(result, latency_ms, item))，默认为 BatchResult
+
+        Returns:
+            批量执行结果
+        """
+        base_variables = base_variables or {}
+        if result is None:
+            result = BatchResult(keep_results=keep_results)
+        sender = bulk_sender()
+
+        async def handle(item: dict):
+            variables = ChainMap(item, base_variables) if item else base_variables
+            send_start = time.perf_counter()
+            response = await sender.send(scene, variables, dry_run, env=env, capture_body=capture_body)
+            result.add(response, (time.perf_counter() - send_start) * 1000, item)
+
+        started = time.perf_counter()
+        await self.pump(variable_sets, handle, concurrency, rate)
+        result.duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    async def pump(
+        self,
+        items: VariableSets,
+        handle: Callable[[Any], Awaitable[None]],
+        concurrency: int = 50,
+        rate: Optional[float] = None,
+    ) -> None:
+        """以有限并发和目标速率对每一项调用 handle
+
+        Args:
+            items: 输入项 (同步或异步可迭代，按需读取)
+            handle: 处理单项的协程函数
+            concurrency: 最大并发数
+            rate: 目标速率 (次/秒)，None 表示不限速
+
+        Raises:
+            Exception: 读取输入或 handle 抛出的第一个异常 (此时取消其余任务)
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        interval = 1.0 / rate if rate else 0.0
+        done = object()
+
+        async def produce():
+            start = time.perf_counter()
+            index = 0
+            async for item in _aiter(items):
+                if interval:
+                    delay = start + index * interval - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                await queue.put(item)
+                index += 1
+            for _ in range(concurrency):
+                await queue.put(done)
+
+        async def work():
+            while True:
+                item = await queue.get()
+                if item is done:
+                    return
+                await handle(item)
+
+        # 生产者与 worker 一起监视: 任一抛出异常即停止，不会因 worker 全部退出
+        # 而让生产者永远阻塞在 queue.put
+        workers = [asyncio.create_task(work()) for _ in range(concurrency)]
+        tasks = [asyncio.create_task(produce()), *workers]
+        try:
+            finished, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in finished:
+                if task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# 全局实例
+batch_runner = BatchRunner()
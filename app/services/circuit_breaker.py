@@ -0,0 +1,66 @@
+"""目标主机熔断器"""
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """单个目标主机的熔断器
+
+    连续失败 (超时、连接错误或 5xx) 达到 threshold 次后打开，期间请求直接失败;
+    reset_timeout 秒后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开。
+    只在事件循环线程内使用，不加锁。
+    """
+
+    __slots__ = ("threshold", "reset_timeout", "state", "failures", "opened_at", "_probing", "rejected")
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        # 熔断期间拒绝的请求数
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """是否放行请求"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._probing = False
+        if self._probing:
+            self.rejected += 1
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def release(self) -> None:
+        """放行的请求未产生结果 (如被取消) 时归还探测名额"""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        """熔断器状态"""
+        stats = {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+        if self.state == OPEN:
+            stats["retry_in_s"] = round(max(self.reset_timeout - (time.monotonic() - self.opened_at), 0.0), 3)
+        return stats
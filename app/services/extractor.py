@@ -0,0 +1,150 @@
+"""响应提取器 - 从步骤响应中提取变量供后续步骤使用
+
+提取规则写法:
+    $.data.paymentId        JSONPath (支持 .key、['key']、[index]，index 可为负数)
+    header:X-Request-Id     响应头
+    regex:refundNo=(\\w+)   正则 (有分组时取第 1 组，否则取整个匹配)
+"""
+import json
+import re
+import time
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+JSONPATH_TOKEN = re.compile(r"\.([A-Za-z_][\w-]*)|\[(-?\d+)\]|\[(['\"])(.*?)\3\]")
+
+_MISSING = object()
+
+
+class Extractor:
+    """单个提取规则 (加载时编译)"""
+
+    __slots__ = ("name", "spec", "kind", "path", "header", "pattern")
+
+    def __init__(self, name: str, spec: str):
+        if not isinstance(spec, str):
+            raise ValueError(f"提取规则 {name} 必须是字符串，实际为 {type(spec).__name__}: {spec!r}")
+        self.name = name
+        self.spec = spec
+        self.path: tuple = ()
+        self.header = ""
+        self.pattern: Optional[re.Pattern] = None
+        if spec.startswith("$"):
+            self.kind = "json"
+            self.path = parse_jsonpath(spec)
+        elif spec.startswith("header:"):
+            self.kind = "header"
+            self.header = spec[len("header:"):].strip()
+            if not self.header:
+                raise ValueError(f"提取规则 {name} 缺少响应头名称")
+        elif spec.startswith("regex:"):
+            self.kind = "regex"
+            try:
+                self.pattern = re.compile(spec[len("regex:"):])
+            except re.error as e:
+                raise ValueError(f"提取规则 {name} 的正则无效: {e}")
+        else:
+            raise ValueError(f"提取规则 {name} 格式错误，应以 $、header: 或 regex: 开头: {spec}")
+
+
+def parse_jsonpath(expr: str) -> tuple:
+    """解析 JSONPath 子集为键/下标序列
+
+    Raises:
+        ValueError: 不支持的语法
+    """
+    steps = []
+    pos = 1
+    while pos < len(expr):
+        match = JSONPATH_TOKEN.match(expr, pos)
+        if match is None:
+            raise ValueError(f"不支持的 JSONPath: {expr}")
+        if match.group(1) is not None:
+            steps.append(match.group(1))
+        elif match.group(2) is not None:
+            steps.append(int(match.group(2)))
+        else:
+            steps.append(match.group(4))
+        pos = match.end()
+    return tuple(steps)
+
+
+def _resolve(data: Any, path: tuple) -> Any:
+    for step in path:
+        if isinstance(step, int):
+            if not isinstance(data, list) or not -len(data) <= step < len(data):
+                return _MISSING
+            data = data[step]
+        else:
+            if not isinstance(data, dict) or step not in data:
+                return _MISSING
+            data = data[step]
+    return data
+
+
+@lru_cache(maxsize=1024)
+def _compile(items: tuple[tuple[str, str], ...]) -> tuple[Extractor, ...]:
+    return tuple(Extractor(name, spec) for name, spec in items)
+
+
+def compile_extractors(spec: Mapping[str, str]) -> tuple[Extractor, ...]:
+    """编译提取规则 (相同规则复用编译结果)
+
+    Raises:
+        ValueError: 规则格式错误
+    """
+    if not isinstance(spec, Mapping):
+        raise ValueError(f"extract 应为 变量名: 提取规则 映射，实际为 {type(spec).__name__}")
+    for name, rule in spec.items():
+        if not isinstance(rule, str):
+            # 不可哈希的规则 (列表等) 在进入缓存前报错
+            raise ValueError(f"提取规则 {name} 必须是字符串，实际为 {type(rule).__name__}: {rule!r}")
+    return _compile(tuple(spec.items()))
+
+
+def run_extractors(
+    extractors: tuple[Extractor, ...],
+    body: bytes,
+    headers: Mapping[str, str],
+    encoding: str = "utf-8",
+) -> tuple[dict[str, Any], list[str], float]:
+    """对响应执行全部提取规则
+
+    响应体最多解析一次 JSON、解码一次文本，由全部规则共享。
+
+    Args:
+        extractors: 已编译的提取规则
+        body: 响应体 (已解压)
+        headers: 响应头
+        encoding: 响应体文本编码
+
+    Returns:
+        (提取到的变量, 未能提取的变量名, 耗时毫秒)
+    """
+    start = time.perf_counter()
+    values: dict[str, Any] = {}
+    missing: list[str] = []
+    text: Optional[str] = None
+    data: Any = _MISSING
+    for extractor in extractors:
+        value = _MISSING
+        if extractor.kind == "header":
+            value = headers.get(extractor.header, _MISSING)
+        elif extractor.kind == "json":
+            if data is _MISSING:
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    data = None
+            value = _resolve(data, extractor.path)
+        else:
+            if text is None:
+                text = body.decode(encoding, errors="replace")
+            match = extractor.pattern.search(text)
+            if match is not None:
+                value = match.group(1) if extractor.pattern.groups else match.group(0)
+        if value is _MISSING:
+            missing.append(extractor.name)
+        else:
+            values[extractor.name] = value
+    return values, missing, (time.perf_counter() - start) * 1000
@@ -0,0 +1,206 @@
+"""模板内置生成器
+
+    {{_uuid}}                      随机 UUID (v4)
+    {{_seq:name}}                  命名序列，从 1 开始单调递增，跨并发发送与 worker 进程唯一
+    {{_rand_int:1:9999}}           闭区间随机整数
+    {{_rand_choice:a,b,c}}         随机选择一项
+    {{_sha256}}                    已渲染请求体的摘要 (支持 md5 / sha1 / sha256 / sha512)
+    {{_hmac_sha256:secretVar}}     以变量 secretVar 的值为密钥对已渲染请求体做 HMAC (hex)
+    {{_hmac_sha256:secretVar:base64}}  同上，base64 编码
+
+生成器在模板加载时解析参数，只在渲染时被引用才求值; 摘要/签名依赖请求体，
+只能用在 URL 与请求头中。
+
+同一模板中每次出现的生成器各自求值 ({"a": "{{_uuid}}", "b": "{{_uuid}}"} 得到两个
+不同的 UUID); 同一次发送的不同模板 (URL、请求头、请求体) 之间，同一表达式的第 n 次
+出现取同一个值，例如 URL 与请求体中的 {{_seq:order}} 一致。重试沿用已生成的值。
+"""
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import random
+import threading
+import uuid
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+HASH_ALGORITHMS = ("md5", "sha1", "sha256", "sha512")
+
+GENERATOR_NAMES = frozenset(
+    {"_uuid", "_seq", "_rand_int", "_rand_choice"}
+    | {f"_{algorithm}" for algorithm in HASH_ALGORITHMS}
+    | {f"_hmac_{algorithm}" for algorithm in HASH_ALGORITHMS}
+)
+
+
+class SequenceLockTimeout(RuntimeError):
+    """等待序列计数器的进程间锁超时 (持锁进程可能已退出)"""
+
+
+class SequenceStore:
+    """跨进程共享的命名计数器
+
+    计数器保存在共享内存的开放寻址表中 (名称哈希 -> 当前值)，递增在进程间锁内完成;
+    名称所在槽位确定后缓存在本进程，之后每次取值只有一次加锁读写。
+    多进程发送时 worker 在启动时 attach 到 API 进程创建的同一块共享内存。
+
+    next() 在事件循环中直接获取进程间锁: 锁内只有槽位读写 (名称哈希在锁外计算，
+    首次使用某名称时才在锁内探测槽位)，持有时间为微秒级，任何进程都不会在持锁时
+    等待 IO，正常情况下阻塞等待的时间可以忽略，不必交给线程池。
+    但 worker 进程若在持锁期间被杀死，锁不会被释放，因此获取锁最多等待
+    LOCK_TIMEOUT 秒，超时抛出 SequenceLockTimeout，本次发送返回失败而不是挂起事件循环。
+    """
+
+    SLOTS = 4096
+    # 正常持锁为微秒级，超时即可认为持锁进程已异常退出
+    LOCK_TIMEOUT = 0.1
+
+    def __init__(self):
+        self._keys = None
+        self._values = None
+        self._lock = None
+        self._slots: dict[str, int] = {}
+        self._init_lock = threading.Lock()
+
+    def _ensure(self) -> None:
+        if self._values is not None:
+            return
+        with self._init_lock:
+            if self._values is None:
+                ctx = multiprocessing.get_context("spawn")
+                self._keys = ctx.RawArray("Q", self.SLOTS)
+                self._lock = ctx.Lock()
+                self._values = ctx.RawArray("q", self.SLOTS)
+
+    def shared(self) -> tuple:
+        """共享内存句柄，作为 worker 进程启动参数传递"""
+        self._ensure()
+        return self._keys, self._values, self._lock
+
+    def attach(self, shared: tuple) -> None:
+        """使用其他进程创建的共享计数器 (worker 启动时调用)"""
+        self._keys, self._values, self._lock = shared
+        self._slots.clear()
+
+    @staticmethod
+    def _key(name: str) -> int:
+        return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little") or 1
+
+    def _slot(self, key: int) -> int:
+        """查找或占用名称哈希对应的槽位 (调用方持有锁)"""
+        slot = key % self.SLOTS
+        for _ in range(self.SLOTS):
+            current = self._keys[slot]
+            if current == key:
+                return slot
+            if current == 0:
+                self._keys[slot] = key
+                return slot
+            slot = (slot + 1) % self.SLOTS
+        raise RuntimeError(f"序列计数器数量超过上限 {self.SLOTS}")
+
+    def _acquire(self) -> None:
+        if not self._lock.acquire(timeout=self.LOCK_TIMEOUT):
+            raise SequenceLockTimeout(f"序列计数器锁等待超过 {self.LOCK_TIMEOUT}s，持锁的 worker 进程可能已退出")
+
+    def next(self, name: str) -> int:
+        """取命名序列的下一个值
+
+        Raises:
+            SequenceLockTimeout: 进程间锁等待超时
+        """
+        self._ensure()
+        slot = self._slots.get(name)
+        if slot is None:
+            key = self._key(name)
+            self._acquire()
+            try:
+                slot = self._slot(key)
+            finally:
+                self._lock.release()
+            self._slots[name] = slot
+        self._acquire()
+        try:
+            value = self._values[slot] + 1
+            self._values[slot] = value
+        finally:
+            self._lock.release()
+        return value
+
+
+@lru_cache(maxsize=256)
+def _hmac_base(algorithm: str, key: bytes) -> hmac.HMAC:
+    """按密钥缓存已初始化的 HMAC 对象，每次签名 copy 后更新"""
+    return hmac.new(key, digestmod=algorithm)
+
+
+class Generator:
+    """模板中的一个生成器表达式 (加载时解析参数)
+
+    调用时返回生成的字符串; 依赖的变量或请求体不可用时返回 None，由渲染器保留原样。
+    """
+
+    __slots__ = ("expr", "name", "params", "stable", "key")
+
+    def __init__(self, name: str, args: Optional[str], occurrence: int = 0):
+        self.name = name
+        self.expr = name if args is None else f"{name}:{args}"
+        self.params: tuple = ()
+        # 不依赖请求体的生成器在同一渲染上下文中按 key 只求值一次
+        self.stable = name in ("_uuid", "_seq", "_rand_int", "_rand_choice")
+        # 渲染上下文中的取值键: 表达式 + 在所在模板中第几次出现
+        self.key = (self.expr, occurrence)
+
+        if name == "_seq":
+            if not args:
+                raise ValueError("{{_seq:name}} 缺少序列名")
+            self.params = (args,)
+        elif name == "_rand_int":
+            bounds = (args or "").split(":")
+            try:
+                low, high = int(bounds[0]), int(bounds[1])
+            except (ValueError, IndexError):
+                raise ValueError(f"{{{{{self.expr}}}}} 格式应为 _rand_int:最小值:最大值")
+            if len(bounds) != 2 or low > high:
+                raise ValueError(f"{{{{{self.expr}}}}} 格式应为 _rand_int:最小值:最大值")
+            self.params = (low, high)
+        elif name == "_rand_choice":
+            if not args:
+                raise ValueError("{{_rand_choice:a,b,c}} 缺少候选项")
+            self.params = tuple(args.split(","))
+        elif name.startswith("_hmac_"):
+            parts = (args or "").split(":")
+            if not parts[0] or len(parts) > 2 or (len(parts) == 2 and parts[1] not in ("hex", "base64")):
+                raise ValueError(f"{{{{{self.expr}}}}} 格式应为 {name}:密钥变量名[:hex|base64]")
+            self.params = (name[len("_hmac_"):], parts[0], parts[1] if len(parts) == 2 else "hex")
+        elif args is not None:
+            raise ValueError(f"{{{{{name}}}}} 不接受参数")
+
+    def __call__(self, body: Optional[str], variables: Mapping[str, Any]) -> Optional[str]:
+        name = self.name
+        if name == "_uuid":
+            return str(uuid.uuid4())
+        if name == "_seq":
+            return str(sequences.next(self.params[0]))
+        if name == "_rand_int":
+            return str(random.randint(*self.params))
+        if name == "_rand_choice":
+            return random.choice(self.params)
+        if body is None:
+            return None
+        if name.startswith("_hmac_"):
+            algorithm, key_name, encoding = self.params
+            key = variables.get(key_name)
+            if key is None:
+                return None
+            mac = _hmac_base(algorithm, str(key).encode()).copy()
+            mac.update(body.encode())
+            if encoding == "base64":
+                return base64.b64encode(mac.digest()).decode()
+            return mac.hexdigest()
+        return hashlib.new(name[1:], body.encode()).hexdigest()
+
+
+# 全局实例
+sequences = SequenceStore()
@@ -0,0 +1,88 @@
+"""HDR 风格延迟直方图"""
+from typing import Optional
+
+
+class LatencyHistogram:
+    """对数-线性分桶的延迟直方图 (微秒精度)
+
+    每个 2 的幂区间划分为 2^SUB_BUCKET_BITS 个等宽子桶，相对误差 < 1%。
+    桶数组在构造时预分配，记录只是一次整数运算加计数，可跨进程合并。
+    """
+
+    SUB_BUCKET_BITS = 7
+    SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+
+    def __init__(self, max_value_ms: float = 60_000.0):
+        self.max_value_us = int(max_value_ms * 1000)
+        self.counts = [0] * (self._index(self.max_value_us) + 1)
+        self.total = 0
+        self.sum_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+
+    def _index(self, value_us: int) -> int:
+        if value_us < 2 * self.SUB_BUCKET_COUNT:
+            return value_us
+        shift = value_us.bit_length() - self.SUB_BUCKET_BITS - 1
+        return (shift + 1) * self.SUB_BUCKET_COUNT + (value_us >> shift) - self.SUB_BUCKET_COUNT
+
+    def _highest_equivalent(self, index: int) -> int:
+        """桶内最大值 (微秒)"""
+        if index < 2 * self.SUB_BUCKET_COUNT:
+            return index
+        shift = index // self.SUB_BUCKET_COUNT - 1
+        return ((index - shift * self.SUB_BUCKET_COUNT + 1) << shift) - 1
+
+    def record(self, latency_ms: float) -> None:
+        """记录一次延迟 (毫秒)，超出上限的值计入最高桶"""
+        value_us = min(max(int(latency_ms * 1000), 0), self.max_value_us)
+        self.counts[self._index(value_us)] += 1
+        self.total += 1
+        self.sum_us += value_us
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """合并另一个相同量程的直方图"""
+        if len(other.counts) != len(self.counts):
+            raise ValueError("直方图量程不一致，无法合并")
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, q: float) -> float:
+        """百分位延迟 (毫秒)
+
+        Args:
+            q: 百分位 (0-100)
+        """
+        if not self.total:
+            return 0.0
+        target = max(int(self.total * q / 100 + 0.5), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self) -> dict[str, float]:
+        """常用统计 (毫秒)"""
+        if not self.total:
+            return {key: 0.0 for key in ("min", "mean", "p50", "p90", "p99", "p999", "max")}
+        return {
+            "min": round(self.min_us / 1000, 3),
+            "mean": round(self.sum_us / self.total / 1000, 3),
+            "p50": round(self.percentile(50), 3),
+            "p90": round(self.percentile(90), 3),
+            "p99": round(self.percentile(99), 3),
+            "p999": round(self.percentile(99.9), 3),
+            "max": round(self.max_us / 1000, 3),
+        }
@@ -0,0 +1,382 @@
+"""回调记录存储 - 追加写入的分段日志 + 内存索引"""
+import asyncio
+import json
+import os
+import time
+from typing import Any, Iterator, Mapping, NamedTuple, Optional
+
+from app.config import config
+from app.models.schemas import CallbackResponse, HistoryRecord, Scene
+from app.services.renderer import renderer
+
+SEGMENT_SUFFIX = ".log"
+# 空闲时执行保留策略的间隔秒数
+RETENTION_INTERVAL = 60.0
+
+
+def secret_variables(scene: Scene) -> frozenset[str]:
+    """场景中作为密钥使用的变量名: signing.key 引用的变量与 {{_hmac_*:var}} 的密钥变量"""
+    names: set[str] = set()
+    if scene.signing is not None and scene.signing.key:
+        names.update(
+            name for _, name, _, _, generator in renderer.compile(scene.signing.key).slots if generator is None
+        )
+    for template in (scene.url, scene.body, *scene.headers.values()):
+        if not template:
+            continue
+        for _, _, _, _, generator in renderer.compile(template).slots:
+            if generator is not None and generator.name.startswith("_hmac_"):
+                names.add(generator.params[1])
+    return frozenset(names)
+
+
+class HistoryEntry(NamedTuple):
+    """内存索引项，完整记录在分段文件中"""
+    id: int
+    ts: float
+    scene_id: str
+    env: str
+    status: Optional[int]
+    success: bool
+    segment: int
+    offset: int
+    length: int
+
+
+class HistoryStore:
+    """回调记录存储
+
+    发送路径只把结果追加到内存缓冲区; 后台任务按 flush_interval 或缓冲区达到
+    batch_size 时在线程中批量序列化并追加写入当前分段文件。每行格式为
+    `[id, ts, scene, env, status, success]<TAB>记录 JSON`，启动时只需解析
+    行首即可重建索引。分段文件超过 segment_bytes 后滚动，超出 max_bytes
+    或最后一条记录早于 max_age 的旧分段整段删除; 保留策略在每次写入后以及
+    空闲时每 RETENTION_INTERVAL 秒执行一次。
+
+    作为密钥使用的变量 (见 secret_variables) 不写入记录，回放时取场景默认值或环境变量。
+    """
+
+    def __init__(
+        self,
+        directory: str = ".history",
+        enabled: bool = True,
+        segment_bytes: int = 16 * 1024 * 1024,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age: float = 7 * 86400,
+        flush_interval: float = 0.5,
+        batch_size: int = 500,
+        max_pending: int = 100000,
+    ):
+        self.directory = directory
+        self.enabled = enabled
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._pending: list[tuple[int, float, str, str, Mapping[str, Any], frozenset, CallbackResponse]] = []
+        self._index: list[HistoryEntry] = []
+        # 分段序号 → [大小, 最后一条记录时间]
+        self._segments: dict[int, list] = {}
+        self._next_id = 1
+        self._dropped = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+        # 场景 ID → (场景对象, 密钥变量名)，场景重载后自动失效
+        self._secrets: dict[str, tuple[Scene, frozenset]] = {}
+
+    @property
+    def started(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        """加载已有分段并启动后台写入任务 (幂等)"""
+        if self.started or not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        await asyncio.to_thread(self._load_segments)
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        await self.apply_retention()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        """通知后台任务写完剩余记录后退出，并等待其结束
+
+        不取消后台任务，避免中断线程中进行的写入后再与之并发写入。
+        """
+        if not self.started:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def record(self, scene: Scene, env: str, variables: Mapping[str, Any], result: CallbackResponse) -> None:
+        """记录一次发送 (只追加到内存缓冲区，不做 IO)
+
+        缓冲区超过 max_pending 时丢弃并计数，不阻塞发送。
+        """
+        if not self.started or self._stopping:
+            return
+        if len(self._pending) >= self.max_pending:
+            self._dropped += 1
+            return
+        secrets = self._secrets.get(scene.id)
+        if secrets is None or secrets[0] is not scene:
+            secrets = self._secrets[scene.id] = (scene, secret_variables(scene))
+        ts = time.time() - (result.duration_ms or 0) / 1000
+        self._pending.append((self._next_id, ts, scene.id, env, variables, secrets[1], result))
+        self._next_id += 1
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """把缓冲区写入分段文件并执行保留策略"""
+        if not self._pending:
+            return
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            if not self._segments:
+                self._segments[1] = [0, 0.0]
+            segment = next(reversed(self._segments))
+            entries, segments = await asyncio.to_thread(self._write, batch, segment, self._segments[segment][0])
+            self._index.extend(entries)
+            self._segments.update(segments)
+        await self.apply_retention()
+
+    async def apply_retention(self) -> None:
+        """删除超出容量或过期的旧分段"""
+        async with self._flush_lock:
+            expired = self._expired_segments()
+            if expired:
+                self._index = [entry for entry in self._index if entry.segment not in expired]
+                await asyncio.to_thread(self._remove_segments, expired)
+
+    async def _flush_loop(self) -> None:
+        last_retention = time.monotonic()
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                # 空闲时没有写入也定期执行保留策略 (max_age)
+                if time.monotonic() - last_retention >= RETENTION_INTERVAL:
+                    last_retention = time.monotonic()
+                    await self.apply_retention()
+            except Exception as e:
+                print(f"⚠️  回调记录写入失败: {e}")
+        # 停止前最后一次写入 (上一轮写入期间追加的记录)
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"⚠️  回调记录写入失败: {e}")
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:08d}{SEGMENT_SUFFIX}")
+
+    def _load_segments(self) -> None:
+        """扫描已有分段重建索引"""
+        segments = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit()
+        )
+        for segment in segments:
+            offset = 0
+            last_ts = 0.0
+            with open(self._segment_path(segment), "rb") as f:
+                for line in f:
+                    header, sep, _ = line.partition(b"\t")
+                    if not sep or not line.endswith(b"\n"):
+                        # 异常退出时可能遗留不完整的最后一行
+                        break
+                    record_id, ts, scene_id, env, status, success = json.loads(header)
+                    self._index.append(HistoryEntry(
+                        record_id, ts, scene_id, env, status, success, segment, offset, len(line)
+                    ))
+                    offset += len(line)
+                    last_ts = ts
+            if os.path.getsize(self._segment_path(segment)) != offset:
+                os.truncate(self._segment_path(segment), offset)
+            self._segments[segment] = [offset, last_ts]
+        if self._index:
+            self._next_id = self._index[-1].id + 1
+
+    def _write(self, batch: list, segment: int, size: int) -> tuple[list[HistoryEntry], dict[int, list]]:
+        """序列化并追加写入 (在线程中执行)
+
+        Args:
+            batch: 待写入的记录
+            segment: 当前分段序号
+            size: 当前分段已写入字节数
+
+        Returns:
+            (新索引项, 变化的分段信息)
+        """
+        entries: list[HistoryEntry] = []
+        segments: dict[int, list] = {}
+        lines: list[bytes] = []
+        offset = size
+
+        def write_out():
+            if lines:
+                with open(self._segment_path(segment), "ab") as f:
+                    f.write(b"".join(lines))
+                lines.clear()
+
+        for record_id, ts, scene_id, env, variables, secrets, result in batch:
+            if size >= self.segment_bytes:
+                write_out()
+                segment += 1
+                size = offset = 0
+            header = [record_id, ts, scene_id, env, result.response_status, result.success]
+            record = {
+                "variables": {key: value for key, value in variables.items() if key not in secrets},
+                "result": result.model_dump(exclude_none=True),
+            }
+            line = (
+                json.dumps(header, ensure_ascii=False, separators=(",", ":"))
+                + "\t"
+                + json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str)
+                + "\n"
+            ).encode("utf-8")
+            lines.append(line)
+            entries.append(HistoryEntry(record_id, ts, scene_id, env, header[4], result.success, segment, offset, len(line)))
+            offset += len(line)
+            size += len(line)
+            segments[segment] = [size, ts]
+        write_out()
+        return entries, segments
+
+    def _expired_segments(self) -> set[int]:
+        """超出容量或过期的旧分段 (当前写入的分段除外)"""
+        segments = list(self._segments)
+        expired: set[int] = set()
+        total = sum(size for size, _ in self._segments.values())
+        cutoff = time.time() - self.max_age
+        for segment in segments[:-1]:
+            size, last_ts = self._segments[segment]
+            if total > self.max_bytes or last_ts < cutoff:
+                expired.add(segment)
+                total -= size
+        for segment in expired:
+            del self._segments[segment]
+        return expired
+
+    def _remove_segments(self, segments: set[int]) -> None:
+        for segment in segments:
+            try:
+                os.remove(self._segment_path(segment))
+            except FileNotFoundError:
+                pass
+
+    def query(
+        self,
+        scene_id: Optional[str] = None,
+        env: Optional[str] = None,
+        status: Optional[int] = None,
+        success: Optional[bool] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> Iterator[HistoryEntry]:
+        """按条件过滤索引 (最近的在前)
+
+        Args:
+            scene_id: 场景 ID
+            env: 环境名称
+            status: 响应状态码
+            success: 是否成功
+            since: 起始时间 (Unix 时间戳，含)
+            until: 结束时间 (Unix 时间戳，不含)
+        """
+        for entry in reversed(self._index):
+            if until is not None and entry.ts >= until:
+                continue
+            if since is not None and entry.ts < since:
+                # 索引按发送完成顺序追加，ts 为发送开始时间，不能据此提前结束
+                continue
+            if scene_id is not None and entry.scene_id != scene_id:
+                continue
+            if env is not None and entry.env != env:
+                continue
+            if status is not None and entry.status != status:
+                continue
+            if success is not None and entry.success != success:
+                continue
+            yield entry
+
+    def read(self, entries: list[HistoryEntry]) -> list[HistoryRecord]:
+        """按索引读取完整记录 (可在线程中执行); 已被保留策略删除的记录跳过"""
+        records: list[HistoryRecord] = []
+        files: dict[int, Any] = {}
+        try:
+            for entry in entries:
+                f = files.get(entry.segment)
+                if f is None:
+                    try:
+                        f = files[entry.segment] = open(self._segment_path(entry.segment), "rb")
+                    except FileNotFoundError:
+                        continue
+                f.seek(entry.offset)
+                line = f.read(entry.length)
+                _, _, body = line.partition(b"\t")
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    continue
+                records.append(HistoryRecord(
+                    id=entry.id,
+                    ts=entry.ts,
+                    scene_id=entry.scene_id,
+                    env=entry.env,
+                    variables=data["variables"],
+                    result=CallbackResponse.model_construct(**data["result"]),
+                ))
+        finally:
+            for f in files.values():
+                f.close()
+        return records
+
+    def get(self, record_id: int) -> Optional[HistoryEntry]:
+        """按记录 ID 查找索引项"""
+        index = self._index
+        lo, hi = 0, len(index)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if index[mid].id < record_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(index) and index[lo].id == record_id:
+            return index[lo]
+        return None
+
+    def stats(self) -> dict:
+        """存储统计信息"""
+        return {
+            "enabled": self.enabled,
+            "records": len(self._index),
+            "pending": len(self._pending),
+            "dropped": self._dropped,
+            "segments": len(self._segments),
+            "bytes": sum(size for size, _ in self._segments.values()),
+        }
+
+
+# 全局实例
+history_store = HistoryStore(
+    directory=config.history_dir,
+    enabled=config.history_enabled,
+    segment_bytes=config.history_segment_bytes,
+    max_bytes=config.history_max_bytes,
+    max_age=config.history_max_age,
+    flush_interval=config.history_flush_interval,
+)
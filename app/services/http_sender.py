@@ -1,23 +1,240 @@
 """HTTP 发送服务"""
+import asyncio
+import codecs
+import importlib.util
 import time
-from typing import Optional
+from typing import Any, Mapping, Optional, Sequence
 import httpx
 
+from app.config import config
 from app.models.schemas import Scene, CallbackResponse
-from app.services.renderer import renderer
+from app.services.renderer import RenderContext, renderer
+from app.services.signer import signer
+from app.services.metrics import metrics
+from app.services.history import history_store
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.retry import CIRCUIT_OPEN, backoff_delay, should_retry
+from app.services.rate_limiter import host_key, rate_limiter
+from app.services.extractor import Extractor, run_extractors
+
+# 按 Content-Encoding 构造解码器，只解压需要保留的前缀; 这些类在 httpx 内部模块中，
+# 不同版本中不存在时退回 aiter_bytes (整个响应体都会解压)
+try:
+    from httpx._decoders import SUPPORTED_DECODERS, IdentityDecoder, MultiDecoder
+except ImportError:
+    SUPPORTED_DECODERS = None
+
+
+def _content_decoder(response: httpx.Response):
+    """与 httpx 相同规则的响应体解码器，httpx 内部接口不可用时返回 None"""
+    if SUPPORTED_DECODERS is None:
+        return None
+    decoders = []
+    for value in response.headers.get_list("content-encoding", split_commas=True):
+        decoder_cls = SUPPORTED_DECODERS.get(value.strip().lower())
+        if decoder_cls is not None:
+            decoders.append(decoder_cls())
+    if len(decoders) == 1:
+        return decoders[0]
+    if decoders:
+        return MultiDecoder(children=decoders)
+    return IdentityDecoder()
 
 
 class HttpSender:
-    """HTTP 请求发送器"""
+    """HTTP 请求发送器
+
+    所有回调共享一个长连接的 httpx.AsyncClient，由应用 lifespan 负责
+    start()/close()。单个目标主机的并发连接数通过信号量限制，连续失败时
+    由该主机的熔断器快速失败。场景配置了 retry 时按退避策略重新发送。
+    配置了限流的场景或目标主机，超出速率的请求在共享令牌桶中排队。
+    响应体流式读取，只保留前 capture_bytes 字节，其余只计数不缓存。
+    """
 
-    def __init__(self, timeout: float = 30.0):
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        max_connections: int = 200,
+        max_connections_per_host: int = 50,
+        max_keepalive_connections: int = 100,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        breaker_threshold: int = 5,
+        breaker_reset_timeout: float = 30.0,
+        capture_bytes: int = 2000,
+        extract_max_bytes: int = 1024 * 1024,
+        record_metrics: bool = True,
+        rate_limit: bool = True,
+    ):
         self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        # HTTP/2 依赖可选的 h2 包，未安装时退回 HTTP/1.1
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        # 连续失败多少次后熔断，0 表示不熔断
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
+        # 响应体最多保留的字节数
+        self.capture_bytes = capture_bytes
+        # 配置了提取规则时最多读取的响应体字节数
+        self.extract_max_bytes = extract_max_bytes
+        # 多进程 worker 中关闭，由 API 进程根据回传结果记录指标与回调记录
+        self.record_metrics = record_metrics
+        # 多进程 worker 中关闭，由 API 进程在分发前限流
+        self.rate_limit = rate_limit
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._host_in_flight: dict[str, int] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    async def start(self) -> httpx.AsyncClient:
+        """创建共享连接池 (幂等)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """关闭共享连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._host_limits.clear()
+        # 不清空 _host_in_flight: 关闭时仍在进行的请求结束后会各自减回计数
+        self._breakers.clear()
+
+    def _host_key(self, url: str) -> str:
+        """按 scheme://host:port 区分目标主机"""
+        return host_key(url)
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        """获取目标主机的并发信号量"""
+        semaphore = self._host_limits.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_limits[host] = semaphore
+        return semaphore
+
+    def _breaker(self, host: str) -> Optional[CircuitBreaker]:
+        """获取目标主机的熔断器 (未启用时为 None)"""
+        if self.breaker_threshold <= 0:
+            return None
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(self.breaker_threshold, self.breaker_reset_timeout)
+            self._breakers[host] = breaker
+        return breaker
+
+    def breaker_stats(self) -> dict:
+        """各目标主机的熔断器状态"""
+        return {host: breaker.stats() for host, breaker in self._breakers.items()}
+
+    def pool_stats(self) -> dict:
+        """连接池统计信息
+
+        连接数来自 httpx 传输层内部的 httpcore 连接池 (没有公开接口); 所依赖的
+        属性不存在 (httpx/httpcore 版本变化) 时 open/idle/in_use 为 None。
+
+        Returns:
+            包含 open/idle/in_use 连接数及各主机在途请求数的字典
+        """
+        open_count: Optional[int] = 0
+        idle_count: Optional[int] = 0
+        in_use_count: Optional[int] = 0
+        client = self._client
+        if client is not None and not client.is_closed:
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            try:
+                for conn in list(pool.connections):
+                    if conn.is_closed():
+                        continue
+                    open_count += 1
+                    if conn.is_idle():
+                        idle_count += 1
+                    else:
+                        in_use_count += 1
+            except (AttributeError, TypeError):
+                open_count = idle_count = in_use_count = None
+
+        return {
+            "started": client is not None and not client.is_closed,
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_connections_per_host": self.max_connections_per_host,
+            "open": open_count,
+            "idle": idle_count,
+            "in_use": in_use_count,
+            "hosts": {
+                host: count for host, count in self._host_in_flight.items() if count
+            },
+        }
+
+    async def _read_body(self, response: httpx.Response, keep: int) -> tuple[bytes, int]:
+        """流式读取响应体
+
+        只解压并保留前 keep 字节，其余数据块只计数后丢弃; keep 为 0 时完全跳过解压。
+
+        Args:
+            response: 以 stream 方式发出的响应
+            keep: 保留的字节数
+
+        Returns:
+            (已解压的响应体前缀, 响应体总字节数)
+        """
+        total = 0
+        if keep <= 0:
+            async for chunk in response.aiter_raw():
+                total += len(chunk)
+            return b"", total
+
+        decoder = _content_decoder(response)
+        prefix = bytearray()
+        if decoder is None:
+            async for chunk in response.aiter_bytes():
+                if len(prefix) < keep:
+                    prefix += chunk
+            return bytes(prefix[:keep]), response.num_bytes_downloaded
+
+        async for chunk in response.aiter_raw():
+            total += len(chunk)
+            if len(prefix) < keep:
+                prefix += decoder.decode(chunk)
+        if len(prefix) < keep:
+            prefix += decoder.flush()
+        return bytes(prefix[:keep]), total
+
+    @staticmethod
+    def _encoding(response: httpx.Response) -> str:
+        """响应体文本编码，未声明或无法识别时为 utf-8"""
+        encoding = response.charset_encoding or "utf-8"
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            return "utf-8"
+        return encoding
+
+    @staticmethod
+    def _decode_prefix(data: bytes, encoding: str) -> str:
+        # final=False: 截断处不完整的多字节字符直接丢弃
+        return codecs.getincrementaldecoder(encoding)(errors="replace").decode(data, final=False)
 
     async def send(
         self,
         scene: Scene,
-        variables: dict,
-        dry_run: bool = False
+        variables: Mapping[str, Any],
+        dry_run: bool = False,
+        env: str = "",
+        capture_body: Optional[bool] = None,
+        extractors: Sequence[Extractor] = (),
     ) -> CallbackResponse:
         """执行 HTTP 请求
 
@@ -25,19 +242,112 @@ class HttpSender:
             scene: 场景配置
             variables: 渲染变量 (已合并 defaults、query params、body)
             dry_run: 仅渲染不发送
+            env: 环境名称，用于指标标签
+            capture_body: 是否保留响应体，None 时按场景的 capture_body
+            extractors: 从 2xx 响应中提取变量的规则，结果写入 extracted
 
         Returns:
             回调响应
         """
+        if capture_body is None:
+            capture_body = scene.capture_body
+        if dry_run or not self.record_metrics:
+            return await self._send_with_retry(scene, variables, dry_run, capture_body, extractors)
+
+        series = metrics.series(scene.id, env)
+        series.in_flight += 1
+        try:
+            result = await self._send_with_retry(scene, variables, dry_run, capture_body, extractors)
+        finally:
+            series.in_flight -= 1
+        series.observe(result)
+        history_store.record(scene, env, variables, result)
+        return result
+
+    async def _send_with_retry(
+        self,
+        scene: Scene,
+        variables: Mapping[str, Any],
+        dry_run: bool,
+        capture_body: bool = True,
+        extractors: Sequence[Extractor] = (),
+    ) -> CallbackResponse:
+        """按场景的重试策略发送
+
+        每次发送完成后若需重试，用 loop.call_later 在退避时间后启动下一次发送，
+        等待期间不占用主机并发名额，也没有协程在原地休眠; 调用方等待最终结果。
+        各次发送共享同一个渲染上下文，{{_uuid}}、{{_seq:name}} 等生成值保持不变。
+        """
+        policy = scene.retry
+        if dry_run or policy is None or policy.max_attempts <= 1:
+            return await self._send(scene, variables, dry_run, capture_body, extractors)
+
+        loop = asyncio.get_running_loop()
+        done: asyncio.Future = loop.create_future()
+        pending: list = []
+        started = time.perf_counter()
+        context = RenderContext()
+
+        def launch(attempt: int) -> None:
+            if done.done():
+                return
+            task = loop.create_task(self._send(scene, variables, False, capture_body, extractors, context))
+            pending[:] = [task]
+            task.add_done_callback(lambda t: finish(attempt, t))
+
+        def finish(attempt: int, task: asyncio.Task) -> None:
+            if done.done() or task.cancelled():
+                return
+            result = task.result()
+            if attempt < policy.max_attempts and should_retry(policy, result):
+                pending[:] = [loop.call_later(backoff_delay(policy, attempt), launch, attempt + 1)]
+                return
+            result.attempts = attempt
+            if result.timings is not None:
+                result.timings["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            done.set_result(result)
+
+        launch(1)
+        try:
+            return await done
+        finally:
+            # 调用方被取消时停止后续重试
+            for handle in pending:
+                handle.cancel()
+
+    async def _send(
+        self,
+        scene: Scene,
+        variables: Mapping[str, Any],
+        dry_run: bool,
+        capture_body: bool = True,
+        extractors: Sequence[Extractor] = (),
+        context: Optional[RenderContext] = None,
+    ) -> CallbackResponse:
+        """渲染并发送请求，所有异常转为失败响应"""
         try:
+            render_start = time.perf_counter()
+            if context is None:
+                context = RenderContext()
+
+            # 先渲染 body，URL 与 headers 中的摘要/签名基于渲染后的 body
+            body = renderer.render(scene.body, variables, context) if scene.body else None
+            context.body = body
+
             # 渲染 URL
-            url = renderer.render(scene.url, variables)
+            url = renderer.render(scene.url, variables, context)
 
             # 渲染 headers
-            headers = renderer.render_dict(scene.headers, variables)
+            headers = renderer.render_dict(scene.headers, variables, context)
 
-            # 渲染 body
-            body = renderer.render(scene.body, variables) if scene.body else None
+            render_ms = (time.perf_counter() - render_start) * 1000
+            timings = {"render_ms": round(render_ms, 3)}
+
+            # 对渲染后的 body 签名，签名头覆盖同名的场景 headers
+            if scene.signing is not None:
+                sign_start = time.perf_counter()
+                headers.update(signer.sign(scene, body, variables, context))
+                timings["sign_ms"] = round((time.perf_counter() - sign_start) * 1000, 3)
 
             if dry_run:
                 return CallbackResponse(
@@ -49,24 +359,79 @@ class HttpSender:
                     request_method=scene.method,
                     request_headers=headers,
                     request_body=body,
+                    timings=timings,
                 )
 
             # 实际发送请求
-            start_time = time.time()
-
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.request(
-                    method=scene.method,
-                    url=url,
-                    headers=headers,
-                    content=body,
+            client = await self.start()
+            host = self._host_key(url)
+
+            if self.rate_limit and rate_limiter.has_limits(scene):
+                waited = await rate_limiter.acquire(scene, host)
+                timings["throttle_ms"] = round(waited * 1000, 3)
+
+            breaker = self._breaker(host)
+            if breaker is not None and not breaker.allow():
+                return CallbackResponse(
+                    success=False,
+                    message=f"目标主机熔断中: {host}",
+                    scene_id=scene.id,
+                    scene_name=scene.name,
+                    request_url=url,
+                    request_method=scene.method,
+                    error_type=CIRCUIT_OPEN,
+                    timings=timings,
                 )
 
-            duration_ms = (time.time() - start_time) * 1000
+            capture = self.capture_bytes if capture_body else 0
+            keep = max(capture, self.extract_max_bytes) if extractors else capture
+
+            async with self._host_limit(host):
+                self._host_in_flight[host] = self._host_in_flight.get(host, 0) + 1
+                start_time = time.perf_counter()
+                try:
+                    async with client.stream(
+                        method=scene.method,
+                        url=url,
+                        headers=headers,
+                        content=body,
+                    ) as response:
+                        body_data, response_bytes = await self._read_body(response, keep)
+                except httpx.RequestError:
+                    if breaker is not None:
+                        breaker.record_failure()
+                    raise
+                except BaseException:
+                    if breaker is not None:
+                        breaker.release()
+                    raise
+                finally:
+                    self._host_in_flight[host] -= 1
+
+            duration_ms = (time.perf_counter() - start_time) * 1000
+            timings["send_ms"] = round(duration_ms, 3)
+            if breaker is not None:
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+            success = 200 <= response.status_code < 300
+            message = "请求成功" if success else f"HTTP {response.status_code}"
+            error_type = None
+            encoding = self._encoding(response) if capture or extractors else "utf-8"
+            extracted = None
+            if extractors and success:
+                extracted, missing, extract_ms = run_extractors(extractors, body_data, response.headers, encoding)
+                timings["extract_ms"] = round(extract_ms, 3)
+                if missing:
+                    success = False
+                    message = f"提取失败: {', '.join(missing)}"
+                    error_type = "ExtractError"
 
             return CallbackResponse(
-                success=200 <= response.status_code < 300,
-                message="请求成功" if 200 <= response.status_code < 300 else f"HTTP {response.status_code}",
+                success=success,
+                message=message,
                 scene_id=scene.id,
                 scene_name=scene.name,
                 request_url=url,
@@ -74,16 +439,21 @@ class HttpSender:
                 request_headers=headers,
                 request_body=body,
                 response_status=response.status_code,
-                response_body=response.text[:2000],  # 限制响应长度
+                response_body=self._decode_prefix(body_data[:capture], encoding) if capture else None,
+                response_bytes=response_bytes,
+                extracted=extracted,
+                error_type=error_type,
                 duration_ms=round(duration_ms, 2),
+                timings=timings,
             )
 
-        except httpx.TimeoutException:
+        except httpx.TimeoutException as e:
             return CallbackResponse(
                 success=False,
                 message="请求超时",
                 scene_id=scene.id,
                 scene_name=scene.name,
+                error_type=type(e).__name__,
             )
         except httpx.RequestError as e:
             return CallbackResponse(
@@ -91,6 +461,7 @@ class HttpSender:
                 message=f"请求错误: {str(e)}",
                 scene_id=scene.id,
                 scene_name=scene.name,
+                error_type=type(e).__name__,
             )
         except Exception as e:
             return CallbackResponse(
@@ -98,8 +469,20 @@ class HttpSender:
                 message=f"发送失败: {str(e)}",
                 scene_id=scene.id,
                 scene_name=scene.name,
+                error_type=type(e).__name__,
             )
 
 
 # 全局实例
-http_sender = HttpSender()
+http_sender = HttpSender(
+    timeout=config.http_timeout,
+    max_connections=config.http_max_connections,
+    max_connections_per_host=config.http_max_connections_per_host,
+    max_keepalive_connections=config.http_max_keepalive_connections,
+    keepalive_expiry=config.http_keepalive_expiry,
+    http2=config.http2,
+    breaker_threshold=config.circuit_breaker_threshold,
+    breaker_reset_timeout=config.circuit_breaker_reset_timeout,
+    capture_bytes=config.http_capture_bytes,
+    extract_max_bytes=config.http_extract_max_bytes,
+)
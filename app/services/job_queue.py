@@ -0,0 +1,177 @@
+"""后台任务队列 - 异步提交、轮询结果、定时执行"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+
+from app.config import config
+from app.models.schemas import JobResponse
+
+JobFactory = Callable[[], Awaitable[BaseModel]]
+
+
+class QueueFullError(Exception):
+    """任务队列已满"""
+
+
+class JobQueue:
+    """进程内 asyncio 任务队列
+
+    固定数量的 worker 消费任务; 计划任务到期后才进入队列, 期间不占用 worker。
+    排队与计划中的任务总数受 max_size 限制 (执行中的任务不计入), 已完成任务按 history_size 淘汰。
+    """
+
+    def __init__(self, workers: int = 10, max_size: int = 1000, history_size: int = 1000):
+        self.workers = workers
+        self.max_size = max_size
+        self.history_size = history_size
+        self._jobs: OrderedDict[str, JobResponse] = OrderedDict()
+        # 排队及计划中任务的协程工厂，开始执行时移出
+        self._factories: dict[str, JobFactory] = {}
+        self._running = 0
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """启动 worker (幂等)"""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        """停止 worker 并取消未执行的计划任务"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    @property
+    def pending_count(self) -> int:
+        """排队及计划中的任务数 (不含执行中的任务)"""
+        return len(self._factories)
+
+    @property
+    def running_count(self) -> int:
+        """执行中的任务数"""
+        return self._running
+
+    async def submit(self, kind: str, target: str, factory: JobFactory, delay: float = 0.0) -> JobResponse:
+        """提交任务
+
+        Args:
+            kind: 任务类型
+            target: 场景或批量场景 ID
+            factory: 执行时调用的协程工厂，返回结果模型
+            delay: 延迟执行秒数
+
+        Returns:
+            任务状态
+
+        Raises:
+            QueueFullError: 排队及计划中的任务已达上限
+        """
+        await self.start()
+        if self.pending_count >= self.max_size:
+            raise QueueFullError(f"任务队列已满 ({self.max_size})，请稍后重试")
+
+        now = time.time()
+        job = JobResponse(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            target=target,
+            status="scheduled" if delay > 0 else "queued",
+            created_at=now,
+            scheduled_at=now + delay,
+        )
+        self._jobs[job.id] = job
+        self._factories[job.id] = factory
+        self._evict()
+
+        if delay > 0:
+            loop = asyncio.get_running_loop()
+            self._timers[job.id] = loop.call_later(delay, self._enqueue, job.id)
+        else:
+            self._enqueue(job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[JobResponse]:
+        """获取任务状态"""
+        return self._jobs.get(job_id)
+
+    def list_jobs(self, status: Optional[str] = None) -> list[JobResponse]:
+        """列出任务 (按提交时间倒序)"""
+        jobs = reversed(self._jobs.values())
+        return [job for job in jobs if status is None or job.status == status]
+
+    def stats(self) -> dict:
+        """队列统计"""
+        counts: dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "max_size": self.max_size,
+            "pending": self.pending_count,
+            "running": self.running_count,
+            "status_counts": counts,
+        }
+
+    def _enqueue(self, job_id: str) -> None:
+        self._timers.pop(job_id, None)
+        job = self._jobs.get(job_id)
+        if job is None or self._queue is None:
+            return
+        job.status = "queued"
+        self._queue.put_nowait(job_id)
+
+    def _evict(self) -> None:
+        """淘汰最早完成的任务，保留未完成任务"""
+        finished = len(self._jobs) - self.pending_count - self.running_count
+        if finished <= self.history_size:
+            return
+        for job_id in list(self._jobs):
+            if finished <= self.history_size:
+                break
+            if self._jobs[job_id].status in ("succeeded", "failed"):
+                del self._jobs[job_id]
+                finished -= 1
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            factory = self._factories.pop(job_id, None)
+            if job is None or factory is None:
+                continue
+            self._running += 1
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                result = await factory()
+                job.result = result.model_dump()
+                job.status = "succeeded" if getattr(result, "success", True) else "failed"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                self._running -= 1
+                job.finished_at = time.time()
+
+
+# 全局实例
+job_queue = JobQueue(
+    workers=config.job_workers,
+    max_size=config.job_queue_size,
+    history_size=config.job_history_size,
+)
@@ -0,0 +1,157 @@
+"""压测发送服务 - 按速率曲线驱动场景"""
+import asyncio
+import time
+from typing import Any, Mapping, Optional
+
+from app.models.schemas import Scene, CallbackResponse, LoadProfile, LoadResponse
+from app.services.histogram import LatencyHistogram
+from app.services.process_sender import bulk_sender
+
+PROFILES = ("constant", "ramp", "step")
+
+# 调度器最小休眠间隔 (秒)
+TICK = 0.001
+
+
+class LoadResult:
+    """压测结果汇总"""
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.total = 0
+        self.success_count = 0
+        self.status_counts: dict[str, int] = {}
+        self.error_counts: dict[str, int] = {}
+        self.bytes_received = 0
+        self.elapsed_s = 0.0
+
+    def add(self, result: CallbackResponse, latency_ms: float) -> None:
+        """记录单次发送结果"""
+        self.total += 1
+        if result.success:
+            self.success_count += 1
+        if result.response_status is not None:
+            key = str(result.response_status)
+            self.status_counts[key] = self.status_counts.get(key, 0) + 1
+        else:
+            key = result.error_type or "Unknown"
+            self.error_counts[key] = self.error_counts.get(key, 0) + 1
+        if result.response_bytes:
+            self.bytes_received += result.response_bytes
+        self.histogram.record(latency_ms)
+
+    @property
+    def failed_count(self) -> int:
+        return self.total - self.success_count
+
+    @property
+    def throughput_rps(self) -> float:
+        if self.elapsed_s <= 0:
+            return 0.0
+        return round(self.total / self.elapsed_s, 2)
+
+    def to_response(self, scene: Scene, profile: LoadProfile) -> LoadResponse:
+        """转换为 API 响应模型"""
+        return LoadResponse(
+            success=self.total > 0 and self.failed_count == 0,
+            scene_id=scene.id,
+            scene_name=scene.name,
+            profile=profile,
+            total=self.total,
+            success_count=self.success_count,
+            failed_count=self.failed_count,
+            elapsed_s=self.elapsed_s,
+            throughput_rps=self.throughput_rps,
+            bytes_received=self.bytes_received,
+            latency_ms=self.histogram.summary(),
+            status_counts=self.status_counts,
+            error_counts=self.error_counts,
+        )
+
+
+def rate_at(profile: LoadProfile, elapsed: float) -> float:
+    """速率曲线在 elapsed 秒时的目标速率"""
+    if profile.profile == "ramp":
+        progress = min(elapsed / profile.duration, 1.0) if profile.duration > 0 else 1.0
+        return profile.start_rps + (profile.rps - profile.start_rps) * progress
+    if profile.profile == "step":
+        steps = max(profile.steps, 1)
+        step_index = min(int(elapsed / profile.duration * steps), steps - 1) if profile.duration > 0 else steps - 1
+        if steps == 1:
+            return profile.rps
+        return profile.start_rps + (profile.rps - profile.start_rps) * step_index / (steps - 1)
+    return profile.rps
+
+
+class LoadRunner:
+    """按速率曲线持续发送同一场景
+
+    开放模型: 调度器按目标速率累积应发数量并派发，在途请求数受 concurrency 限制，
+    达到上限时调度器等待，实际吞吐会低于目标速率。所有发送共用 HttpSender 连接池，
+    启用多进程发送时由 ProcessSender 分发到各 worker 进程。
+    """
+
+    async def run(
+        self,
+        scene: Scene,
+        variables: Mapping[str, Any],
+        profile: LoadProfile,
+        dry_run: bool = False,
+        env: str = "",
+        capture_body: Optional[bool] = None,
+    ) -> LoadResult:
+        """执行压测
+
+        Args:
+            scene: 场景配置
+            variables: 渲染变量 (已合并 defaults 与环境变量)
+            profile: 速率曲线
+            dry_run: 仅渲染不发送
+            env: 环境名称，用于指标标签
+            capture_body: 是否保留响应体，None 时按场景的 capture_body
+
+        Returns:
+            压测结果
+        """
+        if profile.profile not in PROFILES:
+            raise ValueError(f"不支持的速率曲线: {profile.profile}，可选: {', '.join(PROFILES)}")
+
+        result = LoadResult()
+        in_flight = asyncio.Semaphore(profile.concurrency)
+        tasks: set[asyncio.Task] = set()
+        sender = bulk_sender()
+
+        async def fire():
+            try:
+                send_start = time.perf_counter()
+                response = await sender.send(scene, variables, dry_run, env=env, capture_body=capture_body)
+                result.add(response, (time.perf_counter() - send_start) * 1000)
+            finally:
+                in_flight.release()
+
+        started = time.perf_counter()
+        last = started
+        due = 0.0
+        while True:
+            now = time.perf_counter()
+            elapsed = now - started
+            if elapsed >= profile.duration:
+                break
+            due += rate_at(profile, elapsed) * (now - last)
+            last = now
+            while due >= 1:
+                due -= 1
+                await in_flight.acquire()
+                task = asyncio.create_task(fire())
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.sleep(TICK)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        result.elapsed_s = round(time.perf_counter() - started, 3)
+        return result
+
+
+# 全局实例
+load_runner = LoadRunner()
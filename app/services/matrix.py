@@ -0,0 +1,322 @@
+"""参数矩阵 - 把 matrix 配置惰性展开为变量集合，并按轴汇总结果
+
+配置写法 (每个键是一个轴，按声明顺序做笛卡尔积，第一个轴在最外层):
+    status: [SUCCESS, FAILED]                   列表，每个值作为变量 status
+    amount: {range: [100, 1000, 300]}           区间 [start, stop, step)，与 Python range 一致不含 stop
+    user: {file: data/users.csv, label: userId} 数据文件 (CSV/JSONL)，每行的字段都作为变量
+                                                相对路径相对于声明它的场景配置文件所在目录
+
+组合只在迭代时生成，不在内存中物化; 内层轴在外层每取一个值时重新迭代
+(数据文件会被重新打开逐行读取)，因此大数据文件应放在第一个轴。
+"""
+import csv
+import json
+import math
+from pathlib import Path
+from typing import Any, Iterator, Mapping, Optional
+
+from app.config import config
+from app.models.schemas import AxisValueStats, CallbackResponse, MatrixResponse
+from app.services.histogram import LatencyHistogram
+
+# 超出每轴取值上限后的汇总键
+OTHER_LABEL = "_other"
+
+
+class MatrixItem(dict):
+    """一组矩阵变量，附带各轴取值的标签 (用于按轴汇总)"""
+
+    __slots__ = ("labels",)
+
+    def __init__(self, variables: dict, labels: tuple):
+        super().__init__(variables)
+        self.labels = labels
+
+
+class Axis:
+    """矩阵的一个轴
+
+    iterate() 每次调用返回新的迭代器，产出 (变量, 标签); 标签为 None 的值不参与按轴汇总。
+    """
+
+    __slots__ = ("name", "kind", "values", "range", "path", "format", "label")
+
+    def __init__(self, name: str, spec: Any, allow_files: bool = True, base_dir: Optional[str] = None):
+        self.name = name
+        self.values: list = []
+        self.range: tuple = ()
+        self.path: Optional[Path] = None
+        self.format = ""
+        self.label: Optional[str] = None
+
+        if isinstance(spec, list):
+            if not spec:
+                raise ValueError(f"矩阵轴 {name} 不能为空")
+            self.kind = "values"
+            self.values = spec
+        elif isinstance(spec, dict) and "range" in spec:
+            self.kind = "range"
+            self.range = self._parse_range(name, spec["range"])
+        elif isinstance(spec, dict) and "file" in spec:
+            if not allow_files:
+                raise ValueError(f"矩阵轴 {name} 不能引用数据文件 (数据文件只能在场景配置中使用)")
+            self.kind = "file"
+            self.path = Path(spec["file"])
+            if base_dir is not None and not self.path.is_absolute():
+                self.path = Path(base_dir) / self.path
+            self.format = spec.get("format") or self.path.suffix.lstrip(".").lower()
+            if self.format not in ("csv", "jsonl"):
+                raise ValueError(f"矩阵轴 {name} 的数据文件格式不支持: {self.format}，应为 csv 或 jsonl")
+            if not self.path.is_file():
+                raise ValueError(f"矩阵轴 {name} 的数据文件不存在: {self.path}")
+            self.label = spec.get("label")
+        else:
+            raise ValueError(f"矩阵轴 {name} 格式错误，应为列表、{{range: [...]}} 或 {{file: ...}}")
+
+    @staticmethod
+    def _parse_range(name: str, spec: Any) -> tuple:
+        if isinstance(spec, dict):
+            spec = [spec.get("start", 0), spec.get("stop"), spec.get("step", 1)]
+        if not isinstance(spec, list) or not 1 <= len(spec) <= 3:
+            raise ValueError(f"矩阵轴 {name} 的 range 应为 [stop]、[start, stop] 或 [start, stop, step]")
+        if len(spec) == 1:
+            spec = [0, spec[0]]
+        if len(spec) == 2:
+            spec = [spec[0], spec[1], 1]
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in spec):
+            raise ValueError(f"矩阵轴 {name} 的 range 必须是数字: {spec}")
+        if spec[2] == 0:
+            raise ValueError(f"矩阵轴 {name} 的 range 步长不能为 0")
+        return tuple(spec)
+
+    def size(self) -> Optional[int]:
+        """取值个数，数据文件轴未知时为 None"""
+        if self.kind == "values":
+            return len(self.values)
+        if self.kind == "range":
+            start, stop, step = self.range
+            return max(math.ceil((stop - start) / step), 0)
+        return None
+
+    def iterate(self) -> Iterator[tuple[dict, Optional[str]]]:
+        if self.kind == "values":
+            for value in self.values:
+                if isinstance(value, dict):
+                    yield value, json.dumps(value, ensure_ascii=False, sort_keys=True)
+                else:
+                    yield {self.name: value}, str(value)
+        elif self.kind == "range":
+            start, stop, step = self.range
+            if all(isinstance(v, int) for v in self.range):
+                values: Iterator = iter(range(start, stop, step))
+            else:
+                values = (start + i * step for i in range(self.size()))
+            for value in values:
+                yield {self.name: value}, str(value)
+        else:
+            for row in self._read_rows():
+                label = row.get(self.label) if self.label else None
+                yield row, None if label is None else str(label)
+
+    def _read_rows(self) -> Iterator[dict]:
+        """逐行读取数据文件"""
+        with open(self.path, encoding="utf-8", newline="") as f:
+            if self.format == "csv":
+                yield from csv.DictReader(f)
+                return
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    raise ValueError(f"矩阵轴 {self.name} 的数据文件第 {line_no} 行不是合法的 JSON")
+                if not isinstance(row, dict):
+                    raise ValueError(f"矩阵轴 {self.name} 的数据文件第 {line_no} 行不是 JSON 对象")
+                yield row
+
+
+class Matrix:
+    """参数矩阵 (可重复迭代，每次迭代重新惰性生成全部组合)"""
+
+    def __init__(self, axes: list[Axis]):
+        self.axes = axes
+
+    @property
+    def axis_names(self) -> list[str]:
+        return [axis.name for axis in self.axes]
+
+    def size(self) -> Optional[int]:
+        """组合总数，包含数据文件轴时为 None"""
+        sizes = [axis.size() for axis in self.axes]
+        if any(size is None for size in sizes):
+            return None
+        return math.prod(sizes)
+
+    def __iter__(self) -> Iterator[MatrixItem]:
+        return self._expand(0, {}, ())
+
+    def _expand(self, depth: int, variables: dict, labels: tuple) -> Iterator[MatrixItem]:
+        if depth == len(self.axes):
+            yield MatrixItem(variables, labels)
+            return
+        for values, label in self.axes[depth].iterate():
+            yield from self._expand(depth + 1, {**variables, **values}, labels + (label,))
+
+
+def build_matrix(spec: Mapping[str, Any], allow_files: bool = True, base_dir: Optional[str] = None) -> Matrix:
+    """解析 matrix 配置
+
+    Args:
+        spec: 轴名 -> 取值配置
+        allow_files: 是否允许数据文件轴 (来自 API 请求的矩阵不允许读取服务端文件)
+        base_dir: 数据文件相对路径的基准目录，None 时相对于当前工作目录
+
+    Raises:
+        ValueError: 配置格式错误或数据文件不存在
+    """
+    if not isinstance(spec, Mapping) or not spec:
+        raise ValueError("matrix 应为非空的 轴名: 取值 映射")
+    return Matrix([Axis(str(name), axis_spec, allow_files, base_dir) for name, axis_spec in spec.items()])
+
+
+def resolve_matrix(spec: Mapping[str, Any], base_dir: str) -> dict[str, Any]:
+    """校验场景配置中的 matrix，并把数据文件路径解析为绝对路径
+
+    请求时按返回的配置重新构建矩阵，结果与服务的启动目录无关。
+
+    Args:
+        spec: 轴名 -> 取值配置
+        base_dir: 声明该矩阵的配置文件所在目录
+
+    Raises:
+        ValueError: 配置格式错误或数据文件不存在
+    """
+    matrix = build_matrix(spec, base_dir=base_dir)
+    return {
+        name: {**axis_spec, "file": str(axis.path.resolve())} if axis.kind == "file" else axis_spec
+        for axis, (name, axis_spec) in zip(matrix.axes, spec.items())
+    }
+
+
+class _AxisCounter:
+    __slots__ = ("total", "success_count", "sum_ms", "max_ms")
+
+    def __init__(self):
+        self.total = 0
+        self.success_count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+
+class MatrixResult:
+    """矩阵执行结果汇总
+
+    延迟记录在直方图中，每个轴取值只保留计数器，内存与组合总数无关;
+    每轴最多汇总 max_axis_values 个取值，其余计入 _other。
+    """
+
+    def __init__(
+        self,
+        axis_names: list[str],
+        keep_results: bool = False,
+        max_axis_values: Optional[int] = None,
+    ):
+        self.axis_names = axis_names
+        self.keep_results = keep_results
+        self.max_axis_values = max_axis_values or config.matrix_max_axis_values
+        self.histogram = LatencyHistogram()
+        self.total = 0
+        self.success_count = 0
+        self.status_counts: dict[str, int] = {}
+        self.results: list[CallbackResponse] = []
+        self.duration_ms = 0.0
+        self._axes: list[dict[str, _AxisCounter]] = [{} for _ in axis_names]
+
+    def add(self, result: CallbackResponse, latency_ms: float, item: Optional[MatrixItem] = None) -> None:
+        """记录单次发送结果"""
+        if result.response_status is not None:
+            key = str(result.response_status)
+        else:
+            key = result.error_type or result.message
+        self.record(result.success, key, latency_ms, item)
+        if self.keep_results:
+            self.results.append(result)
+
+    def record(self, success: bool, key: str, latency_ms: float, item: Optional[MatrixItem] = None) -> None:
+        """记录一个组合的执行结果
+
+        Args:
+            success: 是否成功
+            key: 状态分类 (状态码或错误类型)
+            latency_ms: 耗时毫秒
+            item: 矩阵变量 (用于按轴汇总)
+        """
+        self.total += 1
+        if success:
+            self.success_count += 1
+        self.status_counts[key] = self.status_counts.get(key, 0) + 1
+        self.histogram.record(latency_ms)
+        if item is None:
+            return
+        for counters, label in zip(self._axes, item.labels):
+            if label is None:
+                continue
+            counter = counters.get(label)
+            if counter is None:
+                if len(counters) >= self.max_axis_values:
+                    label = OTHER_LABEL
+                    counter = counters.get(label)
+                if counter is None:
+                    counter = counters[label] = _AxisCounter()
+            counter.total += 1
+            if success:
+                counter.success_count += 1
+            counter.sum_ms += latency_ms
+            if latency_ms > counter.max_ms:
+                counter.max_ms = latency_ms
+
+    @property
+    def failed_count(self) -> int:
+        return self.total - self.success_count
+
+    @property
+    def rps(self) -> float:
+        if self.duration_ms <= 0:
+            return 0.0
+        return round(self.total / (self.duration_ms / 1000), 2)
+
+    def axes(self) -> dict[str, dict[str, AxisValueStats]]:
+        """按轴取值汇总"""
+        return {
+            name: {
+                label: AxisValueStats(
+                    total=counter.total,
+                    success_count=counter.success_count,
+                    failed_count=counter.total - counter.success_count,
+                    avg_ms=round(counter.sum_ms / counter.total, 2),
+                    max_ms=round(counter.max_ms, 2),
+                )
+                for label, counter in counters.items()
+            }
+            for name, counters in zip(self.axis_names, self._axes)
+        }
+
+    def to_response(self, target_id: str, target_name: str, combinations: Optional[int]) -> MatrixResponse:
+        """转换为 API 响应模型"""
+        return MatrixResponse(
+            success=self.total > 0 and self.failed_count == 0,
+            target_id=target_id,
+            target_name=target_name,
+            combinations=combinations,
+            total=self.total,
+            success_count=self.success_count,
+            failed_count=self.failed_count,
+            duration_ms=self.duration_ms,
+            rps=self.rps,
+            latency_ms=self.histogram.summary(),
+            status_counts=self.status_counts,
+            axes=self.axes(),
+            results=self.results,
+        )
@@ -0,0 +1,147 @@
+"""进程内指标注册表 - Prometheus 文本格式导出"""
+from bisect import bisect_left
+
+import httpx
+
+from app.models.schemas import CallbackResponse
+
+# 发送延迟分桶 (秒)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 模板渲染耗时分桶 (秒)
+RENDER_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005, 0.01)
+
+OUTCOMES = ("success", "non_2xx", "timeout", "request_error", "error")
+
+
+def _httpx_error_names(base: type) -> frozenset[str]:
+    return frozenset(
+        name for name, obj in vars(httpx).items()
+        if isinstance(obj, type) and issubclass(obj, base)
+    )
+
+
+TIMEOUT_ERRORS = _httpx_error_names(httpx.TimeoutException)
+REQUEST_ERRORS = _httpx_error_names(httpx.RequestError) - TIMEOUT_ERRORS
+
+
+class Histogram:
+    """固定分桶直方图，桶数组在创建时预分配"""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        # 最后一个桶对应 +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class SceneSeries:
+    """单个 场景 × 环境 的指标"""
+
+    __slots__ = ("sent", "outcomes", "latency", "render", "in_flight")
+
+    def __init__(self):
+        self.sent = 0
+        self.outcomes = [0] * len(OUTCOMES)
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.render = Histogram(RENDER_BUCKETS)
+        self.in_flight = 0
+
+    def observe(self, result: CallbackResponse) -> None:
+        """记录一次发送结果"""
+        self.sent += 1
+        if result.response_status is not None:
+            self.outcomes[0 if result.success else 1] += 1
+        elif result.error_type in TIMEOUT_ERRORS:
+            self.outcomes[2] += 1
+        elif result.error_type in REQUEST_ERRORS:
+            self.outcomes[3] += 1
+        else:
+            self.outcomes[4] += 1
+        if result.duration_ms is not None:
+            self.latency.observe(result.duration_ms / 1000)
+        if result.timings and "render_ms" in result.timings:
+            self.render.observe(result.timings["render_ms"] / 1000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+class MetricsRegistry:
+    """按 场景 × 环境 聚合的指标注册表
+
+    只在事件循环线程内读写，不加锁; 记录路径为一次字典查找加若干整数自增。
+    """
+
+    def __init__(self):
+        self._series: dict[tuple[str, str], SceneSeries] = {}
+
+    def series(self, scene_id: str, env: str) -> SceneSeries:
+        """获取 (必要时创建) 指标序列"""
+        key = (scene_id, env)
+        series = self._series.get(key)
+        if series is None:
+            series = SceneSeries()
+            self._series[key] = series
+        return series
+
+    def reset(self) -> None:
+        """清空全部指标"""
+        self._series.clear()
+
+    def render_text(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        items = sorted(self._series.items())
+        lines: list[str] = []
+
+        lines.append("# HELP callback_sent_total 已发送的回调数")
+        lines.append("# TYPE callback_sent_total counter")
+        for (scene_id, env), series in items:
+            lines.append(f'callback_sent_total{{scene="{_escape(scene_id)}",env="{_escape(env)}"}} {series.sent}')
+
+        lines.append("# HELP callback_outcomes_total 按结果分类的回调数")
+        lines.append("# TYPE callback_outcomes_total counter")
+        for (scene_id, env), series in items:
+            labels = f'scene="{_escape(scene_id)}",env="{_escape(env)}"'
+            for outcome, count in zip(OUTCOMES, series.outcomes):
+                lines.append(f'callback_outcomes_total{{{labels},outcome="{outcome}"}} {count}')
+
+        lines.append("# HELP callback_in_flight 正在发送的回调数")
+        lines.append("# TYPE callback_in_flight gauge")
+        for (scene_id, env), series in items:
+            lines.append(f'callback_in_flight{{scene="{_escape(scene_id)}",env="{_escape(env)}"}} {series.in_flight}')
+
+        for name, help_text, attr in (
+            ("callback_latency_seconds", "回调发送延迟", "latency"),
+            ("callback_render_seconds", "模板渲染耗时", "render"),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (scene_id, env), series in items:
+                histogram: Histogram = getattr(series, attr)
+                labels = f'scene="{_escape(scene_id)}",env="{_escape(env)}"'
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{_format_bound(bound)}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+# 全局实例
+metrics = MetricsRegistry()
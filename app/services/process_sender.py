@@ -0,0 +1,353 @@
+"""多进程发送后端 - 渲染与发送分散到多个 worker 进程"""
+import asyncio
+import itertools
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Mapping, Optional
+
+from app.config import config
+from app.models.schemas import Scene, CallbackResponse
+from app.services.http_sender import HttpSender, http_sender
+from app.services.metrics import metrics
+from app.services.history import history_store
+from app.services.rate_limiter import host_key, rate_limiter
+from app.services.renderer import RenderContext, renderer
+from app.services.generators import sequences
+
+# worker 就绪消息的 request_id
+READY = -1
+# 等待 worker 启动的超时秒数
+START_TIMEOUT = 60.0
+# 读取线程检查 worker 存活的间隔秒数
+POLL_INTERVAL = 1.0
+
+
+class WorkerLostError(Exception):
+    """请求所在的 worker 进程异常退出，或未在超时时间内返回结果"""
+
+
+async def _worker_loop(work_queue, result_queue, concurrency: int, sender_kwargs: dict) -> None:
+    """worker 进程主循环: 从共享队列取任务，在本进程事件循环和连接池上发送"""
+    sender = HttpSender(**sender_kwargs, record_metrics=False, rate_limit=False)
+    await sender.start()
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    pid = os.getpid()
+    scenes: dict[str, tuple[dict, Scene]] = {}
+    tasks: set[asyncio.Task] = set()
+    result_queue.put((READY, pid, {}))
+
+    async def handle(request_id: int, scene_data: dict, variables: dict, dry_run: bool, capture_body: Optional[bool]):
+        try:
+            # 场景未变化时复用已校验的 Scene 对象
+            cached = scenes.get(scene_data["id"])
+            if cached is None or cached[0] != scene_data:
+                cached = (scene_data, Scene.model_validate(scene_data))
+                scenes[scene_data["id"]] = cached
+            result = await sender.send(cached[1], variables, dry_run, capture_body=capture_body)
+            result_queue.put((request_id, pid, result.model_dump()))
+        except Exception as e:
+            result_queue.put((request_id, pid, CallbackResponse(
+                success=False,
+                message=f"worker 执行失败: {str(e)}",
+                scene_id=scene_data.get("id", ""),
+                error_type=type(e).__name__,
+            ).model_dump()))
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=1) as getter:
+        while True:
+            await slots.acquire()
+            item = await loop.run_in_executor(getter, work_queue.get)
+            if item is None:
+                slots.release()
+                break
+            # 告知 API 进程请求由本进程处理，进程异常退出时据此让请求失败
+            result_queue.put((item[0], pid, None))
+            task = asyncio.create_task(handle(*item))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    await sender.close()
+
+
+def _worker_main(work_queue, result_queue, concurrency: int, sender_kwargs: dict, shared_sequences: tuple) -> None:
+    """worker 进程入口"""
+    # 与 API 进程共享 {{_seq:name}} 计数器
+    sequences.attach(shared_sequences)
+    try:
+        asyncio.run(_worker_loop(work_queue, result_queue, concurrency, sender_kwargs))
+    except KeyboardInterrupt:
+        pass
+
+
+class ProcessSender:
+    """多进程发送器
+
+    与 HttpSender.send 签名一致。任务经共享队列分发给 worker 进程，每个 worker
+    有独立的事件循环和连接池; 结果由读取线程回传到 API 进程的事件循环。
+    单主机并发上限按进程数均分，总量与单进程模式一致。
+    """
+
+    def __init__(self, processes: int = 0, concurrency: int = 200):
+        self.processes = processes
+        self.concurrency = concurrency
+        self._ids = itertools.count()
+        self._pending: dict[int, asyncio.Future] = {}
+        # 请求 ID → 处理该请求的 worker pid (由读取线程写入)
+        self._owners: dict[int, int] = {}
+        self._completed: dict[int, int] = {}
+        self._dumped: dict[str, tuple[Scene, dict]] = {}
+        self._work_queue = None
+        self._result_queue = None
+        self._workers: list[multiprocessing.Process] = []
+        self._reader: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing = False
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        """启动 worker 进程 (processes 为 0 时不启动)"""
+        if self.started or self.processes <= 0:
+            return
+        ctx = multiprocessing.get_context("spawn")
+        self._loop = asyncio.get_running_loop()
+        self._work_queue = ctx.Queue()
+        self._result_queue = ctx.Queue()
+        sender_kwargs = {
+            "timeout": http_sender.timeout,
+            "max_connections": math.ceil(http_sender.max_connections / self.processes),
+            "max_connections_per_host": math.ceil(http_sender.max_connections_per_host / self.processes),
+            "max_keepalive_connections": math.ceil(http_sender.max_keepalive_connections / self.processes),
+            "keepalive_expiry": http_sender.keepalive_expiry,
+            "http2": http_sender.http2,
+            "breaker_threshold": http_sender.breaker_threshold,
+            "breaker_reset_timeout": http_sender.breaker_reset_timeout,
+            "capture_bytes": http_sender.capture_bytes,
+            "extract_max_bytes": http_sender.extract_max_bytes,
+        }
+        for _ in range(self.processes):
+            process = ctx.Process(
+                target=_worker_main,
+                args=(self._work_queue, self._result_queue, self.concurrency, sender_kwargs, sequences.shared()),
+                daemon=True,
+            )
+            process.start()
+            self._workers.append(process)
+
+        # 等待全部 worker 完成导入并建好连接池，避免首批请求承担进程启动耗时
+        for _ in range(self.processes):
+            request_id, pid, _ = await self._loop.run_in_executor(
+                None, self._result_queue.get, True, START_TIMEOUT
+            )
+            if request_id == READY:
+                self._completed[pid] = 0
+        self._reader = threading.Thread(target=self._read_results, name="process-sender-results", daemon=True)
+        self._reader.start()
+
+    async def close(self) -> None:
+        """通知 worker 退出并等待结束，未完成的请求以失败返回"""
+        if not self.started:
+            return
+        self._closing = True
+        for _ in self._workers:
+            self._work_queue.put(None)
+        loop = asyncio.get_running_loop()
+        for process in self._workers:
+            await loop.run_in_executor(None, process.join, 10)
+            if process.is_alive():
+                process.terminate()
+        self._result_queue.put(None)
+        await loop.run_in_executor(None, self._reader.join, 5)
+
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(WorkerLostError("发送进程已关闭"))
+        self._pending.clear()
+        self._owners.clear()
+        self._workers = []
+        self._reader = None
+        self._work_queue = self._result_queue = None
+        self._closing = False
+
+    def _read_results(self) -> None:
+        """读取线程: 把 worker 结果交回事件循环，并检查 worker 是否异常退出"""
+        lost: set[int] = set()
+        checked = time.monotonic()
+        while True:
+            try:
+                item = self._result_queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                item = ()
+            now = time.monotonic()
+            if now - checked >= POLL_INTERVAL and not self._closing:
+                checked = now
+                for process in self._workers:
+                    if process.pid not in lost and not process.is_alive():
+                        lost.add(process.pid)
+                        self._loop.call_soon_threadsafe(self._worker_lost, process.pid, process.exitcode)
+            if item is None:
+                return
+            if not item:
+                continue
+            request_id, pid, data = item
+            if data is None:
+                self._owners[request_id] = pid
+            else:
+                self._loop.call_soon_threadsafe(self._resolve, request_id, pid, data)
+
+    def _resolve(self, request_id: int, pid: int, data: dict) -> None:
+        self._completed[pid] = self._completed.get(pid, 0) + 1
+        self._owners.pop(request_id, None)
+        future = self._pending.pop(request_id, None)
+        if future is not None and not future.done():
+            # worker 端已校验，这里跳过重复校验
+            future.set_result(CallbackResponse.model_construct(**data))
+
+    def _worker_lost(self, pid: int, exitcode: Optional[int]) -> None:
+        """worker 异常退出: 该进程处理中的请求失败; 全部退出时队列中的请求也失败"""
+        error = f"发送进程 {pid} 异常退出 (exitcode={exitcode})"
+        print(f"❌ {error}")
+        alive = any(process.is_alive() for process in self._workers)
+        for request_id, owner in list(self._owners.items()):
+            if owner == pid:
+                self._owners.pop(request_id, None)
+                self._fail(request_id, error)
+        if not alive:
+            for request_id in list(self._pending):
+                self._fail(request_id, f"{error}，没有可用的发送进程")
+
+    def _fail(self, request_id: int, message: str) -> None:
+        future = self._pending.pop(request_id, None)
+        if future is not None and not future.done():
+            future.set_exception(WorkerLostError(message))
+
+    def _result_timeout(self, scene: Scene) -> float:
+        """等待 worker 结果的超时秒数
+
+        按 http_sender.timeout 与场景重试策略估算单个请求的最长耗时 (每次发送的超时
+        加每次退避的最大等待)，再加一个 timeout 作为排队余量; 只是 worker 丢失
+        结果时的兜底，正常请求会先因 HTTP 超时返回。
+        """
+        policy = scene.retry
+        if policy is None:
+            return http_sender.timeout * 2
+        backoff = policy.max_delay * (1 + policy.jitter) * (policy.max_attempts - 1)
+        return http_sender.timeout * (policy.max_attempts + 1) + backoff
+
+    async def _wait(self, request_id: int, future: asyncio.Future, scene: Scene) -> CallbackResponse:
+        """等待 worker 结果，worker 丢失或超时时返回失败结果"""
+        timeout = self._result_timeout(scene)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            message = f"发送进程未在 {timeout:g} 秒内返回结果"
+            error_type = "WorkerTimeout"
+        except WorkerLostError as e:
+            message = str(e)
+            error_type = type(e).__name__
+        finally:
+            self._pending.pop(request_id, None)
+            self._owners.pop(request_id, None)
+        return CallbackResponse(
+            success=False,
+            message=message,
+            scene_id=scene.id,
+            scene_name=scene.name,
+            error_type=error_type,
+        )
+
+    def _scene_data(self, scene: Scene) -> dict:
+        """场景序列化结果按对象缓存，重载后自动失效"""
+        cached = self._dumped.get(scene.id)
+        if cached is None or cached[0] is not scene:
+            cached = (scene, scene.model_dump())
+            self._dumped[scene.id] = cached
+        return cached[1]
+
+    async def send(
+        self,
+        scene: Scene,
+        variables: Mapping[str, Any],
+        dry_run: bool = False,
+        env: str = "",
+        capture_body: Optional[bool] = None,
+    ) -> CallbackResponse:
+        """在 worker 进程中执行 HTTP 请求
+
+        指标与回调记录在 API 进程中根据回传结果记录，限流在分发前于 API 进程中进行，
+        与单进程模式一致 (重试的后续发送不再经过限流)。
+
+        Args:
+            scene: 场景配置
+            variables: 渲染变量
+            dry_run: 仅渲染不发送
+            env: 环境名称，用于指标标签
+            capture_body: 是否保留响应体，None 时按场景的 capture_body
+
+        Returns:
+            回调响应
+        """
+        if not self.started:
+            raise RuntimeError("多进程发送器未启动")
+        waited = None
+        if not dry_run and rate_limiter.has_limits(scene):
+            try:
+                # 只为取得主机而渲染，不求值生成器 (避免消耗序列号)
+                host = host_key(renderer.render(scene.url, variables, RenderContext(generate=False)))
+            except Exception:
+                # 渲染失败交由 worker 返回错误
+                host = None
+            if host is not None:
+                waited = await rate_limiter.acquire(scene, host)
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._work_queue.put((request_id, self._scene_data(scene), dict(variables), dry_run, capture_body))
+        if dry_run:
+            return await self._wait(request_id, future, scene)
+
+        series = metrics.series(scene.id, env)
+        series.in_flight += 1
+        try:
+            result = await self._wait(request_id, future, scene)
+        finally:
+            series.in_flight -= 1
+        if waited is not None and result.timings is not None:
+            result.timings["throttle_ms"] = round(waited * 1000, 3)
+        series.observe(result)
+        history_store.record(scene, env, variables, result)
+        return result
+
+    def stats(self) -> dict:
+        """worker 统计信息"""
+        return {
+            "processes": self.processes,
+            "alive": sum(1 for process in self._workers if process.is_alive()),
+            "concurrency_per_process": self.concurrency,
+            "pending": len(self._pending),
+            "completed": {str(pid): count for pid, count in self._completed.items()},
+        }
+
+
+def bulk_sender():
+    """批量/压测使用的发送后端: 多进程已启动时使用 ProcessSender，否则 HttpSender"""
+    return process_sender if process_sender.started else http_sender
+
+
+# 全局实例
+process_sender = ProcessSender(
+    processes=config.sender_processes,
+    concurrency=config.sender_process_concurrency,
+)
@@ -0,0 +1,152 @@
+"""出站限流 - 按目标主机与场景的令牌桶"""
+import asyncio
+import time
+from typing import Optional
+
+import httpx
+
+from app.models.schemas import RateLimit, Scene
+
+
+def host_key(url: str) -> str:
+    """按 scheme://host:port 区分目标主机"""
+    parsed = httpx.URL(url)
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    return f"{parsed.scheme}://{parsed.host}:{port}"
+
+
+class TokenBucket:
+    """异步令牌桶
+
+    采用预约方式: 令牌不足时余额记为负数，调用方按排队位置计算等待时间后休眠，
+    先到先得且无需锁。超出速率的请求排队等待而不是被拒绝。
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "queued", "acquired", "throttled", "wait_total", "wait_max")
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        # 当前排队数
+        self.queued = 0
+        self.acquired = 0
+        self.throttled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    async def acquire(self) -> float:
+        """获取一个令牌，必要时排队等待
+
+        Returns:
+            等待秒数
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        self.acquired += 1
+        if self.tokens >= 0:
+            return 0.0
+
+        wait = -self.tokens / self.rate
+        self.queued += 1
+        self.throttled += 1
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            # 放弃排队，归还预约的令牌
+            self.tokens += 1
+            raise
+        finally:
+            self.queued -= 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        return wait
+
+    def stats(self) -> dict:
+        """令牌桶状态"""
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "queued": self.queued,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "wait_avg_ms": round(self.wait_total / self.throttled * 1000, 3) if self.throttled else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+class RateLimiter:
+    """全部出站发送共享的限流器
+
+    目标主机的限额来自环境配置中的 rate_limit (按 base_url 的主机生效)，
+    场景的限额来自场景配置中的 rate_limit; 两者都配置时依次获取。
+    只在事件循环线程内使用。
+    """
+
+    def __init__(self):
+        self._host_limits: dict[str, RateLimit] = {}
+        self._hosts: dict[str, TokenBucket] = {}
+        self._scenes: dict[str, tuple[RateLimit, TokenBucket]] = {}
+
+    def configure_hosts(self, limits: dict[str, RateLimit]) -> None:
+        """更新目标主机限额 (配置重载时调用)，限额未变的主机保留令牌桶状态"""
+        for host, bucket in list(self._hosts.items()):
+            limit = limits.get(host)
+            if limit is None or (limit.rate, limit.burst) != (bucket.rate, self._host_limits[host].burst):
+                del self._hosts[host]
+        self._host_limits = dict(limits)
+
+    def _host_bucket(self, host: str) -> Optional[TokenBucket]:
+        bucket = self._hosts.get(host)
+        if bucket is None:
+            limit = self._host_limits.get(host)
+            if limit is None:
+                return None
+            bucket = self._hosts[host] = TokenBucket(limit.rate, limit.burst)
+        return bucket
+
+    def _scene_bucket(self, scene: Scene) -> Optional[TokenBucket]:
+        limit = scene.rate_limit
+        if limit is None:
+            return None
+        cached = self._scenes.get(scene.id)
+        if cached is None or cached[0] != limit:
+            cached = self._scenes[scene.id] = (limit, TokenBucket(limit.rate, limit.burst))
+        return cached[1]
+
+    def has_limits(self, scene: Scene) -> bool:
+        """是否可能需要限流 (无任何限额时调用方可跳过渲染 URL)"""
+        return scene.rate_limit is not None or bool(self._host_limits)
+
+    async def acquire(self, scene: Scene, host: str) -> float:
+        """按场景与目标主机限额获取发送许可
+
+        Args:
+            scene: 场景配置
+            host: 目标主机 (host_key 的结果)
+
+        Returns:
+            总等待秒数
+        """
+        waited = 0.0
+        bucket = self._scene_bucket(scene)
+        if bucket is not None:
+            waited += await bucket.acquire()
+        bucket = self._host_bucket(host)
+        if bucket is not None:
+            waited += await bucket.acquire()
+        return waited
+
+    def stats(self) -> dict:
+        """各令牌桶的排队数与等待时间"""
+        return {
+            "hosts": {host: bucket.stats() for host, bucket in self._hosts.items()},
+            "scenes": {scene_id: bucket.stats() for scene_id, (_, bucket) in self._scenes.items()},
+        }
+
+
+# 全局实例
+rate_limiter = RateLimiter()
@@ -0,0 +1,229 @@
+"""接收端 mock - 预设响应与收到请求的内存环形缓冲区"""
+import asyncio
+import itertools
+from collections import deque
+from fnmatch import fnmatchcase
+from glob import has_magic
+from typing import Callable, Iterator, Optional
+
+from app.config import config
+from app.models.schemas import ReceivedRequest, ReceiverResponse, ReceiverRule
+
+# 请求过滤函数
+Predicate = Callable[[ReceivedRequest], bool]
+
+
+def request_matcher(
+    method: Optional[str] = None,
+    path: Optional[str] = None,
+    headers: Optional[dict[str, str]] = None,
+    since_id: int = 0,
+) -> Predicate:
+    """构造请求过滤函数
+
+    Args:
+        method: HTTP 方法
+        path: 路径，支持 * ? 通配
+        headers: 请求头 (名称不区分大小写，值支持通配)
+        since_id: 只匹配 ID 大于该值的请求
+    """
+    method = method.upper() if method else None
+    headers = {name.lower(): value for name, value in (headers or {}).items()}
+
+    def match(request: ReceivedRequest) -> bool:
+        if request.id <= since_id:
+            return False
+        if method and request.method != method:
+            return False
+        if path and not fnmatchcase(request.path, path):
+            return False
+        for name, pattern in headers.items():
+            value = request.headers.get(name)
+            if value is None or not fnmatchcase(value, pattern):
+                return False
+        return True
+
+    return match
+
+
+class Receiver:
+    """接收端 mock
+
+    规则按注册顺序匹配，命中后依次返回规则中的预设响应 (用完后重复最后一个)。
+    收到的请求保存在有界环形缓冲区中，超出 capacity 时淘汰最早的; 另按路径与
+    请求头 (名称, 值) 建立索引，精确查询不需要扫描整个缓冲区。淘汰总是从最早
+    的请求开始，因此各索引中被淘汰的项也总在队首。
+
+    wait_for() 在缓冲区中没有匹配请求时挂起，直到匹配的请求到达或超时;
+    只在事件循环线程内使用。
+    """
+
+    def __init__(self, capacity: int = 10000, body_bytes: int = 64 * 1024):
+        self.capacity = capacity
+        self.body_bytes = body_bytes
+        self._rules: dict[str, ReceiverRule] = {}
+        self._hits: dict[str, int] = {}
+        self._requests: deque[ReceivedRequest] = deque()
+        self._by_path: dict[str, deque[ReceivedRequest]] = {}
+        self._by_header: dict[tuple[str, str], deque[ReceivedRequest]] = {}
+        self._waiters: list[tuple[Predicate, asyncio.Future]] = []
+        self._ids = itertools.count(1)
+        self.received = 0
+        self.evicted = 0
+
+    # ---------- 规则 ----------
+
+    def set_rule(self, name: str, rule: ReceiverRule) -> None:
+        """注册或替换规则 (替换时重置响应序列)"""
+        self._rules[name] = rule
+        self._hits[name] = 0
+
+    def delete_rule(self, name: str) -> bool:
+        self._hits.pop(name, None)
+        return self._rules.pop(name, None) is not None
+
+    def clear_rules(self) -> None:
+        self._rules.clear()
+        self._hits.clear()
+
+    def rules(self) -> dict[str, ReceiverRule]:
+        return dict(self._rules)
+
+    def match_rule(self, method: str, path: str, headers: dict[str, str]) -> Optional[tuple[str, ReceiverResponse]]:
+        """按注册顺序匹配规则
+
+        Returns:
+            (规则名, 本次应返回的响应)，没有命中时为 None
+        """
+        for name, rule in self._rules.items():
+            if rule.method and rule.method.upper() != method:
+                continue
+            if not fnmatchcase(path, rule.path):
+                continue
+            if any(
+                headers.get(header.lower()) is None or not fnmatchcase(headers[header.lower()], pattern)
+                for header, pattern in rule.match_headers.items()
+            ):
+                continue
+            hit = self._hits[name]
+            self._hits[name] = hit + 1
+            return name, rule.responses[min(hit, len(rule.responses) - 1)]
+        return None
+
+    # ---------- 记录 ----------
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def record(self, request: ReceivedRequest) -> None:
+        """写入缓冲区与索引，并唤醒匹配的等待者"""
+        if len(self._requests) >= self.capacity:
+            self._evict()
+        self._requests.append(request)
+        self._by_path.setdefault(request.path, deque()).append(request)
+        for item in request.headers.items():
+            self._by_header.setdefault(item, deque()).append(request)
+        self.received += 1
+
+        if self._waiters:
+            remaining = []
+            for predicate, future in self._waiters:
+                if future.done():
+                    continue
+                if predicate(request):
+                    future.set_result(request)
+                else:
+                    remaining.append((predicate, future))
+            self._waiters = remaining
+
+    def _evict(self) -> None:
+        oldest = self._requests.popleft()
+        self._pop_index(self._by_path, oldest.path)
+        for item in oldest.headers.items():
+            self._pop_index(self._by_header, item)
+        self.evicted += 1
+
+    @staticmethod
+    def _pop_index(index: dict, key) -> None:
+        bucket = index[key]
+        bucket.popleft()
+        if not bucket:
+            del index[key]
+
+    def clear(self) -> None:
+        """清空已收到的请求 (规则保留)"""
+        self._requests.clear()
+        self._by_path.clear()
+        self._by_header.clear()
+
+    # ---------- 查询 ----------
+
+    def _candidates(self, path: Optional[str], headers: Optional[dict[str, str]]) -> deque:
+        """选出最小的候选集: 精确路径或精确请求头命中索引时只扫描索引项"""
+        if path and not has_magic(path):
+            return self._by_path.get(path, deque())
+        for name, value in (headers or {}).items():
+            if not has_magic(value):
+                return self._by_header.get((name.lower(), value), deque())
+        return self._requests
+
+    def query(
+        self,
+        method: Optional[str] = None,
+        path: Optional[str] = None,
+        headers: Optional[dict[str, str]] = None,
+        since_id: int = 0,
+        oldest_first: bool = False,
+    ) -> Iterator[ReceivedRequest]:
+        """按条件查询缓冲区中的请求 (默认最近的在前)"""
+        predicate = request_matcher(method, path, headers, since_id)
+        candidates = self._candidates(path, headers)
+        # 先复制，避免迭代期间被新请求修改
+        items = list(candidates) if oldest_first else list(reversed(candidates))
+        return (request for request in items if predicate(request))
+
+    async def wait_for(
+        self,
+        method: Optional[str] = None,
+        path: Optional[str] = None,
+        headers: Optional[dict[str, str]] = None,
+        since_id: int = 0,
+        timeout: float = 30.0,
+    ) -> Optional[ReceivedRequest]:
+        """等待匹配的请求
+
+        缓冲区中已有匹配请求时立即返回最早的一个，否则挂起直到匹配的请求到达。
+
+        Returns:
+            匹配的请求，超时返回 None
+        """
+        existing = next(self.query(method, path, headers, since_id, oldest_first=True), None)
+        if existing is not None:
+            return existing
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (request_matcher(method, path, headers, since_id), future)
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def stats(self) -> dict:
+        """缓冲区与规则统计"""
+        return {
+            "capacity": self.capacity,
+            "buffered": len(self._requests),
+            "received": self.received,
+            "evicted": self.evicted,
+            "rules": {name: self._hits[name] for name in self._rules},
+            "waiters": len(self._waiters),
+            "oldest_ts": self._requests[0].ts if self._requests else None,
+        }
+
+
+# 全局实例
+receiver = Receiver(capacity=config.receiver_capacity, body_bytes=config.receiver_body_bytes)
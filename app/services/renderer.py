@@ -1,11 +1,52 @@
 """简单模板渲染器 - 替代 Jinja2"""
 import re
 from datetime import datetime
-from typing import Any
+from typing import Any, Mapping, Optional
+
+from app.services.generators import GENERATOR_NAMES, Generator
+
+
+class CompiledTemplate:
+    """预编译模板
+
+    模板被拆分为字面量片段和变量槽位，渲染时只需填充槽位后 join。
+    """
+
+    __slots__ = ("source", "parts", "slots", "uses_builtins")
+
+    def __init__(
+        self,
+        source: str,
+        parts: list[str],
+        slots: list[tuple[int, str, Optional[str], str, Optional[Generator]]],
+    ):
+        self.source = source
+        # 字面量片段，槽位处为占位空串
+        self.parts = parts
+        # (片段下标, 变量名, 默认值, 原始文本, 生成器)
+        self.slots = slots
+        self.uses_builtins = any(name in Renderer.BUILTIN_NAMES for _, name, _, _, _ in slots)
+
+
+class RenderContext:
+    """一次发送的渲染上下文
+
+    生成器取值按 (表达式, 在所在模板中第几次出现) 记录: 同一模板中的多个 {{_uuid}}
+    各不相同，URL、请求头与请求体中第 n 个 {{_uuid}} 取同一个值，重试时也沿用。
+    body 为已渲染的请求体，供摘要与签名使用;
+    generate 为 False 时不求值生成器 (如只为取得目标主机而渲染 URL)。
+    """
+
+    __slots__ = ("values", "body", "generate")
+
+    def __init__(self, generate: bool = True):
+        self.values: dict[tuple[str, int], str] = {}
+        self.body: Optional[str] = None
+        self.generate = generate
 
 
 class Renderer:
-    """基于正则的简单模板渲染器
+    """基于预编译片段的简单模板渲染器
 
     支持:
     - {{var}} - 变量替换
@@ -13,10 +54,20 @@ class Renderer:
     - {{_now}} - 当前时间 ISO 格式
     - {{_timestamp}} - Unix 时间戳 (秒)
     - {{_timestamp_ms}} - Unix 时间戳 (毫秒)
+    - {{_uuid}}、{{_seq:name}}、{{_rand_int:a:b}}、{{_rand_choice:a,b,c}}、
+      {{_sha256}}、{{_hmac_sha256:secretVar}} 等生成器 (见 generators 模块)
     """
 
-    # 匹配 {{var}} 或 {{var|default:value}}
-    PATTERN = re.compile(r'\{\{(\w+)(?:\|default:([^}]*))?\}\}')
+    # 匹配 {{var}}、{{var|default:value}} 或生成器 {{_name:args}}
+    PATTERN = re.compile(r'\{\{(\w+)(?::([^}|]*))?(?:\|default:([^}]*))?\}\}')
+
+    BUILTIN_NAMES = frozenset({"_now", "_timestamp", "_timestamp_ms"})
+
+    # 编译缓存上限，超出后整体清空 (模板来自场景配置，数量有限)
+    CACHE_SIZE = 4096
+
+    def __init__(self):
+        self._cache: dict[str, CompiledTemplate] = {}
 
     def _get_builtins(self) -> dict[str, Any]:
         """获取内置变量"""
@@ -27,53 +78,141 @@ class Renderer:
             "_timestamp_ms": int(now.timestamp() * 1000),
         }
 
-    def render(self, template: str, variables: dict[str, Any]) -> str:
-        """渲染模板字符串
+    def compile(self, template: str) -> CompiledTemplate:
+        """编译模板 (带缓存)
 
         Args:
             template: 模板字符串
-            variables: 变量字典
 
         Returns:
-            渲染后的字符串
-        """
-        if not template:
-            return ""
+            预编译模板
 
-        # 合并内置变量和用户变量
-        context = {**self._get_builtins(), **variables}
-
-        def replacer(match: re.Match) -> str:
-            var_name = match.group(1)
-            default_value = match.group(2)
+        Raises:
+            ValueError: 生成器参数错误
+        """
+        compiled = self._cache.get(template)
+        if compiled is not None:
+            return compiled
+
+        parts: list[str] = []
+        slots: list[tuple[int, str, Optional[str], str, Optional[Generator]]] = []
+        # 生成器表达式 → 已出现次数
+        occurrences: dict[str, int] = {}
+        pos = 0
+        for match in self.PATTERN.finditer(template):
+            name, args, default_value = match.groups()
+            generator = None
+            if name in GENERATOR_NAMES:
+                expr = name if args is None else f"{name}:{args}"
+                generator = Generator(name, args, occurrences.get(expr, 0))
+                occurrences[expr] = occurrences.get(expr, 0) + 1
+                name = generator.expr
+            elif args is not None:
+                # 不是生成器的 {{name:...}} 按字面量保留
+                continue
+            if match.start() > pos:
+                parts.append(template[pos:match.start()])
+            slots.append((len(parts), name, default_value, match.group(0), generator))
+            parts.append("")
+            pos = match.end()
+        if pos < len(template):
+            parts.append(template[pos:])
+
+        compiled = CompiledTemplate(template, parts, slots)
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache.clear()
+        self._cache[template] = compiled
+        return compiled
+
+    def clear_cache(self) -> None:
+        """清空编译缓存"""
+        self._cache.clear()
+
+    def render_compiled(
+        self,
+        compiled: CompiledTemplate,
+        variables: Mapping[str, Any],
+        context: Optional[RenderContext] = None,
+    ) -> str:
+        """渲染预编译模板
+
+        变量优先级: 用户变量 > 内置变量/生成器 > 模板默认值; 均未命中时保留原样。
 
-            if var_name in context:
-                value = context[var_name]
-                # 保持数值类型
-                if isinstance(value, (int, float)):
-                    return str(value)
-                return str(value)
+        Args:
+            compiled: 预编译模板
+            variables: 变量
+            context: 渲染上下文，不传时生成器值只在本次渲染内共享
+        """
+        if not compiled.slots:
+            return compiled.source
+
+        parts = compiled.parts.copy()
+        builtins = None
+        for index, name, default_value, raw, generator in compiled.slots:
+            if name in variables:
+                parts[index] = str(variables[name])
+                continue
+            if generator is not None:
+                # 生成器仅在模板引用时才求值
+                if context is None:
+                    context = RenderContext()
+                value = context.values.get(generator.key) if context.generate else None
+                if value is None and context.generate:
+                    value = generator(context.body, variables)
+                    if value is not None and generator.stable:
+                        context.values[generator.key] = value
+                if value is not None:
+                    parts[index] = value
+                    continue
+
+            if compiled.uses_builtins and name in self.BUILTIN_NAMES:
+                # 内置变量仅在模板引用时才计算
+                if builtins is None:
+                    builtins = self._get_builtins()
+                parts[index] = str(builtins[name])
             elif default_value is not None:
-                return default_value
+                parts[index] = default_value
             else:
                 # 未找到变量且无默认值，保留原样
-                return match.group(0)
+                parts[index] = raw
+        return "".join(parts)
+
+    def render(self, template: str, variables: Mapping[str, Any], context: Optional[RenderContext] = None) -> str:
+        """渲染模板字符串
 
-        return self.PATTERN.sub(replacer, template)
+        Args:
+            template: 模板字符串
+            variables: 变量字典
+            context: 渲染上下文 (同一次发送的多个模板共享生成器取值)
 
-    def render_dict(self, data: dict[str, str], variables: dict[str, Any]) -> dict[str, str]:
+        Returns:
+            渲染后的字符串
+        """
+        if not template:
+            return ""
+        return self.render_compiled(self.compile(template), variables, context)
+
+    def render_dict(
+        self,
+        data: dict[str, str],
+        variables: Mapping[str, Any],
+        context: Optional[RenderContext] = None,
+    ) -> dict[str, str]:
         """渲染字典中的所有值
 
         Args:
             data: 待渲染的字典
             variables: 变量字典
+            context: 渲染上下文，不传时各值共享一个新的上下文
 
         Returns:
             渲染后的字典
         """
         if not data:
             return {}
-        return {k: self.render(v, variables) for k, v in data.items()}
+        if context is None:
+            context = RenderContext()
+        return {k: self.render(v, variables, context) for k, v in data.items()}
 
 
 # 全局实例
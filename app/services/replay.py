@@ -0,0 +1,192 @@
+"""回放服务 - 按原始或缩放后的时间间隔重新发送录制的回调"""
+import asyncio
+import json
+import time
+from collections import ChainMap
+from typing import Any, AsyncIterable, Iterable, Iterator, Mapping, NamedTuple, Optional, Union
+
+from app.models.schemas import ReplayResponse
+from app.services.batch_runner import _aiter
+from app.services.histogram import LatencyHistogram
+from app.services.load_runner import LoadResult
+from app.services.process_sender import bulk_sender
+from app.services.scene_loader import SceneConfigError, SceneReloadingError, scene_loader
+
+ReplayEvents = Union[Iterable[dict], AsyncIterable[dict]]
+
+
+class ReplayEvent(NamedTuple):
+    """录制序列中的一项"""
+    t: float
+    scene_id: str
+    env: str
+    variables: Mapping[str, Any]
+
+
+def parse_event(item: dict) -> ReplayEvent:
+    """解析录制项: {"t": 相对秒数, "scene": 场景 ID, "env": 环境, "variables": {...}}
+
+    Raises:
+        ValueError: 缺少场景 ID 或字段类型错误
+    """
+    scene_id = item.get("scene")
+    if not isinstance(scene_id, str) or not scene_id:
+        raise ValueError("缺少 scene")
+    t = item.get("t", 0.0)
+    variables = item.get("variables") or {}
+    if not isinstance(t, (int, float)) or not isinstance(variables, dict):
+        raise ValueError("t 必须是数字，variables 必须是对象")
+    return ReplayEvent(float(t), scene_id, str(item.get("env") or ""), variables)
+
+
+def read_capture(path: str) -> Iterator[dict]:
+    """逐行读取 NDJSON 录制文件，不整体载入内存"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                raise ValueError(f"第 {line_no} 行不是合法的 JSON")
+            if not isinstance(item, dict):
+                raise ValueError(f"第 {line_no} 行不是 JSON 对象")
+            yield item
+
+
+class ReplayResult(LoadResult):
+    """回放结果汇总: 在压测统计之上增加调度延迟与跳过数"""
+
+    def __init__(self):
+        super().__init__()
+        # 实际发出时间相对计划时间的滞后
+        self.lag = LatencyHistogram()
+        self.skipped = 0
+        self.skipped_reasons: dict[str, int] = {}
+
+    def skip(self, reason: str) -> None:
+        """记录无法回放的项"""
+        self.skipped += 1
+        self.skipped_reasons[reason] = self.skipped_reasons.get(reason, 0) + 1
+
+    def to_replay_response(self, speed: float, concurrency: int) -> ReplayResponse:
+        """转换为 API 响应模型"""
+        return ReplayResponse(
+            success=self.total > 0 and self.failed_count == 0,
+            mode="asap" if speed <= 0 else ("original" if speed == 1 else "scaled"),
+            speed=speed,
+            concurrency=concurrency,
+            total=self.total,
+            success_count=self.success_count,
+            failed_count=self.failed_count,
+            skipped=self.skipped,
+            skipped_reasons=self.skipped_reasons,
+            elapsed_s=self.elapsed_s,
+            throughput_rps=self.throughput_rps,
+            bytes_received=self.bytes_received,
+            latency_ms=self.histogram.summary(),
+            lag_ms=self.lag.summary() if speed > 0 else {},
+            status_counts=self.status_counts,
+            error_counts=self.error_counts,
+        )
+
+
+class ReplayRunner:
+    """按录制的相对时间重新发送回调
+
+    speed 为 1 时按原始间隔发送，10 表示 10 倍速，0 表示不等待、尽快发送。
+    录制项逐个拉取，在途请求数受 concurrency 限制，录制文件再大也不会整体载入内存;
+    达到并发上限时后续项顺延，滞后记录在 lag 中。
+    """
+
+    async def run(
+        self,
+        events: ReplayEvents,
+        speed: float = 1.0,
+        concurrency: int = 100,
+        env: Optional[str] = None,
+        dry_run: bool = False,
+    ) -> ReplayResult:
+        """执行回放
+
+        Args:
+            events: 录制项 (同步或异步可迭代)
+            speed: 速度倍数，0 表示尽快发送
+            concurrency: 最大在途请求数
+            env: 目标环境; 指定时该环境的变量覆盖录制的同名变量 (如 base_url)
+            dry_run: 仅渲染不发送
+
+        Returns:
+            回放结果
+        """
+        result = ReplayResult()
+        slots = asyncio.Semaphore(concurrency)
+        tasks: set[asyncio.Task] = set()
+        sender = bulk_sender()
+        env_vars = scene_loader.get_env_variables(env) if env else None
+
+        async def fire(scene, variables: Mapping[str, Any], target_env: str):
+            try:
+                send_start = time.perf_counter()
+                response = await sender.send(scene, variables, dry_run, env=target_env)
+                result.add(response, (time.perf_counter() - send_start) * 1000)
+            finally:
+                slots.release()
+
+        started = time.perf_counter()
+        first_t: Optional[float] = None
+        try:
+            async for item in _aiter(events):
+                try:
+                    event = parse_event(item)
+                except ValueError:
+                    result.skip("invalid")
+                    continue
+                try:
+                    scene = scene_loader.get_scene(event.scene_id)
+                except SceneConfigError:
+                    result.skip("scene_invalid")
+                    continue
+                except SceneReloadingError:
+                    result.skip("scene_reloading")
+                    continue
+                if scene is None:
+                    result.skip("scene_not_found")
+                    continue
+
+                if speed > 0:
+                    if first_t is None:
+                        first_t = event.t
+                    due = started + max(event.t - first_t, 0.0) / speed
+                    wait = due - time.perf_counter()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                await slots.acquire()
+                if speed > 0:
+                    result.lag.record(max(time.perf_counter() - due, 0.0) * 1000)
+
+                if env_vars is not None:
+                    variables: Mapping[str, Any] = ChainMap(env_vars, event.variables)
+                    target_env = env
+                else:
+                    variables = event.variables
+                    target_env = event.env
+                task = asyncio.create_task(fire(scene, variables, target_env))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            # 读取事件出错或回放被取消时，已发出的请求随之取消
+            pending = list(tasks)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        result.elapsed_s = round(time.perf_counter() - started, 3)
+        return result
+
+
+# 全局实例
+replay_runner = ReplayRunner()
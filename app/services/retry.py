@@ -0,0 +1,40 @@
+"""重试策略 - 退避时间计算与重试判定"""
+import random
+
+from app.models.schemas import CallbackResponse, RetryPolicy
+from app.services.metrics import REQUEST_ERRORS, TIMEOUT_ERRORS
+
+# 熔断快速失败时的 error_type
+CIRCUIT_OPEN = "CircuitOpen"
+
+# 可重试的异常类型: 超时、连接错误与熔断 (渲染错误等重试无意义)
+RETRYABLE_ERRORS = TIMEOUT_ERRORS | REQUEST_ERRORS | {CIRCUIT_OPEN}
+
+
+def backoff_delay(policy: RetryPolicy, attempt: int) -> float:
+    """第 attempt 次发送失败后，下一次发送前等待的秒数
+
+    Args:
+        policy: 重试策略
+        attempt: 已发送次数 (从 1 开始)
+
+    Returns:
+        等待秒数 (含抖动，不超过 max_delay)
+    """
+    if policy.backoff == "exponential":
+        delay = policy.initial_delay * policy.multiplier ** (attempt - 1)
+    elif policy.backoff == "linear":
+        delay = policy.initial_delay * attempt
+    else:
+        delay = policy.initial_delay
+    delay = min(delay, policy.max_delay)
+    if policy.jitter:
+        delay *= random.uniform(1 - policy.jitter, 1 + policy.jitter)
+    return max(min(delay, policy.max_delay), 0.0)
+
+
+def should_retry(policy: RetryPolicy, result: CallbackResponse) -> bool:
+    """判断结果是否需要重试"""
+    if result.response_status is not None:
+        return result.response_status in policy.retry_on
+    return policy.retry_on_errors and result.error_type in RETRYABLE_ERRORS
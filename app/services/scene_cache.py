@@ -0,0 +1,104 @@
+"""场景配置索引磁盘缓存 - 冷启动时跳过逐行扫描建立索引"""
+import hashlib
+import os
+import pickle
+import threading
+from typing import Optional
+
+from app.services.scene_index import INDEXED_SECTIONS, FileIndex, IndexEntry, parse_environments
+
+# 缓存格式或索引逻辑变化时递增，旧缓存自动失效
+CACHE_VERSION = 3
+
+
+class SceneCache:
+    """按源文件保存的索引快照 (pickle)
+
+    只保存每个条目的 ID、字节偏移、长度与摘要，以及 environments 段的位置，
+    不保存任何配置内容 (场景对象、变量、签名密钥等均不落盘); 场景仍在首次
+    调用时按偏移读取解析，environments 在读取缓存时从源文件重新解析。
+
+    每个源文件对应一个缓存文件，依次写入两个 pickle 对象: 头部 (缓存键) 与数据。
+    缓存键为 格式版本 + 源文件路径、mtime、大小与内容摘要，任一不符即视为未命中;
+    读取时先比对头部，不匹配时不反序列化数据部分。无法按块索引的文件不缓存。
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _cache_path(self, path: str) -> str:
+        name = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=8).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.pickle")
+
+    @staticmethod
+    def _key(path: str, content: bytes, st: os.stat_result) -> tuple:
+        digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+        return CACHE_VERSION, os.path.abspath(path), st.st_mtime_ns, st.st_size, digest
+
+    def load(self, path: str) -> Optional[FileIndex]:
+        """读取缓存
+
+        Args:
+            path: 源文件路径
+
+        Returns:
+            文件索引，未命中或缓存损坏时返回 None
+        """
+        try:
+            st = os.stat(path)
+            with open(path, "rb") as f:
+                content = f.read()
+            with open(self._cache_path(path), "rb") as f:
+                if pickle.load(f) != self._key(path, content, st):
+                    return None
+                data = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, TypeError):
+            return None
+
+        file_index = FileIndex(path, st.st_mtime_ns, st.st_size)
+        for section in INDEXED_SECTIONS:
+            file_index.sections[section] = {
+                item_id: IndexEntry(path, offset, length, digest)
+                for item_id, (offset, length, digest) in data["sections"][section].items()
+            }
+        file_index.env_range = data["env_range"]
+        file_index.environments = parse_environments(content, file_index.env_range)
+        file_index.cached = True
+        return file_index
+
+    def save(self, file_index: FileIndex) -> bool:
+        """写入缓存 (先写临时文件再原子替换，多进程同时写入也不会读到半个文件)
+
+        Args:
+            file_index: 文件索引
+
+        Returns:
+            是否写入 (无法按块索引或索引建立后文件已被修改时不写入)
+        """
+        if file_index.data is not None:
+            return False
+        st = os.stat(file_index.path)
+        if (st.st_mtime_ns, st.st_size) != (file_index.mtime_ns, file_index.size):
+            # 索引建立后文件已被修改，等待下次重载
+            return False
+        with open(file_index.path, "rb") as f:
+            key = self._key(file_index.path, f.read(), st)
+        data = {
+            "sections": {
+                section: {
+                    item_id: (entry.offset, entry.length, entry.digest)
+                    for item_id, entry in file_index.sections[section].items()
+                }
+                for section in INDEXED_SECTIONS
+            },
+            "env_range": file_index.env_range,
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_path = self._cache_path(file_index.path)
+        tmp_path = f"{cache_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+        file_index.cached = True
+        return True
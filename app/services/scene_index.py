@@ -0,0 +1,259 @@
+"""场景配置索引 - 不解析 YAML 即可定位每个场景"""
+import glob
+import hashlib
+import json
+import os
+import re
+from typing import Any, NamedTuple, Optional
+
+import yaml
+
+# 优先使用 libyaml 的 C 实现
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# 按块索引的配置段
+INDEXED_SECTIONS = ("scenes", "scenarios")
+
+# 形如 `key:` / `"key":` 的映射键行，group(5) 为冒号后的内容
+KEY_LINE = re.compile(rb'^( *)(?:"([^"]*)"|\'([^\']*)\'|([^\s#\'"{\[\-][^:#]*?)) *:(.*?)\r?\n?$')
+
+
+def yaml_load(data: Any) -> Any:
+    """使用 SafeLoader (C 实现优先) 解析 YAML"""
+    return yaml.load(data, Loader=SafeLoader)
+
+
+def resolve_paths(pattern: str) -> list[str]:
+    """解析 scenes_file: 单个文件、目录 (其中的 *.yaml/*.yml) 或 glob
+
+    Raises:
+        FileNotFoundError: 没有匹配的配置文件
+    """
+    if os.path.isdir(pattern):
+        paths = glob.glob(os.path.join(pattern, "*.yaml")) + glob.glob(os.path.join(pattern, "*.yml"))
+    elif any(ch in pattern for ch in "*?["):
+        paths = glob.glob(pattern, recursive=True)
+    else:
+        paths = [pattern] if os.path.isfile(pattern) else []
+    if not paths:
+        raise FileNotFoundError(f"场景配置文件不存在: {pattern}")
+    return sorted(paths)
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+class StaleIndexError(Exception):
+    """索引建立后文件内容已变化"""
+
+
+class _Unindexable(Exception):
+    """文件结构无法按块索引，需整文件解析"""
+
+
+class IndexEntry(NamedTuple):
+    """单个场景/批量场景在文件中的位置"""
+    path: str
+    # 块的字节偏移，-1 表示来自整文件解析结果
+    offset: int
+    length: int
+    # 块内容摘要，用于增量重载比对
+    digest: str
+
+
+class FileIndex:
+    """单个配置文件的索引"""
+
+    def __init__(self, path: str, mtime_ns: int, size: int):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.sections: dict[str, dict[str, IndexEntry]] = {section: {} for section in INDEXED_SECTIONS}
+        self.environments: dict[str, dict] = {}
+        # environments 段的字节范围
+        self.env_range: Optional[tuple[int, int]] = None
+        # 无法按块索引时的整文件解析结果
+        self.data: Optional[dict] = None
+        # 是否已有对应的磁盘缓存
+        self.cached = False
+
+    def read(self, section: str, item_id: str) -> dict:
+        """读取并解析单个条目
+
+        Raises:
+            StaleIndexError: 文件内容已变化，需要重建索引
+        """
+        if self.data is None:
+            entry = self.sections[section][item_id]
+            with open(self.path, "rb") as f:
+                f.seek(entry.offset)
+                block = f.read(entry.length)
+            if _digest(block) != entry.digest:
+                raise StaleIndexError(f"配置文件已变化: {self.path}")
+            try:
+                parsed = yaml_load(block)
+                if isinstance(parsed, dict) and item_id in parsed:
+                    return parsed[item_id] or {}
+            except yaml.YAMLError:
+                pass
+            # 块无法单独解析 (如引用了其他块的锚点)，退回整文件解析
+            with open(self.path, "rb") as f:
+                self.data = yaml_load(f) or {}
+        return (self.data.get(section) or {}).get(item_id) or {}
+
+
+def _scan(content: bytes) -> tuple[dict[str, list[tuple[str, int, int]]], Optional[tuple[int, int]]]:
+    """逐行扫描，定位 scenes/scenarios 下每个条目的字节范围以及 environments 段
+
+    Raises:
+        _Unindexable: 遇到流式写法、多文档等无法按块切分的结构
+    """
+    blocks: dict[str, list[tuple[str, int, int]]] = {section: [] for section in INDEXED_SECTIONS}
+    env_range: Optional[tuple[int, int]] = None
+    section: Optional[bytes] = None
+    section_start = 0
+    child_indent: Optional[int] = None
+    current: Optional[tuple[str, int]] = None
+    pos = 0
+
+    def close(end: int):
+        nonlocal current, env_range
+        if current is not None:
+            blocks[section.decode()].append((current[0], current[1], end))
+            current = None
+        if section == b"environments" and env_range is None:
+            env_range = (section_start, end)
+
+    for line in content.splitlines(keepends=True):
+        start = pos
+        pos += len(line)
+        stripped = line.strip()
+        if not stripped or stripped.startswith(b"#"):
+            continue
+        indent = len(line) - len(line.lstrip(b" "))
+
+        if indent == 0:
+            if stripped == b"---" and start == 0:
+                continue
+            match = KEY_LINE.match(line)
+            if not match:
+                raise _Unindexable()
+            close(start)
+            key = match.group(2) or match.group(3) or match.group(4)
+            inline = match.group(5).strip()
+            section = key
+            section_start = start
+            child_indent = None
+            if key.decode() in INDEXED_SECTIONS + ("environments",) and inline and not inline.startswith(b"#"):
+                raise _Unindexable()
+            continue
+
+        if section is None or section.decode() not in INDEXED_SECTIONS:
+            continue
+        if child_indent is None:
+            child_indent = indent
+        if indent < child_indent:
+            raise _Unindexable()
+        if indent == child_indent:
+            match = KEY_LINE.match(line)
+            if not match:
+                raise _Unindexable()
+            inline = match.group(5).strip()
+            if inline and not inline.startswith(b"#"):
+                raise _Unindexable()
+            if current is not None:
+                blocks[section.decode()].append((current[0], current[1], start))
+            key = match.group(2) or match.group(3) or match.group(4)
+            current = (key.decode("utf-8"), start)
+
+    if section is not None:
+        close(pos)
+    return blocks, env_range
+
+
+def parse_environments(content: bytes, env_range: Optional[tuple[int, int]]) -> dict[str, dict]:
+    """解析 environments 段"""
+    if env_range is None:
+        return {}
+    parsed = yaml_load(content[env_range[0]:env_range[1]]) or {}
+    return parsed.get("environments") or {}
+
+
+def index_file(path: str) -> FileIndex:
+    """建立单个文件的索引; scenes/scenarios 只记录位置，environments 直接解析"""
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        content = f.read()
+    file_index = FileIndex(path, st.st_mtime_ns, st.st_size)
+
+    try:
+        blocks, env_range = _scan(content)
+    except _Unindexable:
+        data = yaml_load(content) or {}
+        file_index.data = data
+        file_index.environments = data.get("environments") or {}
+        for section in INDEXED_SECTIONS:
+            for item_id, item in (data.get(section) or {}).items():
+                digest = _digest(json.dumps(item, sort_keys=True, default=str).encode())
+                file_index.sections[section][str(item_id)] = IndexEntry(path, -1, 0, digest)
+        return file_index
+
+    for section, items in blocks.items():
+        for item_id, start, end in items:
+            file_index.sections[section][item_id] = IndexEntry(
+                path, start, end - start, _digest(content[start:end])
+            )
+    file_index.env_range = env_range
+    file_index.environments = parse_environments(content, env_range)
+    return file_index
+
+
+class SceneIndex:
+    """全部配置文件的合并索引
+
+    场景按需从文件中读取对应的块解析; 批量场景与环境配置体积小，建索引时即解析。
+    """
+
+    def __init__(self, files: dict[str, FileIndex]):
+        self.files = files
+        self.scenes: dict[str, IndexEntry] = {}
+        self.scenarios: dict[str, IndexEntry] = {}
+        self.environments: dict[str, dict] = {}
+        self.scenario_data: dict[str, dict] = {}
+
+        for file_index in files.values():
+            for section in INDEXED_SECTIONS:
+                target = getattr(self, section)
+                for item_id, entry in file_index.sections[section].items():
+                    if item_id in target:
+                        raise ValueError(f"ID 重复: {item_id} ({target[item_id].path}, {entry.path})")
+                    target[item_id] = entry
+            for env, variables in file_index.environments.items():
+                self.environments.setdefault(env, {}).update(variables or {})
+
+        for scenario_id, entry in self.scenarios.items():
+            self.scenario_data[scenario_id] = files[entry.path].read("scenarios", scenario_id)
+
+    def read_scene(self, scene_id: str) -> dict:
+        """读取单个场景的原始配置"""
+        entry = self.scenes[scene_id]
+        return self.files[entry.path].read("scenes", scene_id)
+
+
+def build_index(pattern: str, previous: Optional[SceneIndex] = None, cache=None) -> SceneIndex:
+    """建立索引
+
+    与上次相比 mtime 和大小都未变化的文件直接沿用旧索引; 其余文件优先从
+    索引磁盘缓存 (SceneCache) 恢复，未命中时扫描文件。
+    """
+    files: dict[str, FileIndex] = {}
+    for path in resolve_paths(pattern):
+        old = previous.files.get(path) if previous else None
+        st = os.stat(path)
+        if old is not None and old.mtime_ns == st.st_mtime_ns and old.size == st.st_size:
+            files[path] = old
+            continue
+        file_index = cache.load(path) if cache is not None else None
+        files[path] = file_index if file_index is not None else index_file(path)
+    return SceneIndex(files)
@@ -1,39 +1,76 @@
 """YAML 场景加载器"""
+import asyncio
 import os
-from typing import Optional
-import yaml
+from types import MappingProxyType
+from typing import Any, Container, Mapping, Optional
 
-from app.models.schemas import Scene, Scenario, SceneStep, ScenesConfig
+import pydantic
+
+from app.models.schemas import RateLimit, Scene, Scenario, SceneStep, ScenesConfig
+from app.config import config
+from app.services.renderer import renderer
+from app.services.rate_limiter import host_key, rate_limiter
+from app.services.extractor import compile_extractors
+from app.services.matrix import resolve_matrix
+from app.services.signer import resolve_signing
+from app.services.scene_cache import SceneCache
+from app.services.scene_index import SceneIndex, StaleIndexError, build_index
+
+
+class SceneConfigError(ValueError):
+    """场景配置错误 (场景在首次获取时才解析，错误在此时暴露)"""
+
+
+class SceneReloadingError(Exception):
+    """配置文件已变化、正在后台重建索引，稍后重试即可"""
+
+
+def _format_validation_error(e: pydantic.ValidationError) -> str:
+    """把模型校验错误整理为 字段: 原因 列表"""
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in error['loc']) or '(root)'}: {error['msg']}"
+        for error in e.errors()
+    )
 
 
 class SceneLoader:
-    """场景配置加载器"""
+    """场景配置加载器
+
+    scenes_file 可以是单个文件、目录或 glob。加载时只建立轻量索引
+    (场景 ID → 文件、偏移、摘要)，场景在首次获取时才解析;
+    批量场景与环境配置在加载时解析，依赖关系错误仍在加载阶段暴露。
 
-    def __init__(self):
+    指定 cache_dir 时，源文件未变化的情况下从磁盘缓存恢复索引，跳过逐行扫描;
+    缓存由 save_cache() 写入。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
         self._config: Optional[ScenesConfig] = None
+        self._index: Optional[SceneIndex] = None
+        self._cache = SceneCache(cache_dir) if cache_dir else None
+        self._save_task: Optional[asyncio.Task] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        # 预先合并并冻结的 场景 defaults + 环境变量: 场景 ID → (场景对象, {环境: 变量})
+        self._layers: dict[str, tuple[Scene, dict[str, Mapping[str, Any]]]] = {}
         self._file_path: str = ""
+        self._last_changes: dict[str, list[str]] = {}
 
     def load(self, file_path: str = "scenes.yaml") -> ScenesConfig:
-        """加载场景配置文件
+        """加载场景配置
 
         Args:
-            file_path: YAML 文件路径
+            file_path: YAML 文件路径、目录或 glob
 
         Returns:
-            场景配置对象
+            场景配置对象 (scenes 中只包含已解析的场景)
 
         Raises:
             FileNotFoundError: 配置文件不存在
             ValueError: 配置格式错误
         """
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"场景配置文件不存在: {file_path}")
-
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f) or {}
-
+        index = build_index(file_path, cache=self._cache)
         self._file_path = file_path
-        self._config = self._parse_config(data)
+        self._swap(index)
         return self._config
 
     def reload(self) -> ScenesConfig:
@@ -44,57 +81,315 @@ class SceneLoader:
         """
         if not self._file_path:
             raise RuntimeError("尚未加载过配置文件，请先调用 load()")
-        return self.load(self._file_path)
+        self._swap(build_index(self._file_path, self._index, self._cache))
+        return self._config
 
-    def _parse_config(self, data: dict) -> ScenesConfig:
-        """解析配置数据
+    async def reload_async(self) -> dict[str, list[str]]:
+        """在线程中重建索引，再在事件循环中增量替换
 
-        Args:
-            data: YAML 解析后的字典
+        Returns:
+            变更摘要，见 _swap()
+        """
+        if not self._file_path:
+            raise RuntimeError("尚未加载过配置文件，请先调用 load()")
+        index = await asyncio.to_thread(build_index, self._file_path, self._index, self._cache)
+        changes = self._swap(index)
+        self.schedule_save_cache()
+        return changes
+
+    @property
+    def last_changes(self) -> dict[str, list[str]]:
+        """最近一次加载的变更摘要"""
+        return self._last_changes
+
+    def _swap(self, index: SceneIndex) -> dict[str, list[str]]:
+        """与当前索引比对后原子替换
+
+        摘要未变化的场景沿用已解析的对象，内容未变化的批量场景沿用原对象，
+        依赖对象身份的缓存不会失效; 进行中的请求持有旧对象，不受替换影响。
 
         Returns:
-            场景配置对象
+            变更摘要: added / changed / removed 的场景与批量场景 ID，
+            environments 为新增、修改或删除的环境名
+
+        Raises:
+            ValueError: 配置格式错误 (此时保留原配置)
         """
-        # 解析环境配置
-        environments = data.get("environments", {})
-
-        # 解析场景
-        scenes_data = data.get("scenes", {})
-        scenes = {}
-        for scene_id, scene_data in scenes_data.items():
-            scenes[scene_id] = Scene(
-                id=scene_id,
-                name=scene_data.get("name", scene_id),
-                description=scene_data.get("description", ""),
-                url=scene_data.get("url", ""),
-                method=scene_data.get("method", "POST").upper(),
-                headers=scene_data.get("headers", {}),
-                body=scene_data.get("body", ""),
-                defaults=scene_data.get("defaults", {}),
+        old_index, old_config = self._index, self._config
+        environments, host_limits = self._split_environments(index.environments)
+        changes: dict[str, list[str]] = {"added": [], "changed": [], "removed": [], "environments": []}
+
+        scenes: dict[str, Scene] = {}
+        for scene_id, entry in index.scenes.items():
+            old_entry = old_index.scenes.get(scene_id) if old_index else None
+            if old_entry is None:
+                changes["added"].append(scene_id)
+            elif old_entry.digest != entry.digest:
+                changes["changed"].append(scene_id)
+            elif scene_id in old_config.scenes:
+                scenes[scene_id] = old_config.scenes[scene_id]
+
+        scenarios: dict[str, Scenario] = {}
+        for scenario_id, scenario_data in index.scenario_data.items():
+            scenario = self._parse_scenario(
+                scenario_id, scenario_data, index.scenes, os.path.dirname(index.scenarios[scenario_id].path)
             )
-
-        # 解析批量场景
-        scenarios_data = data.get("scenarios", {})
-        scenarios = {}
-        for scenario_id, scenario_data in scenarios_data.items():
-            steps = []
-            for step_data in scenario_data.get("steps", []):
-                steps.append(SceneStep(
-                    scene=step_data.get("scene", ""),
-                    delay_after=step_data.get("delay_after", 0.0),
-                ))
-            scenarios[scenario_id] = Scenario(
-                id=scenario_id,
-                name=scenario_data.get("name", scenario_id),
-                description=scenario_data.get("description", ""),
-                steps=steps,
+            old_scenario = old_config.scenarios.get(scenario_id) if old_config else None
+            if old_scenario is None:
+                changes["added"].append(scenario_id)
+            elif old_scenario == scenario:
+                scenario = old_scenario
+            else:
+                changes["changed"].append(scenario_id)
+            scenarios[scenario_id] = scenario
+
+        if old_config is not None:
+            changes["removed"].extend(i for i in old_index.scenes if i not in index.scenes)
+            changes["removed"].extend(i for i in old_config.scenarios if i not in scenarios)
+            changes["environments"] = sorted(
+                env
+                for env in old_index.environments.keys() | index.environments.keys()
+                if old_index.environments.get(env) != index.environments.get(env)
             )
 
-        return ScenesConfig(
+        env_changed = old_config is None or old_config.environments != environments
+        layers = {}
+        for scene_id, scene in scenes.items():
+            old_layers = self._layers.get(scene_id)
+            if env_changed or old_layers is None or old_layers[0] is not scene:
+                old_layers = self._build_layers(scene, environments)
+            layers[scene_id] = old_layers
+
+        self._index = index
+        self._config = ScenesConfig(
             environments=environments,
             scenes=scenes,
             scenarios=scenarios,
         )
+        self._layers = layers
+        self._last_changes = changes
+        rate_limiter.configure_hosts(host_limits)
+        return changes
+
+    @staticmethod
+    def _split_environments(environments: dict[str, dict]) -> tuple[dict[str, dict], dict[str, RateLimit]]:
+        """从环境配置中分离 rate_limit (不作为模板变量)
+
+        Returns:
+            (环境变量, 按 base_url 主机的限流配置)
+
+        Raises:
+            ValueError: rate_limit 格式错误或缺少 base_url
+        """
+        variables: dict[str, dict] = {}
+        host_limits: dict[str, RateLimit] = {}
+        for env, env_vars in environments.items():
+            env_vars = env_vars or {}
+            if "rate_limit" not in env_vars:
+                variables[env] = env_vars
+                continue
+            variables[env] = {key: value for key, value in env_vars.items() if key != "rate_limit"}
+            base_url = env_vars.get("base_url")
+            if not base_url:
+                raise ValueError(f"环境 {env} 配置了 rate_limit 但缺少 base_url")
+            host = host_key(base_url)
+            limit = RateLimit.model_validate(env_vars["rate_limit"])
+            if host in host_limits and host_limits[host] != limit:
+                raise ValueError(f"环境 {env} 的 rate_limit 与共用主机 {host} 的其他环境不一致")
+            host_limits[host] = limit
+        return variables, host_limits
+
+    def schedule_save_cache(self) -> None:
+        """在后台线程中写入磁盘缓存，不阻塞启动与重载 (需在事件循环中调用)"""
+        if self._cache is None or self._index is None:
+            return
+        self._save_task = asyncio.get_running_loop().create_task(self._save_cache_async())
+
+    async def _save_cache_async(self) -> None:
+        try:
+            await asyncio.to_thread(self.save_cache)
+        except Exception as e:
+            print(f"⚠️  场景缓存写入失败: {e}")
+
+    def save_cache(self) -> int:
+        """为尚无缓存的配置文件写入索引缓存 (可在线程中执行)
+
+        Returns:
+            写入的缓存文件数
+        """
+        index = self._index
+        if self._cache is None or index is None:
+            return 0
+        saved = 0
+        for file_index in index.files.values():
+            if not file_index.cached and self._cache.save(file_index):
+                saved += 1
+        return saved
+
+    def _parse_scene(self, scene_id: str, scene_data: dict, base_dir: str) -> Scene:
+        """解析单个场景并预编译模板
+
+        Args:
+            scene_id: 场景 ID
+            scene_data: YAML 解析后的字典
+            base_dir: 场景所在配置文件的目录，matrix 数据文件的相对路径以此为基准
+        """
+        scene = Scene(
+            id=scene_id,
+            name=scene_data.get("name", scene_id),
+            description=scene_data.get("description", ""),
+            url=scene_data.get("url", ""),
+            method=scene_data.get("method", "POST").upper(),
+            headers=scene_data.get("headers", {}),
+            body=scene_data.get("body", ""),
+            defaults=scene_data.get("defaults", {}),
+            retry=scene_data.get("retry"),
+            rate_limit=scene_data.get("rate_limit"),
+            capture_body=scene_data.get("capture_body", True),
+            matrix=scene_data.get("matrix"),
+            signing=scene_data.get("signing"),
+        )
+        if scene.matrix is not None:
+            try:
+                scene.matrix = resolve_matrix(scene.matrix, base_dir)
+            except ValueError as e:
+                raise ValueError(f"场景 {scene_id} 的 matrix 配置错误: {e}")
+        self._compile_scene(scene)
+        return scene
+
+    def _parse_scenario(
+        self, scenario_id: str, scenario_data: dict, scene_ids: Container[str], base_dir: str
+    ) -> Scenario:
+        """解析单个批量场景并校验步骤依赖
+
+        Args:
+            scenario_id: 批量场景 ID
+            scenario_data: YAML 解析后的字典
+            scene_ids: 全部可用的场景 ID
+            base_dir: 批量场景所在配置文件的目录，matrix 数据文件的相对路径以此为基准
+
+        Returns:
+            批量场景对象
+        """
+        steps = []
+        for number, step_data in enumerate(scenario_data.get("steps", []), start=1):
+            depends_on = step_data.get("depends_on")
+            if isinstance(depends_on, str):
+                depends_on = [depends_on]
+            try:
+                steps.append(SceneStep(
+                    id=str(step_data.get("id", "")),
+                    scene=step_data.get("scene", ""),
+                    delay_after=step_data.get("delay_after", 0.0),
+                    depends_on=depends_on,
+                    parallel_group=step_data.get("parallel_group"),
+                    extract=step_data.get("extract") or {},
+                ))
+            except pydantic.ValidationError as e:
+                # 如 extract 的规则不是字符串: 在加载阶段报错，并指明所在步骤
+                raise ValueError(f"批量场景 {scenario_id} 第 {number} 个步骤配置错误: {_format_validation_error(e)}")
+        self._resolve_steps(scenario_id, steps, scene_ids)
+        matrix = scenario_data.get("matrix")
+        if matrix is not None:
+            try:
+                matrix = resolve_matrix(matrix, base_dir)
+            except ValueError as e:
+                raise ValueError(f"批量场景 {scenario_id} 的 matrix 配置错误: {e}")
+        return Scenario(
+            id=scenario_id,
+            name=scenario_data.get("name", scenario_id),
+            description=scenario_data.get("description", ""),
+            steps=steps,
+            matrix=matrix,
+        )
+
+    def _resolve_steps(self, scenario_id: str, steps: list[SceneStep], scenes: Container[str]) -> None:
+        """补全步骤 ID 与依赖关系并校验依赖图
+
+        未声明 depends_on 的步骤依赖上一阶段的全部步骤; 相邻且 parallel_group
+        相同的步骤构成同一阶段。因此不使用新字段的配置仍按顺序执行。
+
+        Raises:
+            ValueError: 引用不存在的场景/步骤、步骤 ID 重复、提取规则错误或存在循环依赖
+        """
+        explicit_ids: set[str] = set()
+        for step in steps:
+            if step.scene not in scenes:
+                raise ValueError(f"批量场景 {scenario_id} 引用了不存在的场景: {step.scene}")
+            if step.id:
+                if step.id in explicit_ids:
+                    raise ValueError(f"批量场景 {scenario_id} 步骤 ID 重复: {step.id}")
+                explicit_ids.add(step.id)
+
+        # 未指定 id 的步骤以场景 ID 命名，重复时依次加后缀: ping、ping#2、ping#3
+        step_ids: set[str] = set(explicit_ids)
+        for step in steps:
+            if step.id:
+                continue
+            step_id, n = step.scene, 1
+            while step_id in step_ids:
+                n += 1
+                step_id = f"{step.scene}#{n}"
+            step.id = step_id
+            step_ids.add(step_id)
+
+        prev_stage: list[str] = []
+        stage: list[str] = []
+        stage_group: Optional[str] = None
+        for step in steps:
+            try:
+                compile_extractors(step.extract)
+            except ValueError as e:
+                raise ValueError(f"批量场景 {scenario_id} 步骤 {step.id}: {e}")
+
+            if not stage or step.parallel_group is None or step.parallel_group != stage_group:
+                if stage:
+                    prev_stage = stage
+                stage = []
+                stage_group = step.parallel_group
+            if step.depends_on is None:
+                step.depends_on = list(prev_stage)
+            stage.append(step.id)
+
+        for step in steps:
+            for dep in step.depends_on:
+                if dep not in step_ids:
+                    raise ValueError(f"批量场景 {scenario_id} 步骤 {step.id} 依赖了不存在的步骤: {dep}")
+
+        # Kahn 拓扑排序检测循环依赖
+        pending = {step.id: len(set(step.depends_on)) for step in steps}
+        dependents: dict[str, list[str]] = {step.id: [] for step in steps}
+        for step in steps:
+            for dep in set(step.depends_on):
+                dependents[dep].append(step.id)
+        ready = [step_id for step_id, count in pending.items() if count == 0]
+        visited = 0
+        while ready:
+            step_id = ready.pop()
+            visited += 1
+            for dependent in dependents[step_id]:
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+        if visited != len(steps):
+            cyclic = sorted(step_id for step_id, count in pending.items() if count > 0)
+            raise ValueError(f"批量场景 {scenario_id} 存在循环依赖: {', '.join(cyclic)}")
+
+    def _compile_scene(self, scene: Scene) -> None:
+        """预编译场景中的模板，渲染时直接命中缓存"""
+        renderer.compile(scene.url)
+        for value in scene.headers.values():
+            renderer.compile(value)
+        if scene.body:
+            renderer.compile(scene.body)
+        if scene.signing is not None:
+            try:
+                signing = resolve_signing(scene.signing)
+            except ValueError as e:
+                raise ValueError(f"场景 {scene.id} 的 signing 配置错误: {e}")
+            renderer.compile(signing["payload"])
+            for value in signing["headers"].values():
+                renderer.compile(value)
 
     @property
     def config(self) -> Optional[ScenesConfig]:
@@ -102,17 +397,55 @@ class SceneLoader:
         return self._config
 
     def get_scene(self, scene_id: str) -> Optional[Scene]:
-        """获取指定场景
+        """获取指定场景，首次获取时从索引位置读取并解析
 
         Args:
             scene_id: 场景 ID
 
         Returns:
             场景对象，不存在返回 None
+
+        Raises:
+            SceneReloadingError: 文件在上次加载后被修改，已在后台重建索引
+            SceneConfigError: 场景配置错误
         """
         if not self._config:
             return None
-        return self._config.scenes.get(scene_id)
+        scene = self._config.scenes.get(scene_id)
+        if scene is not None or scene_id not in self._index.scenes:
+            return scene
+        try:
+            scene_data = self._index.read_scene(scene_id)
+        except StaleIndexError:
+            # 文件在上次加载后被修改: 事件循环中在后台重建索引，不阻塞其他请求
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # 无事件循环 (命令行工具) 时直接同步重建
+                self.reload()
+                if scene_id not in self._index.scenes:
+                    return None
+                scene_data = self._index.read_scene(scene_id)
+            else:
+                if self._reload_task is None or self._reload_task.done():
+                    self._reload_task = loop.create_task(self._reload_stale())
+                raise SceneReloadingError(f"场景配置文件已变化，正在重新加载，请稍后重试: {scene_id}")
+        try:
+            scene = self._parse_scene(scene_id, scene_data, os.path.dirname(self._index.scenes[scene_id].path))
+        except pydantic.ValidationError as e:
+            raise SceneConfigError(f"场景 {scene_id} 配置错误: {_format_validation_error(e)}")
+        except ValueError as e:
+            raise SceneConfigError(str(e))
+        self._layers[scene_id] = self._build_layers(scene, self._config.environments)
+        self._config.scenes[scene_id] = scene
+        return scene
+
+    async def _reload_stale(self) -> None:
+        """索引过期时的后台重建"""
+        try:
+            await self.reload_async()
+        except Exception as e:
+            print(f"❌ 场景配置重载失败，保留原配置: {e}")
 
     def get_scenario(self, scenario_id: str) -> Optional[Scenario]:
         """获取指定批量场景
@@ -140,11 +473,49 @@ class SceneLoader:
             return {}
         return self._config.environments.get(env, {})
 
+    def base_variables(self, scene: Scene, env: str) -> Mapping[str, Any]:
+        """获取 场景 defaults < 环境变量 的合并结果 (只读)
+
+        场景解析时即按全部环境预先合并; 场景对象已被重载替换时临时合并。
+
+        Args:
+            scene: 场景配置
+            env: 环境名称
+
+        Returns:
+            只读的变量映射
+        """
+        layers = self._layers.get(scene.id)
+        if layers is None or layers[0] is not scene:
+            return MappingProxyType({**scene.defaults, **self.get_env_variables(env)})
+        layer = layers[1].get(env)
+        return layer if layer is not None else MappingProxyType(scene.defaults)
+
+    @staticmethod
+    def _build_layers(scene: Scene, environments: dict[str, dict]) -> tuple[Scene, dict[str, Mapping[str, Any]]]:
+        """按环境合并场景 defaults 与环境变量并冻结"""
+        return scene, {
+            env: MappingProxyType({**scene.defaults, **(env_vars or {})})
+            for env, env_vars in environments.items()
+        }
+
+    @property
+    def scenes_count(self) -> int:
+        """场景总数 (含尚未解析的)"""
+        return len(self._index.scenes) if self._index else 0
+
+    @property
+    def scenarios_count(self) -> int:
+        """批量场景总数"""
+        return len(self._config.scenarios) if self._config else 0
+
     def list_scenes(self) -> list[Scene]:
-        """列出所有场景"""
+        """列出所有场景 (会解析全部尚未解析的场景)"""
         if not self._config:
             return []
-        return list(self._config.scenes.values())
+        scenes = (self.get_scene(scene_id) for scene_id in list(self._index.scenes))
+        # 解析期间索引可能被后台重建，已删除的场景返回 None
+        return [scene for scene in scenes if scene is not None]
 
     def list_scenarios(self) -> list[Scenario]:
         """列出所有批量场景"""
@@ -154,4 +525,4 @@ class SceneLoader:
 
 
 # 全局实例
-scene_loader = SceneLoader()
+scene_loader = SceneLoader(cache_dir=config.scenes_cache_dir if config.scenes_cache else None)
@@ -0,0 +1,121 @@
+"""场景配置文件监听 - 变更后自动增量重载"""
+import asyncio
+import fnmatch
+import glob
+import os
+from typing import Callable, Optional
+
+from app.config import config
+from app.services.scene_index import resolve_paths
+from app.services.scene_loader import SceneLoader, scene_loader
+
+try:
+    import watchfiles
+except ImportError:  # 未安装时退回 mtime 轮询
+    watchfiles = None
+
+
+class SceneWatcher:
+    """监听场景配置文件并调用 SceneLoader.reload_async()
+
+    安装了 watchfiles (uvicorn[standard] 自带) 时使用 inotify 等系统通知，
+    否则按 interval 轮询各文件的 mtime 与大小。目录与 glob 下新增、删除文件
+    同样会触发重载。重载失败时保留原配置。
+    """
+
+    def __init__(self, loader: SceneLoader, interval: float = 1.0):
+        self.loader = loader
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, path: str) -> None:
+        """开始监听 (幂等)"""
+        if self.running:
+            return
+        self._stop = asyncio.Event()
+        watch = self._watch_notify if watchfiles is not None else self._watch_poll
+        self._task = asyncio.create_task(watch(path))
+
+    async def close(self) -> None:
+        """停止监听"""
+        if self._task is None:
+            return
+        # watchfiles 的后台线程需通过 stop_event 退出，直接取消任务会遗留线程
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=self.interval + 5)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        self._task = None
+
+    def _watch_target(self, path: str) -> tuple[str, Callable[[str], bool]]:
+        """监听的目录及文件过滤条件 (path 可以是文件、目录或 glob)"""
+        target = os.path.abspath(path)
+        if os.path.isdir(target):
+            return target, lambda changed: (
+                os.path.dirname(changed) == target and changed.endswith((".yaml", ".yml"))
+            )
+        if glob.has_magic(target):
+            # 从 glob 中第一个含通配符的部分之前的目录开始监听
+            base = target
+            while glob.has_magic(base):
+                base = os.path.dirname(base)
+            return base, lambda changed: fnmatch.fnmatch(changed, target)
+        # 监听所在目录，编辑器以重命名方式替换文件时也能收到通知
+        return os.path.dirname(target), lambda changed: changed == target
+
+    async def _watch_notify(self, path: str) -> None:
+        base, matches = self._watch_target(path)
+        async for _ in watchfiles.awatch(
+            base,
+            watch_filter=lambda change, changed_path: matches(os.path.abspath(changed_path)),
+            debounce=int(self.interval * 1000),
+            stop_event=self._stop,
+            recursive=glob.has_magic(path),
+        ):
+            await self._reload()
+
+    async def _watch_poll(self, path: str) -> None:
+        last = self._stat(path)
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            current = self._stat(path)
+            if current != last:
+                last = current
+                await self._reload()
+
+    def _stat(self, path: str) -> Optional[dict[str, tuple[int, int]]]:
+        try:
+            return {
+                file_path: (st.st_mtime_ns, st.st_size)
+                for file_path in resolve_paths(path)
+                for st in (os.stat(file_path),)
+            }
+        except OSError:
+            return None
+
+    async def _reload(self) -> None:
+        try:
+            changes = await self.loader.reload_async()
+        except Exception as e:
+            print(f"❌ 场景配置重载失败，保留原配置: {e}")
+            return
+        if any(changes.values()):
+            print(
+                f"🔄 场景配置已更新: 新增 {len(changes['added'])}, "
+                f"修改 {len(changes['changed'])}, 删除 {len(changes['removed'])}, "
+                f"环境 {len(changes['environments'])}"
+            )
+
+
+# 全局实例
+scene_watcher = SceneWatcher(scene_loader, interval=config.scenes_watch_interval)
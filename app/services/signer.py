@@ -0,0 +1,276 @@
+"""回调签名 - 按场景的 signing 配置对渲染后的请求体签名
+
+签名原文 (payload) 与签名头都是模板，可使用场景变量及:
+    {{_body}}            渲染后的请求体
+    {{_sign_timestamp}}  签名时间戳 (秒)
+    {{_sign_nonce}}      随机串
+    {{_sign_key_id}}     密钥 ID
+    {{_signature}}       签名结果 (仅签名头中可用)
+
+预设 (preset) 只是 algorithm / encoding / payload / headers 的默认值，显式配置的字段优先。
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+import uuid
+from collections import ChainMap, OrderedDict
+from typing import Any, Callable, Mapping, Optional
+
+from app.models.schemas import Scene, SigningConfig
+from app.services.renderer import RenderContext, renderer
+
+try:
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+except ImportError:  # 未安装时只支持 HMAC
+    serialization = None
+
+HMAC_ALGORITHMS = {"hmac-sha1": "sha1", "hmac-sha256": "sha256", "hmac-sha512": "sha512"}
+RSA_ALGORITHMS = {"rsa-sha256"}
+
+DEFAULT_SIGNING = {
+    "algorithm": "hmac-sha256",
+    "encoding": "hex",
+    "payload": "{{_body}}",
+    "headers": {"X-Signature": "{{_signature}}"},
+}
+
+PRESETS: dict[str, dict[str, Any]] = {
+    "github": {
+        "algorithm": "hmac-sha256",
+        "encoding": "hex",
+        "payload": "{{_body}}",
+        "headers": {"X-Hub-Signature-256": "sha256={{_signature}}"},
+    },
+    "stripe": {
+        "algorithm": "hmac-sha256",
+        "encoding": "hex",
+        "payload": "{{_sign_timestamp}}.{{_body}}",
+        "headers": {"Stripe-Signature": "t={{_sign_timestamp}},v1={{_signature}}"},
+    },
+    "slack": {
+        "algorithm": "hmac-sha256",
+        "encoding": "hex",
+        "payload": "v0:{{_sign_timestamp}}:{{_body}}",
+        "headers": {
+            "X-Slack-Request-Timestamp": "{{_sign_timestamp}}",
+            "X-Slack-Signature": "v0={{_signature}}",
+        },
+    },
+    "shopify": {
+        "algorithm": "hmac-sha256",
+        "encoding": "base64",
+        "payload": "{{_body}}",
+        "headers": {"X-Shopify-Hmac-Sha256": "{{_signature}}"},
+    },
+    "wechatpay": {
+        "algorithm": "rsa-sha256",
+        "encoding": "base64",
+        "payload": "{{_sign_timestamp}}\n{{_sign_nonce}}\n{{_body}}\n",
+        "headers": {
+            "Wechatpay-Timestamp": "{{_sign_timestamp}}",
+            "Wechatpay-Nonce": "{{_sign_nonce}}",
+            "Wechatpay-Signature": "{{_signature}}",
+            "Wechatpay-Serial": "{{_sign_key_id}}",
+            "Wechatpay-Signature-Type": "WECHATPAY2-SHA256-RSA2048",
+        },
+    },
+}
+
+
+class SigningError(Exception):
+    """签名失败 (密钥缺失或无法解析)"""
+
+
+class KeyCache:
+    """已解析密钥的缓存，按密钥 ID 索引
+
+    每项记录密钥材料的指纹 (文本密钥为渲染后的内容，密钥文件为 mtime 与大小)，
+    指纹变化时重新解析; 超出 max_size 时淘汰最久未使用的项。
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._keys: OrderedDict[str, tuple[Any, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.parse_ms = 0.0
+
+    def get(self, key_id: str, fingerprint: Any, load: Callable[[], Any]) -> Any:
+        """取已解析的密钥，未命中或指纹变化时调用 load 解析"""
+        with self._lock:
+            cached = self._keys.get(key_id)
+            if cached is not None and cached[0] == fingerprint:
+                self._keys.move_to_end(key_id)
+                self.hits += 1
+                return cached[1]
+
+        start = time.perf_counter()
+        key = load()
+        with self._lock:
+            self.parse_ms += (time.perf_counter() - start) * 1000
+            self.misses += 1
+            self._keys[key_id] = (fingerprint, key)
+            self._keys.move_to_end(key_id)
+            while len(self._keys) > self.max_size:
+                self._keys.popitem(last=False)
+        return key
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._keys),
+            "hits": self.hits,
+            "misses": self.misses,
+            "parse_ms": round(self.parse_ms, 3),
+        }
+
+
+def resolve_signing(signing: SigningConfig) -> dict[str, Any]:
+    """合并预设与显式配置
+
+    Raises:
+        ValueError: 预设不存在、算法不支持、缺少密钥或未安装 cryptography
+    """
+    if signing.preset is not None and signing.preset not in PRESETS:
+        raise ValueError(f"签名预设不存在: {signing.preset}，可选: {', '.join(PRESETS)}")
+    resolved = dict(PRESETS[signing.preset] if signing.preset else DEFAULT_SIGNING)
+    for field in ("algorithm", "encoding", "payload", "headers"):
+        value = getattr(signing, field)
+        if value is not None:
+            resolved[field] = value
+
+    algorithm = resolved["algorithm"]
+    if algorithm not in HMAC_ALGORITHMS and algorithm not in RSA_ALGORITHMS:
+        raise ValueError(f"签名算法不支持: {algorithm}")
+    if algorithm in RSA_ALGORITHMS and serialization is None:
+        raise ValueError("RSA 签名需要安装 cryptography")
+    if not signing.key and not signing.key_file:
+        raise ValueError("签名配置缺少 key 或 key_file")
+    if resolved["encoding"] not in ("hex", "base64"):
+        raise ValueError(f"签名编码不支持: {resolved['encoding']}，应为 hex 或 base64")
+    return resolved
+
+
+class Signer:
+    """计算场景的签名头
+
+    HMAC 密钥解析为已初始化的 HMAC 对象，RSA 私钥解析为密钥对象，均按密钥 ID 缓存;
+    每次签名只需 copy/update 或一次私钥运算。
+    """
+
+    def __init__(self):
+        self.keys = KeyCache()
+        self._resolved: dict[str, tuple[SigningConfig, dict[str, Any]]] = {}
+
+    def _config(self, scene: Scene) -> dict[str, Any]:
+        """场景的有效签名配置 (按 signing 对象缓存，重载后自动失效)"""
+        cached = self._resolved.get(scene.id)
+        if cached is None or cached[0] is not scene.signing:
+            cached = (scene.signing, resolve_signing(scene.signing))
+            self._resolved[scene.id] = cached
+        return cached[1]
+
+    def _key(self, signing: SigningConfig, algorithm: str, variables: Mapping[str, Any]) -> tuple[str, Any]:
+        """取已解析的密钥
+
+        Returns:
+            (密钥 ID, HMAC 对象或 RSA 私钥)
+        """
+        if signing.key_file:
+            path = signing.key_file
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                raise SigningError(f"无法读取签名密钥文件: {path}: {e}")
+            fingerprint: Any = (stat.st_mtime_ns, stat.st_size)
+            key_id = signing.key_id or f"file:{path}"
+
+            def read() -> bytes:
+                with open(path, "rb") as f:
+                    return f.read()
+        else:
+            material = renderer.render(signing.key, variables)
+            if "{{" in material:
+                raise SigningError(f"签名密钥中有未定义的变量: {signing.key}")
+            fingerprint = material
+            key_id = signing.key_id or "key:" + hashlib.blake2b(material.encode(), digest_size=8).hexdigest()
+
+            def read() -> bytes:
+                return material.encode()
+
+        if algorithm in HMAC_ALGORITHMS:
+            digest = HMAC_ALGORITHMS[algorithm]
+            return key_id, self.keys.get(
+                f"{key_id}#{algorithm}", fingerprint, lambda: hmac.new(read(), digestmod=digest)
+            )
+
+        def load_rsa():
+            try:
+                return serialization.load_pem_private_key(read(), password=None)
+            except ValueError as e:
+                raise SigningError(f"无法解析 RSA 私钥 {key_id}: {e}")
+        return key_id, self.keys.get(key_id, fingerprint, load_rsa)
+
+    def sign(
+        self,
+        scene: Scene,
+        body: Optional[str],
+        variables: Mapping[str, Any],
+        context: Optional[RenderContext] = None,
+    ) -> dict[str, str]:
+        """计算签名头
+
+        Args:
+            scene: 场景配置 (scene.signing 不为空)
+            body: 渲染后的请求体
+            variables: 渲染变量
+            context: 渲染上下文
+
+        Returns:
+            需要加入请求的签名头
+
+        Raises:
+            SigningError: 密钥缺失或无法解析
+        """
+        signing = scene.signing
+        resolved = self._config(scene)
+        algorithm = resolved["algorithm"]
+        key_id, key = self._key(signing, algorithm, variables)
+
+        sign_vars = {
+            "_body": body or "",
+            "_sign_timestamp": int(time.time()),
+            "_sign_nonce": uuid.uuid4().hex,
+            "_sign_key_id": key_id,
+        }
+        payload_template = resolved["payload"]
+        if payload_template == "{{_body}}":
+            payload = sign_vars["_body"]
+        else:
+            payload = renderer.render(payload_template, ChainMap(sign_vars, variables), context)
+        data = payload.encode()
+
+        if algorithm in HMAC_ALGORITHMS:
+            mac = key.copy()
+            mac.update(data)
+            raw = mac.digest()
+        else:
+            raw = key.sign(data, padding.PKCS1v15(), hashes.SHA256())
+        sign_vars["_signature"] = raw.hex() if resolved["encoding"] == "hex" else base64.b64encode(raw).decode()
+        return renderer.render_dict(resolved["headers"], ChainMap(sign_vars, variables), context)
+
+    def stats(self) -> dict:
+        """密钥缓存统计"""
+        return self.keys.stats()
+
+
+# 全局实例
+signer = Signer()
@@ -0,0 +1,338 @@
+"""端到端基准: 经真实 FastAPI 应用驱动 /api/callback 与 /api/scenario
+
+运行:
+    python benchmarks/bench_app.py [--sizes small medium large] [--concurrency 1 10 100] [-n 2000]
+    python benchmarks/bench_app.py --output bench.json
+    python benchmarks/bench_app.py --compare bench.json     # 与之前保存的结果对比
+
+进程内启动一个 HTTP/1.1 mock 回调接收端 (keep-alive，固定返回 200 JSON)，应用经
+ASGI 传输直接调用，不经过网络与 uvicorn，测得的是 callback-tool 自身的开销。
+
+按场景大小 (模板变量数与 body 长度) 和并发数组合，输出:
+  rps          吞吐 (次/秒)
+  latency      客户端观测的端到端延迟
+  stages       分阶段延迟: merge (变量合并) / render (模板渲染) / send (发送并读取响应) /
+               serialize (响应模型校验) / encode (JSON 编码)
+  memory       RSS 与运行期间的增量; --tracemalloc 时另有 Python 分配峰值 (会显著拖慢)
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 场景大小: 名称 → 模板变量数
+SIZES = {"small": 5, "medium": 50, "large": 500}
+# 批量场景步骤数
+SCENARIO_STEPS = 5
+STAGES = ("merge", "render", "send", "serialize", "encode")
+
+MOCK_RESPONSE = json.dumps({"code": 0, "message": "ok"}).encode()
+
+
+async def handle_mock(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """mock 接收端: 读完请求体后返回固定 JSON，连接保持"""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line[:15].lower() == b"content-length:":
+                    length = int(line[15:])
+            if length:
+                await reader.readexactly(length)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: %d\r\n\r\n%s" % (len(MOCK_RESPONSE), MOCK_RESPONSE)
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def generate(path: str, base_url: str) -> None:
+    """按 SIZES 生成场景与批量场景"""
+    scenes, scenarios = {}, {}
+    for size, count in SIZES.items():
+        fields = ", ".join(f'"field{i}": "{{{{v{i}}}}}"' for i in range(count))
+        scenes[f"bench-{size}"] = {
+            "name": f"bench {size}",
+            "url": "{{base_url}}/callback/" + size,
+            "method": "POST",
+            "headers": {"Content-Type": "application/json", "X-Trace": "{{trace}}"},
+            "body": "{" + fields + "}",
+            "defaults": {"trace": "t-0", **{f"v{i}": f"value-{i:04d}" for i in range(count)}},
+        }
+        scenarios[f"bench-{size}-flow"] = {
+            "name": f"bench {size} flow",
+            "steps": [{"id": f"s{i}", "scene": f"bench-{size}"} for i in range(SCENARIO_STEPS)],
+        }
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(
+            {"environments": {"bench": {"base_url": base_url}}, "scenes": scenes, "scenarios": scenarios},
+            f, allow_unicode=True, sort_keys=False,
+        )
+
+
+def rss_mb() -> float:
+    """当前 RSS (MB)，非 Linux 时退回进程峰值"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+class StageTimer:
+    """替换应用中各阶段的函数，记录每次调用耗时"""
+
+    def __init__(self):
+        from app.services.histogram import LatencyHistogram
+
+        self._histogram = LatencyHistogram
+        self.stages = {}
+        self.reset()
+
+    def reset(self) -> None:
+        self.stages = {stage: self._histogram() for stage in STAGES}
+
+    def wrap(self, stage: str, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.stages[stage].record((time.perf_counter() - start) * 1000)
+        return timed
+
+    def wrap_async(self, stage: str, func):
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.stages[stage].record((time.perf_counter() - start) * 1000)
+        return timed
+
+    def install(self) -> None:
+        import fastapi.routing
+        from starlette.responses import JSONResponse
+        from app.api import callback, scenario
+
+        merge = self.wrap("merge", callback._merge_variables)
+        callback._merge_variables = merge
+        scenario._merge_variables = merge
+        fastapi.routing.serialize_response = self.wrap_async("serialize", fastapi.routing.serialize_response)
+        JSONResponse.render = self.wrap("encode", JSONResponse.render)
+
+    def observe(self, result: dict) -> None:
+        """render/send 取自应用返回的 timings"""
+        for item in result.get("results") or [result]:
+            timings = item.get("timings") or {}
+            if "render_ms" in timings:
+                self.stages["render"].record(timings["render_ms"])
+            if "send_ms" in timings:
+                self.stages["send"].record(timings["send_ms"])
+
+    def summary(self) -> dict:
+        return {
+            stage: {key: value for key, value in histogram.summary().items() if key in ("mean", "p50", "p99")}
+            for stage, histogram in self.stages.items()
+        }
+
+
+async def run_case(client, timer: StageTimer, path: str, concurrency: int, requests: int, trace_memory: bool) -> dict:
+    """以固定并发发送 requests 个请求"""
+    from app.services.histogram import LatencyHistogram
+
+    latency = LatencyHistogram()
+    failures = 0
+    remaining = requests
+
+    async def worker(worker_id: int):
+        nonlocal remaining, failures
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            resp = await client.post(path, json={"trace": f"t-{worker_id}-{remaining}"})
+            latency.record((time.perf_counter() - start) * 1000)
+            result = resp.json()
+            if resp.status_code != 200 or not result.get("success"):
+                failures += 1
+            timer.observe(result)
+
+    # 预热: 建立连接、编译模板
+    for _ in range(min(concurrency, 20)):
+        await client.post(path, json={})
+    timer.reset()
+
+    rss_before = rss_mb()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    memory = {"rss_mb": round(rss_mb(), 1), "rss_delta_mb": round(rss_mb() - rss_before, 1)}
+    if trace_memory:
+        memory["py_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+        tracemalloc.stop()
+
+    return {
+        "requests": requests,
+        "failures": failures,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1),
+        "latency_ms": latency.summary(),
+        "stages_ms": timer.summary(),
+        "memory": memory,
+    }
+
+
+async def run(args: argparse.Namespace, sock: socket.socket) -> list[dict]:
+    import httpx
+    from app.main import app
+
+    timer = StageTimer()
+    timer.install()
+    server = await asyncio.start_server(handle_mock, sock=sock)
+    results = []
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                for endpoint in args.endpoints:
+                    for size in args.sizes:
+                        for concurrency in args.concurrency:
+                            if endpoint == "callback":
+                                path = f"/api/callback/bench-{size}?env=bench"
+                                requests = args.requests
+                            else:
+                                path = f"/api/scenario/bench-{size}-flow?env=bench"
+                                requests = max(args.requests // SCENARIO_STEPS, 1)
+                            case = await run_case(client, timer, path, concurrency, requests, args.tracemalloc)
+                            case = {"endpoint": endpoint, "scene_size": size, "concurrency": concurrency, **case}
+                            results.append(case)
+                            print_case(case)
+    finally:
+        server.close()
+        await server.wait_closed()
+    return results
+
+
+def case_key(case: dict) -> tuple:
+    return case["endpoint"], case["scene_size"], case["concurrency"]
+
+
+def print_header() -> None:
+    print(
+        f"{'endpoint':>9} {'size':>7} {'conc':>5} {'rps':>9} {'p50':>8} {'p99':>8} "
+        + " ".join(f"{stage:>9}" for stage in STAGES)
+        + f" {'rss':>7}"
+    )
+
+
+def print_case(case: dict) -> None:
+    stages = " ".join(f"{case['stages_ms'][stage]['p50']:>9.3f}" for stage in STAGES)
+    print(
+        f"{case['endpoint']:>9} {case['scene_size']:>7} {case['concurrency']:>5} {case['rps']:>9.1f} "
+        f"{case['latency_ms']['p50']:>8.3f} {case['latency_ms']['p99']:>8.3f} {stages} "
+        f"{case['memory']['rss_mb']:>6.1f}M"
+    )
+
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    """与之前保存的结果对比 rps 与 p50/p99"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {case_key(case): case for case in baseline["results"]}
+    print(f"\n对比 {baseline_path} (revision {baseline['meta'].get('revision') or '?'}):")
+    print(f"{'endpoint':>9} {'size':>7} {'conc':>5} {'rps':>9} {'p50':>9} {'p99':>9}")
+    for case in results:
+        old = previous.get(case_key(case))
+        if old is None:
+            continue
+
+        def change(new: float, before: float) -> str:
+            return f"{(new - before) / before * 100:+.1f}%" if before else "n/a"
+
+        print(
+            f"{case['endpoint']:>9} {case['scene_size']:>7} {case['concurrency']:>5} "
+            f"{change(case['rps'], old['rps']):>9} "
+            f"{change(case['latency_ms']['p50'], old['latency_ms']['p50']):>9} "
+            f"{change(case['latency_ms']['p99'], old['latency_ms']['p99']):>9}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", nargs="+", choices=("callback", "scenario"), default=["callback", "scenario"])
+    parser.add_argument("--sizes", nargs="+", choices=tuple(SIZES), default=list(SIZES), help="场景大小")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100], help="并发数")
+    parser.add_argument("-n", "--requests", type=int, default=2000, help="每组回调数 (批量场景按步骤数折算)")
+    parser.add_argument("--tracemalloc", action="store_true", help="记录 Python 分配峰值")
+    parser.add_argument("--output", help="结果写入 JSON 文件")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果对比")
+    args = parser.parse_args()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    with tempfile.TemporaryDirectory() as tmp:
+        scenes_path = os.path.join(tmp, "scenes.yaml")
+        generate(scenes_path, f"http://127.0.0.1:{sock.getsockname()[1]}")
+        # 应用配置在导入时读取，需先于导入设置
+        os.environ.update({
+            "APP_SCENES_FILE": scenes_path,
+            "APP_DEFAULT_ENV": "bench",
+            "APP_SCENES_CACHE": "false",
+            "APP_SCENES_WATCH": "false",
+            "APP_HISTORY_ENABLED": "false",
+            "APP_SENDER_PROCESSES": "0",
+        })
+        print_header()
+        results = asyncio.run(run(args, sock))
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": args.requests,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""模板渲染微基准: 预编译片段 vs 旧版正则替换
+
+运行:
+    python benchmarks/bench_renderer.py [-n 20000]
+
+使用 scenes.example.yaml 中各场景的 url/headers/body 作为模板。
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+from datetime import datetime
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.services.renderer import Renderer  # noqa: E402
+
+PATTERN = re.compile(r'\{\{(\w+)(?:\|default:([^}]*))?\}\}')
+
+
+def _get_builtins() -> dict:
+    now = datetime.now()
+    return {
+        "_now": now.isoformat(),
+        "_timestamp": int(now.timestamp()),
+        "_timestamp_ms": int(now.timestamp() * 1000),
+    }
+
+
+def regex_render(template: str, variables: dict) -> str:
+    """旧版实现: 每次调用合并内置变量并执行 PATTERN.sub"""
+    if not template:
+        return ""
+    context = {**_get_builtins(), **variables}
+
+    def replacer(match: re.Match) -> str:
+        var_name = match.group(1)
+        default_value = match.group(2)
+        if var_name in context:
+            return str(context[var_name])
+        elif default_value is not None:
+            return default_value
+        return match.group(0)
+
+    return PATTERN.sub(replacer, template)
+
+
+def load_templates(path: str) -> list[tuple[str, dict[str, str], str, dict]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    env_vars = next(iter(data.get("environments", {}).values()), {})
+    templates = []
+    for scene in data.get("scenes", {}).values():
+        variables = {**scene.get("defaults", {}), **env_vars}
+        templates.append((scene.get("url", ""), scene.get("headers", {}), scene.get("body", ""), variables))
+    return templates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--number", type=int, default=20000, help="每个场景渲染次数")
+    parser.add_argument("--scenes", default=os.path.join(ROOT, "scenes.example.yaml"))
+    args = parser.parse_args()
+
+    templates = load_templates(args.scenes)
+    renderer = Renderer()
+    for url, headers, body, _ in templates:
+        renderer.compile(url)
+        for value in headers.values():
+            renderer.compile(value)
+        renderer.compile(body)
+
+    # 先校验两种实现输出一致 (忽略时间类内置变量)
+    fixed = {"_now": "NOW", "_timestamp": 1, "_timestamp_ms": 1000}
+    for url, headers, body, variables in templates:
+        merged = {**variables, **fixed}
+        for template in (url, body, *headers.values()):
+            assert renderer.render(template, merged) == regex_render(template, merged), template
+
+    def run_regex():
+        for url, headers, body, variables in templates:
+            regex_render(url, variables)
+            {k: regex_render(v, variables) for k, v in headers.items()}
+            regex_render(body, variables)
+
+    def run_compiled():
+        for url, headers, body, variables in templates:
+            renderer.render(url, variables)
+            renderer.render_dict(headers, variables)
+            renderer.render(body, variables)
+
+    calls = args.number * len(templates)
+    print(f"{len(templates)} 个场景 x {args.number} 次")
+    results = {}
+    for name, func in (("regex", run_regex), ("compiled", run_compiled)):
+        seconds = min(timeit.repeat(func, number=args.number, repeat=3))
+        results[name] = seconds
+        print(f"{name:>9}: {seconds:.3f}s  {seconds / calls * 1e6:.2f} us/场景")
+    print(f"  speedup: {results['regex'] / results['compiled']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
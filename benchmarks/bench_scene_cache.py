@@ -0,0 +1,92 @@
+"""场景配置冷启动基准: 扫描建立索引 vs 索引磁盘缓存
+
+运行:
+    python benchmarks/bench_scene_cache.py [--sizes 10 1000 10000] [-r 3]
+
+按 scenes.example.yaml 的场景生成指定数量的场景，分别测量:
+  yaml   全部场景从 YAML 解析、校验并编译模板 (仅作参照)
+  index  逐行扫描建立索引 (默认启动路径，场景首次调用时才解析)
+  cache  从磁盘缓存恢复索引 (场景同样在首次调用时才解析)
+speedup 为 index / cache，即开启缓存相对默认启动路径的加速比。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.services.renderer import renderer  # noqa: E402
+from app.services.scene_loader import SceneLoader  # noqa: E402
+
+
+def generate(path: str, count: int) -> None:
+    """以示例配置中的场景为模板生成 count 个场景"""
+    with open(os.path.join(ROOT, "scenes.example.yaml"), "r", encoding="utf-8") as f:
+        example = yaml.safe_load(f)
+    templates = list(example["scenes"].values())
+    scenes = {}
+    for i in range(count):
+        scene = dict(templates[i % len(templates)])
+        scene["url"] = f"{scene['url']}/{i}"
+        scenes[f"scene-{i:05d}"] = scene
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(
+            {"environments": example["environments"], "scenes": scenes},
+            f, allow_unicode=True, sort_keys=False,
+        )
+
+
+def measure(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        renderer.clear_cache()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000], help="场景数量")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="重复次数，取最小值")
+    args = parser.parse_args()
+
+    print(f"{'scenes':>8} {'yaml':>10} {'index':>10} {'cache':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.sizes:
+            path = os.path.join(tmp, f"scenes-{count}.yaml")
+            cache_dir = os.path.join(tmp, f"cache-{count}")
+            generate(path, count)
+
+            def load_yaml():
+                loader = SceneLoader()
+                loader.load(path)
+                loader.list_scenes()
+
+            def load_index():
+                SceneLoader().load(path)
+
+            def load_cache():
+                SceneLoader(cache_dir=cache_dir).load(path)
+
+            warm = SceneLoader(cache_dir=cache_dir)
+            warm.load(path)
+            warm.save_cache()
+
+            yaml_ms = measure(load_yaml, args.repeat)
+            index_ms = measure(load_index, args.repeat)
+            cache_ms = measure(load_cache, args.repeat)
+            print(
+                f"{count:>8} {yaml_ms:>8.1f}ms {index_ms:>8.1f}ms {cache_ms:>8.1f}ms "
+                f"{index_ms / cache_ms:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
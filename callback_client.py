@@ -6,16 +6,95 @@ Callback Tool 客户端 - 用于在 pytest 中调用回调模拟服务
 
     client = CallbackClient()
     result = client.fire("whatsapp-message", sender_wa_id="8613800001111")
+
+    # 并发触发 (需安装 httpx)
+    async with AsyncCallbackClient() as client:
+        senders = [{"sender_wa_id": f"86138000{i:05d}"} for i in range(100)]
+        summary = await client.fire_many("whatsapp-message", senders)
 """
+import asyncio
+from typing import Awaitable, Iterable, Optional
+
 import requests
-from typing import Optional
+from requests.adapters import HTTPAdapter
+
+
+def _params(env: Optional[str], dry_run: bool, **extra) -> dict:
+    """构造查询参数"""
+    params = {key: value for key, value in extra.items() if value is not None}
+    if env:
+        params["env"] = env
+    if dry_run:
+        params["dry_run"] = "true"
+    return params
+
+
+def _receiver_params(path: Optional[str], method: Optional[str], headers: Optional[dict], since_id: int) -> dict:
+    """构造接收端查询参数"""
+    params = {key: value for key, value in (("path", path), ("method", method)) if value}
+    if headers:
+        params["header"] = [f"{name}:{value}" for name, value in headers.items()]
+    if since_id:
+        params["since_id"] = since_id
+    return params
+
+
+def _batch_summary(scene_id: str, results: list[dict], include_results: bool) -> dict:
+    """服务端不支持批量接口时，按 BatchResponse 的结构汇总逐个触发的结果"""
+    success_count = sum(1 for result in results if result.get("success"))
+    return {
+        "success": bool(results) and success_count == len(results),
+        "scene_id": scene_id,
+        "total": len(results),
+        "success_count": success_count,
+        "failed_count": len(results) - success_count,
+        "results": results if include_results else [],
+    }
+
+
+def _missing_route(response) -> bool:
+    """判断 404/405 是否为路由不存在 (而非场景不存在等业务错误)
+
+    框架对未知路由返回 {"detail": "Not Found"} 等; 非 JSON 的响应体 (反向代理、
+    nginx 后的旧版服务端) 同样视为路由不存在。
+    """
+    if response.status_code not in (404, 405):
+        return False
+    try:
+        body = response.json()
+    except ValueError:
+        return True
+    return not isinstance(body, dict) or body.get("detail") in ("Not Found", "Method Not Allowed")
 
 
 class CallbackClient:
-    """回调模拟服务客户端"""
+    """回调模拟服务客户端
 
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    所有请求共享一个 requests.Session，连接保持复用; 可作为上下文管理器使用。
+    """
+
+    def __init__(self, base_url: str = "http://localhost:8000", timeout: float = 60.0, pool_maxsize: int = 10):
         self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self) -> "CallbackClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """关闭连接池"""
+        self.session.close()
+
+    def _post(self, path: str, params: dict, **kwargs) -> dict:
+        resp = self.session.post(f"{self.base_url}{path}", params=params, timeout=self.timeout, **kwargs)
+        resp.raise_for_status()
+        return resp.json()
 
     def fire(
         self,
@@ -36,21 +115,40 @@ class CallbackClient:
             响应字典，包含 success, message, response_status 等
 
         Raises:
-            AssertionError: 回调执行失败时
+            requests.HTTPError: 服务端返回错误状态码时
         """
-        params = {}
-        if env:
-            params["env"] = env
-        if dry_run:
-            params["dry_run"] = "true"
-
-        resp = requests.post(
-            f"{self.base_url}/api/callback/{scene_id}",
-            params=params,
+        return self._post(
+            f"/api/callback/{scene_id}",
+            _params(env, dry_run),
             json=variables if variables else None,
         )
-        resp.raise_for_status()
-        return resp.json()
+
+    def fire_many(
+        self,
+        scene_id: str,
+        variable_sets: Iterable[dict],
+        env: str = None,
+        dry_run: bool = False,
+        concurrency: Optional[int] = None,
+        include_results: bool = True,
+    ) -> dict:
+        """通过服务端批量接口并发触发同一场景
+
+        Args:
+            scene_id: 场景 ID
+            variable_sets: 每次触发的变量
+            env: 目标环境
+            dry_run: 仅预览不发送
+            concurrency: 服务端并发数，默认使用服务端配置
+            include_results: 是否返回每次执行结果 (按完成顺序)
+
+        Returns:
+            BatchResponse 字典，包含 total, success_count, failed_count, latency, results 等
+        """
+        params = _params(env, dry_run, concurrency=concurrency)
+        if include_results:
+            params["include_results"] = "true"
+        return self._post(f"/api/callback/{scene_id}/batch", params, json=list(variable_sets))
 
     def fire_scenario(
         self,
@@ -65,28 +163,213 @@ class CallbackClient:
             scenario_id: 批量场景 ID，如 "full-order-flow"
             **variables: 公共变量，应用到所有步骤
         """
-        params = {}
-        if env:
-            params["env"] = env
-        if dry_run:
-            params["dry_run"] = "true"
-
-        resp = requests.post(
-            f"{self.base_url}/api/scenario/{scenario_id}",
-            params=params,
+        return self._post(
+            f"/api/scenario/{scenario_id}",
+            _params(env, dry_run),
             json=variables if variables else None,
         )
-        resp.raise_for_status()
-        return resp.json()
 
     def list_scenes(self) -> list[dict]:
         """列出所有可用场景"""
-        resp = requests.get(f"{self.base_url}/api/scenes")
+        resp = self.session.get(f"{self.base_url}/api/scenes", timeout=self.timeout)
         resp.raise_for_status()
         return resp.json()
 
     def reload(self) -> dict:
         """热加载配置"""
-        resp = requests.post(f"{self.base_url}/api/scenes/reload")
+        return self._post("/api/scenes/reload", {})
+
+    def set_receiver_rule(self, name: str, rule: dict) -> dict:
+        """注册接收端规则，如 {"path": "/whatsapp/*", "responses": [{"status": 500}, {"status": 200}]}"""
+        resp = self.session.put(f"{self.base_url}/api/receiver/rules/{name}", json=rule, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def clear_received(self) -> None:
+        """清空接收端已收到的请求"""
+        resp = self.session.delete(f"{self.base_url}/api/receiver/requests", timeout=self.timeout)
+        resp.raise_for_status()
+
+    def wait_for(
+        self,
+        path: str = None,
+        method: str = None,
+        headers: Optional[dict] = None,
+        since_id: int = 0,
+        timeout: float = 30.0,
+    ) -> dict:
+        """等待接收端 (/mock/...) 收到匹配的请求
+
+        Args:
+            path: 路径 (/mock 之后的部分)，支持 * ? 通配
+            method: HTTP 方法
+            headers: 请求头过滤 (值支持通配)
+            since_id: 只匹配 ID 大于该值的请求，连续等待时传上一次返回的 id
+            timeout: 最长等待秒数
+
+        Returns:
+            收到的请求，包含 id, method, path, headers, body 等
+
+        Raises:
+            requests.HTTPError: 超时 (408) 等错误时
+        """
+        params = _receiver_params(path, method, headers, since_id)
+        params["timeout"] = timeout
+        resp = self.session.get(f"{self.base_url}/api/receiver/wait", params=params, timeout=self.timeout + timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+
+class AsyncCallbackClient:
+    """异步回调模拟服务客户端 (需安装 httpx)
+
+    基于共享连接池的 httpx.AsyncClient，可在同一事件循环中并发触发回调:
+
+        async with AsyncCallbackClient() as client:
+            results = await client.gather(client.fire("a"), client.fire("b"))
+    """
+
+    def __init__(self, base_url: str = "http://localhost:8000", timeout: float = 60.0, max_connections: int = 50):
+        import httpx
+
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        # 服务端是否提供批量接口，首次调用时探测
+        self._batch_supported: Optional[bool] = None
+
+    async def __aenter__(self) -> "AsyncCallbackClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """关闭连接池"""
+        await self._client.aclose()
+
+    async def _post(self, path: str, params: dict, **kwargs) -> dict:
+        resp = await self._client.post(path, params=params, **kwargs)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def fire(self, scene_id: str, env: str = None, dry_run: bool = False, **variables) -> dict:
+        """触发回调场景，参数同 CallbackClient.fire"""
+        return await self._post(
+            f"/api/callback/{scene_id}",
+            _params(env, dry_run),
+            json=variables if variables else None,
+        )
+
+    async def fire_scenario(self, scenario_id: str, env: str = None, dry_run: bool = False, **variables) -> dict:
+        """触发批量场景，参数同 CallbackClient.fire_scenario"""
+        return await self._post(
+            f"/api/scenario/{scenario_id}",
+            _params(env, dry_run),
+            json=variables if variables else None,
+        )
+
+    async def fire_many(
+        self,
+        scene_id: str,
+        variable_sets: Iterable[dict],
+        env: str = None,
+        dry_run: bool = False,
+        concurrency: Optional[int] = None,
+        include_results: bool = True,
+    ) -> dict:
+        """并发触发同一场景
+
+        优先使用服务端批量接口 (一次请求，服务端并发发送); 服务端没有该接口时
+        退回到客户端并发逐个触发，返回结构相同。
+
+        Args:
+            scene_id: 场景 ID
+            variable_sets: 每次触发的变量
+            env: 目标环境
+            dry_run: 仅预览不发送
+            concurrency: 最大并发数，默认使用服务端配置 (退回客户端时为 max_connections)
+            include_results: 是否返回每次执行结果 (按完成顺序)
+
+        Returns:
+            BatchResponse 字典
+        """
+        import httpx
+
+        variable_sets = list(variable_sets)
+        if self._batch_supported is not False:
+            params = _params(env, dry_run, concurrency=concurrency)
+            if include_results:
+                params["include_results"] = "true"
+            try:
+                result = await self._post(f"/api/callback/{scene_id}/batch", params, json=variable_sets)
+                self._batch_supported = True
+                return result
+            except httpx.HTTPStatusError as e:
+                # 路由不存在 (旧版服务端) 时退回; 场景不存在等业务错误直接抛出
+                if not _missing_route(e.response):
+                    raise
+                self._batch_supported = False
+
+        results = await self.gather(
+            *(self.fire(scene_id, env, dry_run, **variables) for variables in variable_sets),
+            concurrency=concurrency,
+        )
+        return _batch_summary(scene_id, results, include_results)
+
+    async def gather(self, *calls: Awaitable, concurrency: Optional[int] = None) -> list:
+        """以有限并发等待多个调用，结果按传入顺序返回
+
+        Args:
+            *calls: fire() / fire_scenario() 等协程
+            concurrency: 最大并发数，默认为 max_connections
+        """
+        slots = asyncio.Semaphore(concurrency or self.max_connections)
+
+        async def run(call: Awaitable):
+            async with slots:
+                return await call
+
+        return await asyncio.gather(*(run(call) for call in calls))
+
+    async def list_scenes(self) -> list[dict]:
+        """列出所有可用场景"""
+        resp = await self._client.get("/api/scenes")
+        resp.raise_for_status()
+        return resp.json()
+
+    async def reload(self) -> dict:
+        """热加载配置"""
+        return await self._post("/api/scenes/reload", {})
+
+    async def set_receiver_rule(self, name: str, rule: dict) -> dict:
+        """注册接收端规则，参数同 CallbackClient.set_receiver_rule"""
+        resp = await self._client.put(f"/api/receiver/rules/{name}", json=rule)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def clear_received(self) -> None:
+        """清空接收端已收到的请求"""
+        resp = await self._client.delete("/api/receiver/requests")
+        resp.raise_for_status()
+
+    async def wait_for(
+        self,
+        path: str = None,
+        method: str = None,
+        headers: Optional[dict] = None,
+        since_id: int = 0,
+        timeout: float = 30.0,
+    ) -> dict:
+        """等待接收端收到匹配的请求，参数同 CallbackClient.wait_for"""
+        params = _receiver_params(path, method, headers, since_id)
+        params["timeout"] = timeout
+        resp = await self._client.get(
+            "/api/receiver/wait", params=params, timeout=self._client.timeout.read + timeout
+        )
         resp.raise_for_status()
         return resp.json()
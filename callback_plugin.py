@@ -0,0 +1,61 @@
+"""
+Callback Tool pytest 插件 - 提供共享连接池的回调客户端 fixture
+
+启用方式 (二选一):
+    # conftest.py
+    pytest_plugins = ["callback_plugin"]
+
+    # 命令行
+    pytest -p callback_plugin --callback-url http://localhost:8000
+
+服务地址优先级: --callback-url > 环境变量 CALLBACK_TOOL_URL > http://localhost:8000。
+--callback-url 等命令行参数只在通过 conftest.py 或 -p 启用时可用 (测试模块中的 pytest_plugins
+加载时命令行已解析完毕，此时使用环境变量)。
+服务不可用时依赖 callback fixture 的用例自动跳过。
+
+pytest-xdist 下每个 worker 是独立进程，连接无法跨进程共享; 每个 worker 在整个会话中
+只创建一个带连接池的客户端并只探测一次服务，所有用例复用。
+"""
+import os
+
+import pytest
+
+from callback_client import CallbackClient
+
+DEFAULT_URL = "http://localhost:8000"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("callback-tool")
+    group.addoption(
+        "--callback-url",
+        default=os.environ.get("CALLBACK_TOOL_URL", DEFAULT_URL),
+        help="callback-tool 服务地址 (默认读取 CALLBACK_TOOL_URL)",
+    )
+    group.addoption(
+        "--callback-pool-size",
+        type=int,
+        default=10,
+        help="每个进程的连接池大小",
+    )
+
+
+@pytest.fixture(scope="session")
+def callback_url(request) -> str:
+    """callback-tool 服务地址"""
+    return request.config.getoption("--callback-url")
+
+
+@pytest.fixture(scope="session")
+def callback(request, callback_url):
+    """回调客户端 - 整个测试会话 (xdist 下每个 worker) 共享一个连接池"""
+    client = CallbackClient(callback_url, pool_maxsize=request.config.getoption("--callback-pool-size"))
+    try:
+        scenes = client.list_scenes()
+    except Exception as e:
+        client.close()
+        pytest.skip(f"callback-tool 服务未启动: {e}")
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    print(f"\n[callback-tool] {worker} 已连接 {callback_url}，共 {len(scenes)} 个场景")
+    yield client
+    client.close()
@@ -7,25 +7,12 @@
 
 运行:
     pytest test_example.py -v
+    CALLBACK_TOOL_URL=http://localhost:8000 pytest test_example.py -n 4   # pytest-xdist
 """
 import time
-import pytest
-from callback_client import CallbackClient
 
-
-# ============ Fixtures ============
-
-@pytest.fixture(scope="session")
-def callback():
-    """回调客户端 - 整个测试会话共享"""
-    client = CallbackClient("http://localhost:8000")
-    # 验证服务可用
-    try:
-        scenes = client.list_scenes()
-        print(f"\n[callback-tool] 已连接，共 {len(scenes)} 个场景")
-    except Exception as e:
-        pytest.skip(f"callback-tool 服务未启动: {e}")
-    return client
+# callback fixture 由插件提供: 整个测试会话 (xdist 下每个 worker) 共享一个连接池，服务未启动时跳过
+pytest_plugins = ["callback_plugin"]
 
 
 # ============ 测试用例 ============
@@ -79,6 +66,17 @@ class TestWhatsAppCallback:
         assert "预览测试" in result["request_body"]
         assert result["response_status"] is None  # dry_run 不实际发送
 
+    def test_fire_many(self, callback):
+        """测试: 一次请求由服务端并发触发多条消息"""
+        result = callback.fire_many(
+            "whatsapp-message",
+            [{"sender_wa_id": f"86138000{i:05d}", "message_body": f"第 {i} 条"} for i in range(20)],
+            dry_run=True,
+        )
+
+        assert result["total"] == 20
+        assert result["success_count"] == 20
+
 
 class TestCallbackIntegrationFlow:
     """
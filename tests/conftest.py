@@ -0,0 +1,12 @@
+"""单元测试公共配置
+
+在导入 app 之前设置环境变量: 关闭发送历史，使用示例场景配置。
+"""
+import os
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+os.environ.setdefault("APP_HISTORY_ENABLED", "false")
+os.environ.setdefault("APP_SCENES_CACHE", "false")
+os.environ.setdefault("APP_SCENES_FILE", str(ROOT / "scenes.example.yaml"))
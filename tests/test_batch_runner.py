@@ -0,0 +1,51 @@
+"""批量发送调度测试"""
+import asyncio
+
+import pytest
+
+from app.models.schemas import CallbackResponse
+from app.services.batch_runner import BatchResult, BatchRunner, latency_stats
+
+
+def test_pump_handles_every_item():
+    seen = []
+
+    async def handle(item):
+        seen.append(item)
+
+    asyncio.run(BatchRunner().pump(range(100), handle, concurrency=4))
+    assert sorted(seen) == list(range(100))
+
+
+def test_pump_raises_when_all_workers_die():
+    async def handle(item):
+        raise RuntimeError(f"bad item {item}")
+
+    async def main():
+        # 输入远多于队列容量: worker 全部退出后生产者不能阻塞在 queue.put
+        await BatchRunner().pump(range(10_000), handle, concurrency=2)
+
+    with pytest.raises(RuntimeError, match="bad item"):
+        asyncio.run(asyncio.wait_for(main(), timeout=5))
+
+
+def test_pump_raises_when_input_fails():
+    def items():
+        yield {}
+        raise ValueError("broken input")
+
+    async def handle(item):
+        await asyncio.sleep(0)
+
+    with pytest.raises(ValueError, match="broken input"):
+        asyncio.run(asyncio.wait_for(BatchRunner().pump(items(), handle, concurrency=2), timeout=5))
+
+
+def test_batch_result_uses_histogram():
+    result = BatchResult()
+    for latency in (1.0, 2.0, 3.0, 100.0):
+        result.add(CallbackResponse(success=True, message="ok", response_status=200), latency)
+    stats = latency_stats(result.histogram)
+    assert result.status_counts == {"200": 4}
+    assert stats.min == 1.0 and stats.max == 100.0
+    assert stats.p50 == pytest.approx(2.0, rel=0.01)
@@ -0,0 +1,44 @@
+"""客户端批量接口退回测试"""
+import asyncio
+
+import httpx
+import pytest
+
+from callback_client import AsyncCallbackClient
+
+
+def _fire_many(batch_response: httpx.Response) -> tuple[dict, list[str]]:
+    paths = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        if request.url.path.endswith("/batch"):
+            return batch_response
+        return httpx.Response(200, json={"success": True})
+
+    async def main():
+        client = AsyncCallbackClient()
+        await client.close()
+        client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+        async with client:
+            summary = await client.fire_many("ping", [{"i": 1}, {"i": 2}])
+            # 已确认不支持批量接口，之后不再探测
+            await client.fire_many("ping", [{"i": 3}])
+            return summary
+    return asyncio.run(main()), paths
+
+
+@pytest.mark.parametrize("response", [
+    httpx.Response(404, text="<html><body>404 Not Found</body></html>"),
+    httpx.Response(404, json={"detail": "Not Found"}),
+    httpx.Response(405, json={"detail": "Method Not Allowed"}),
+])
+def test_missing_batch_route_falls_back(response):
+    summary, paths = _fire_many(response)
+    assert summary["total"] == 2 and summary["success_count"] == 2
+    assert paths == ["/api/callback/ping/batch"] + ["/api/callback/ping"] * 3
+
+
+def test_business_404_is_raised():
+    with pytest.raises(httpx.HTTPStatusError):
+        _fire_many(httpx.Response(404, json={"detail": "场景不存在: ping"}))
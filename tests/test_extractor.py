@@ -0,0 +1,48 @@
+"""响应提取规则测试"""
+import json
+import textwrap
+
+import httpx
+import pytest
+
+from app.services.extractor import compile_extractors, run_extractors
+from app.services.scene_loader import SceneLoader
+
+
+def test_extract_json_header_regex():
+    extractors = compile_extractors({
+        "paymentId": "$.data.paymentId",
+        "first": "$.items[0]['name']",
+        "requestId": "header:X-Request-Id",
+        "refundNo": "regex:refundNo=(\\w+)",
+    })
+    body = json.dumps({"data": {"paymentId": "PAY123"}, "items": [{"name": "a"}], "note": "refundNo=R9"}).encode()
+    values, missing, _ = run_extractors(extractors, body, httpx.Headers({"x-request-id": "req-1"}))
+    assert values == {"paymentId": "PAY123", "first": "a", "requestId": "req-1", "refundNo": "R9"}
+    assert missing == []
+
+
+@pytest.mark.parametrize("spec", [{"a": 1}, {"a": ["$.x"]}, {"a": None}, ["$.x"], {"a": "data.x"}])
+def test_invalid_specs_raise_value_error(spec):
+    with pytest.raises(ValueError):
+        compile_extractors(spec)
+
+
+@pytest.mark.parametrize("rule", ["123", "[$.data.id]", "{path: $.x}"])
+def test_non_string_extract_fails_at_load(tmp_path, rule):
+    path = tmp_path / "scenes.yaml"
+    path.write_text(textwrap.dedent(f"""\
+        scenes:
+          pay:
+            name: pay
+            url: http://127.0.0.1:9/pay
+        scenarios:
+          flow:
+            name: flow
+            steps:
+              - scene: pay
+                extract:
+                  paymentId: {rule}
+        """), encoding="utf-8")
+    with pytest.raises(ValueError, match="批量场景 flow 第 1 个步骤配置错误: extract.paymentId"):
+        SceneLoader().load(str(path))
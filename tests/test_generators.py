@@ -0,0 +1,69 @@
+"""模板生成器测试"""
+import json
+import time
+
+import pytest
+
+from app.services.generators import Generator, SequenceLockTimeout, SequenceStore
+from app.services.renderer import RenderContext, Renderer
+
+
+def test_each_slot_in_a_template_is_generated_separately():
+    renderer = Renderer()
+    template = '{"a": "{{_uuid}}", "b": "{{_uuid}}", "s1": {{_seq:gen-test-a}}, "s2": {{_seq:gen-test-a}}}'
+    data = json.loads(renderer.render(template, {}))
+    assert data["a"] != data["b"]
+    assert data["s2"] == data["s1"] + 1
+
+
+def test_same_occurrence_shared_across_templates_and_retries():
+    renderer = Renderer()
+    context = RenderContext()
+    body = renderer.render('{"id": "{{_uuid}}", "n": {{_seq:gen-test-b}}}', {}, context)
+    url = renderer.render("http://x/{{_seq:gen-test-b}}?id={{_uuid}}", {}, context)
+    data = json.loads(body)
+    assert url == f"http://x/{data['n']}?id={data['id']}"
+    # 重试复用同一上下文，取值不变
+    assert renderer.render('{"id": "{{_uuid}}", "n": {{_seq:gen-test-b}}}', {}, context) == body
+
+
+def test_variables_override_generators():
+    assert Renderer().render("{{_uuid}}", {"_uuid": "fixed"}) == "fixed"
+
+
+def test_hmac_needs_body():
+    renderer = Renderer()
+    context = RenderContext()
+    context.body = "payload"
+    signed = renderer.render("{{_hmac_sha256:secret}}", {"secret": "k"}, context)
+    assert len(signed) == 64
+    assert renderer.render("{{_hmac_sha256:secret}}", {"secret": "k"}) == "{{_hmac_sha256:secret}}"
+
+
+@pytest.mark.parametrize("name, args", [("_seq", None), ("_rand_int", "9:1"), ("_hmac_sha256", "k:hex:x"), ("_uuid", "x")])
+def test_invalid_generator_arguments(name, args):
+    with pytest.raises(ValueError):
+        Generator(name, args)
+
+
+def test_sequence_store_counts_per_name():
+    store = SequenceStore()
+    assert [store.next("a"), store.next("a"), store.next("b"), store.next("a")] == [1, 2, 1, 3]
+
+
+def test_sequence_store_abandoned_lock_times_out():
+    store = SequenceStore()
+    assert store.next("a") == 1
+    # 模拟持锁的 worker 进程被杀死: 锁被占用且永不释放
+    _, _, lock = store.shared()
+    lock.acquire()
+    try:
+        start = time.perf_counter()
+        with pytest.raises(SequenceLockTimeout):
+            store.next("a")
+        with pytest.raises(SequenceLockTimeout):
+            store.next("b")
+        assert time.perf_counter() - start < 10 * store.LOCK_TIMEOUT
+    finally:
+        lock.release()
+    assert store.next("a") == 2
@@ -0,0 +1,101 @@
+"""回调记录分段存储测试"""
+import asyncio
+import os
+import time
+
+from app.models.schemas import CallbackResponse, Scene, SigningConfig
+from app.services import history as history_module
+from app.services.history import HistoryStore, secret_variables
+
+SCENE = Scene(
+    id="pay",
+    name="pay",
+    url="http://127.0.0.1:9/notify?sig={{_hmac_sha256:hmacKey}}",
+    body='{"order": "{{orderId}}"}',
+    signing=SigningConfig(preset="github", key="{{notify_secret}}"),
+)
+
+
+def _result(status: int = 200) -> CallbackResponse:
+    return CallbackResponse(success=status < 400, message="ok", scene_id="pay", response_status=status)
+
+
+def test_secret_variables():
+    assert secret_variables(SCENE) == {"notify_secret", "hmacKey"}
+
+
+def test_records_survive_close_and_restart(tmp_path):
+    directory = str(tmp_path / "history")
+
+    async def write():
+        store = HistoryStore(directory=directory, flush_interval=60)
+        await store.start()
+        for i in range(3):
+            store.record(SCENE, "dev", {"orderId": i, "notify_secret": "s3cret", "hmacKey": "k"}, _result())
+        # 不等待定时写入，close 应写完缓冲区
+        await store.close()
+        store.record(SCENE, "dev", {"orderId": 99}, _result())
+        return store
+
+    store = asyncio.run(write())
+    assert store.stats()["records"] == 3
+
+    raw = b"".join(open(os.path.join(directory, name), "rb").read() for name in os.listdir(directory))
+    assert b"s3cret" not in raw and b'"hmacKey"' not in raw
+
+    async def reopen():
+        store = HistoryStore(directory=directory)
+        await store.start()
+        entries = list(store.query(scene_id="pay"))
+        records = store.read(entries)
+        await store.close()
+        return records
+
+    records = asyncio.run(reopen())
+    assert [record.variables for record in records] == [{"orderId": i} for i in (2, 1, 0)]
+
+
+def test_close_waits_for_running_write(tmp_path, monkeypatch):
+    writes = []
+    original = HistoryStore._write
+
+    def slow_write(self, batch, segment, size):
+        time.sleep(0.2)
+        writes.append(len(batch))
+        return original(self, batch, segment, size)
+
+    monkeypatch.setattr(HistoryStore, "_write", slow_write)
+
+    async def main():
+        store = HistoryStore(directory=str(tmp_path), flush_interval=0.01)
+        await store.start()
+        store.record(SCENE, "dev", {}, _result())
+        await asyncio.sleep(0.05)  # 第一次写入进行中
+        store.record(SCENE, "dev", {}, _result())
+        await store.close()
+        return store
+
+    store = asyncio.run(main())
+    assert writes == [1, 1]
+    assert [entry.id for entry in store.query()] == [2, 1]
+
+
+def test_retention_runs_when_idle(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_module, "RETENTION_INTERVAL", 0.05)
+
+    async def main():
+        store = HistoryStore(directory=str(tmp_path), segment_bytes=1, max_age=0.2, flush_interval=0.02)
+        await store.start()
+        for _ in range(3):
+            store.record(SCENE, "dev", {}, _result())
+        await store.flush()
+        before = store.stats()["segments"]
+        # 不再写入，过期分段也应被删除 (当前分段保留)
+        await asyncio.sleep(0.5)
+        after = store.stats()["segments"]
+        await store.close()
+        return before, after
+
+    before, after = asyncio.run(main())
+    assert before == 3
+    assert after == 1
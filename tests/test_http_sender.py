@@ -0,0 +1,92 @@
+"""HTTP 发送器测试"""
+import asyncio
+import gzip
+
+import httpx
+import pytest
+
+from app.services import http_sender as http_sender_module
+from app.models.schemas import Scene
+from app.services.http_sender import HttpSender
+
+
+def test_pool_stats_counts_connections():
+    async def main():
+        sender = HttpSender(http2=False)
+        await sender.start()
+        try:
+            return sender.pool_stats()
+        finally:
+            await sender.close()
+
+    stats = asyncio.run(main())
+    assert stats["started"] is True
+    assert (stats["open"], stats["idle"], stats["in_use"]) == (0, 0, 0)
+
+
+def test_pool_stats_without_pool_internals(monkeypatch):
+    async def main():
+        sender = HttpSender(http2=False)
+        await sender.start()
+        monkeypatch.delattr(sender._client._transport, "_pool")
+        try:
+            return sender.pool_stats()
+        finally:
+            monkeypatch.undo()
+            await sender.close()
+
+    stats = asyncio.run(main())
+    assert stats["started"] is True
+    assert stats["open"] is None and stats["in_use"] is None
+
+
+class _ChunkedStream(httpx.AsyncByteStream):
+    def __init__(self, data: bytes, size: int = 7):
+        self.chunks = [data[i:i + size] for i in range(0, len(data), size)]
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def _read(body: bytes, keep: int, headers: dict) -> tuple[bytes, int]:
+    response = httpx.Response(200, headers=headers, stream=_ChunkedStream(body))
+    return asyncio.run(HttpSender()._read_body(response, keep))
+
+
+@pytest.mark.parametrize("internals", [True, False])
+def test_read_body_decodes_prefix(monkeypatch, internals):
+    if not internals:
+        monkeypatch.setattr(http_sender_module, "SUPPORTED_DECODERS", None)
+    plain = b'{"paymentId": "PAY123", "padding": "' + b"x" * 500 + b'"}'
+    compressed = gzip.compress(plain)
+    prefix, total = _read(compressed, 24, {"content-encoding": "gzip"})
+    assert prefix == plain[:24]
+    assert total == len(compressed)
+
+    prefix, total = _read(plain, 1000, {})
+    assert prefix == plain and total == len(plain)
+
+
+def test_close_with_request_in_flight():
+    async def main():
+        release = asyncio.Event()
+        started = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            started.set()
+            await release.wait()
+            return httpx.Response(200, text="ok")
+
+        sender = HttpSender(http2=False, record_metrics=False, rate_limit=False)
+        sender._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        scene = Scene(id="ping", name="ping", url="http://127.0.0.1:9/ping")
+        task = asyncio.create_task(sender.send(scene, {}))
+        await started.wait()
+        await sender.close()
+        release.set()
+        return await task, sender.pool_stats()
+
+    result, stats = asyncio.run(main())
+    assert result.error_type != "KeyError"
+    assert stats["hosts"] == {}
@@ -0,0 +1,54 @@
+"""后台任务队列测试"""
+import asyncio
+
+import pytest
+
+from app.models.schemas import CallbackResponse
+from app.services.job_queue import JobQueue, QueueFullError
+
+
+def test_running_jobs_do_not_count_as_pending():
+    async def main():
+        queue = JobQueue(workers=2, max_size=2)
+        release = asyncio.Event()
+
+        async def job():
+            await release.wait()
+            return CallbackResponse(success=True, message="ok")
+
+        await queue.submit("callback", "a", job)
+        await queue.submit("callback", "b", job)
+        await asyncio.sleep(0.01)
+        counts = (queue.pending_count, queue.running_count)
+        # 两个任务都在执行，队列仍可接收新任务
+        third = await queue.submit("callback", "c", job)
+        await queue.submit("callback", "d", job)
+        with pytest.raises(QueueFullError):
+            await queue.submit("callback", "e", job)
+        release.set()
+        await asyncio.sleep(0.01)
+        stats = queue.stats()
+        await queue.close()
+        return counts, queue.get(third.id).status, stats
+
+    counts, third_status, stats = asyncio.run(main())
+    assert counts == (0, 2)
+    assert third_status == "succeeded"
+    assert stats["pending"] == 0 and stats["running"] == 0
+    assert stats["status_counts"] == {"succeeded": 4}
+
+
+def test_failed_job_records_error():
+    async def main():
+        queue = JobQueue(workers=1)
+
+        async def job():
+            raise RuntimeError("boom")
+
+        submitted = await queue.submit("callback", "a", job)
+        await asyncio.sleep(0.01)
+        await queue.close()
+        return queue.get(submitted.id)
+
+    job = asyncio.run(main())
+    assert job.status == "failed" and job.error == "boom"
@@ -0,0 +1,60 @@
+"""参数矩阵测试"""
+import textwrap
+
+import pytest
+
+from app.services.matrix import build_matrix
+from app.services.scene_loader import SceneLoader
+
+
+def _write_config(root):
+    config_dir = root / "scenes"
+    (config_dir / "data").mkdir(parents=True)
+    (config_dir / "data" / "users.csv").write_text("userId,amount\nu1,100\nu2,200\n", encoding="utf-8")
+    (config_dir / "pay.yaml").write_text(textwrap.dedent("""\
+        scenes:
+          pay:
+            name: pay
+            url: http://127.0.0.1:9/pay
+            matrix:
+              user: {file: data/users.csv, label: userId}
+        scenarios:
+          flow:
+            name: flow
+            steps:
+              - scene: pay
+            matrix:
+              status: [SUCCESS, FAILED]
+              user: {file: data/users.csv}
+        """), encoding="utf-8")
+    return config_dir
+
+
+def test_data_file_relative_to_scenes_file(tmp_path, monkeypatch):
+    config_dir = _write_config(tmp_path)
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+
+    loader = SceneLoader()
+    loader.load(str(config_dir))
+    scene = loader.get_scene("pay")
+    data_file = str((config_dir / "data" / "users.csv").resolve())
+    assert scene.matrix["user"] == {"file": data_file, "label": "userId"}
+    assert [dict(item) for item in build_matrix(scene.matrix)] == [
+        {"userId": "u1", "amount": "100"},
+        {"userId": "u2", "amount": "200"},
+    ]
+
+    scenario = loader.get_scenario("flow")
+    assert scenario.matrix["status"] == ["SUCCESS", "FAILED"]
+    assert scenario.matrix["user"] == {"file": data_file}
+    assert build_matrix(scenario.matrix).size() is None
+    assert len(list(build_matrix(scenario.matrix))) == 4
+
+
+def test_missing_data_file_names_resolved_path(tmp_path):
+    config_dir = _write_config(tmp_path)
+    (config_dir / "data" / "users.csv").unlink()
+    with pytest.raises(ValueError, match="批量场景 flow 的 matrix 配置错误: 矩阵轴 user 的数据文件不存在"):
+        SceneLoader().load(str(config_dir))
@@ -0,0 +1,105 @@
+"""多进程发送器故障路径测试 (启动真实的 worker 进程)"""
+import asyncio
+import socket
+import threading
+
+import pytest
+
+from app.models.schemas import Scene
+from app.services import process_sender as process_sender_module
+from app.services.process_sender import ProcessSender
+
+
+@pytest.fixture
+def hanging_server():
+    """接受连接但从不响应的 TCP 服务"""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    connections = []
+
+    def accept():
+        while True:
+            try:
+                connections.append(server.accept()[0])
+            except OSError:
+                return
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield server.getsockname()[1]
+    server.close()
+    for connection in connections:
+        connection.close()
+
+
+@pytest.fixture(autouse=True)
+def short_http_timeout(monkeypatch):
+    # worker 中挂起的请求尽快超时，close() 不必等待
+    monkeypatch.setattr(process_sender_module.http_sender, "timeout", 1.0)
+
+
+def _scene(port: int) -> Scene:
+    return Scene(id="hang", name="hang", url=f"http://127.0.0.1:{port}/notify", body="{}")
+
+
+def test_worker_crash_fails_in_flight_requests(hanging_server):
+    async def main():
+        sender = ProcessSender(processes=1, concurrency=4)
+        await sender.start()
+        try:
+            dry = await sender.send(_scene(hanging_server), {}, dry_run=True)
+            assert dry.success
+
+            task = asyncio.create_task(sender.send(_scene(hanging_server), {}))
+            for _ in range(100):
+                if sender._owners:
+                    break
+                await asyncio.sleep(0.05)
+            assert sender._owners, "worker 未确认接收请求"
+            sender._workers[0].kill()
+            return await asyncio.wait_for(task, timeout=10)
+        finally:
+            await sender.close()
+
+    result = asyncio.run(main())
+    assert not result.success
+    assert result.error_type == "WorkerLostError"
+    assert "异常退出" in result.message
+    assert result.scene_id == "hang"
+
+
+def test_lost_result_times_out(hanging_server, monkeypatch):
+    monkeypatch.setattr(ProcessSender, "_result_timeout", lambda self, scene: 0.3)
+
+    async def main():
+        sender = ProcessSender(processes=1, concurrency=4)
+        await sender.start()
+        try:
+            return await sender.send(_scene(hanging_server), {}), dict(sender._pending)
+        finally:
+            await sender.close()
+
+    result, pending = asyncio.run(main())
+    assert not result.success
+    assert result.error_type == "WorkerTimeout"
+    assert pending == {}
+
+
+def test_extract_max_bytes_passed_to_workers(monkeypatch):
+    captured = {}
+
+    class FakeProcess:
+        def __init__(self, target, args, daemon):
+            captured.update(args[3])
+
+        def start(self):
+            raise RuntimeError("stop")
+
+    class FakeContext:
+        Queue = staticmethod(lambda: None)
+        Process = FakeProcess
+
+    monkeypatch.setattr(process_sender_module.multiprocessing, "get_context", lambda method: FakeContext)
+    with pytest.raises(RuntimeError, match="stop"):
+        asyncio.run(ProcessSender(processes=1).start())
+    assert captured["extract_max_bytes"] == process_sender_module.http_sender.extract_max_bytes
@@ -0,0 +1,30 @@
+"""接收端 mock 测试"""
+import pydantic
+import pytest
+
+from app.config import AppConfig
+from app.models.schemas import ReceivedRequest
+from app.services.receiver import Receiver
+
+
+def _request(request_id: int, path: str = "/notify") -> ReceivedRequest:
+    return ReceivedRequest(
+        id=request_id, ts=0.0, method="POST", path=path,
+        headers={"x-trace-id": str(request_id)}, response_status=200,
+    )
+
+
+def test_capacity_must_be_positive(monkeypatch):
+    monkeypatch.setenv("APP_RECEIVER_CAPACITY", "0")
+    with pytest.raises(pydantic.ValidationError):
+        AppConfig()
+
+
+def test_buffer_evicts_oldest_with_indexes():
+    receiver = Receiver(capacity=1)
+    receiver.record(_request(1, "/a"))
+    receiver.record(_request(2, "/b"))
+    assert [request.id for request in receiver.query()] == [2]
+    assert list(receiver.query(path="/a")) == []
+    assert list(receiver.query(headers={"X-Trace-Id": "1"})) == []
+    assert receiver.stats()["evicted"] == 1
@@ -0,0 +1,62 @@
+"""录制回放测试"""
+import asyncio
+
+import pytest
+
+from app.models.schemas import CallbackResponse, Scene
+from app.services import replay as replay_module
+from app.services.replay import ReplayRunner
+
+SCENE = Scene(id="pay", name="pay", url="http://127.0.0.1:9/notify")
+
+
+class HangingSender:
+    """发送永不返回，记录被取消的请求数"""
+
+    def __init__(self):
+        self.started = 0
+        self.cancelled = 0
+
+    async def send(self, scene, variables, dry_run=False, env=""):
+        self.started += 1
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return CallbackResponse(success=True, message="ok")
+
+
+@pytest.fixture
+def sender(monkeypatch):
+    sender = HangingSender()
+    monkeypatch.setattr(replay_module, "bulk_sender", lambda: sender)
+    monkeypatch.setattr(replay_module.scene_loader, "get_scene", lambda scene_id: SCENE)
+    return sender
+
+
+def test_events_error_cancels_outstanding_sends(sender):
+    async def events():
+        yield {"scene": "pay", "t": 0}
+        yield {"scene": "pay", "t": 0}
+        await asyncio.sleep(0.05)
+        raise ValueError("第 3 行不是合法的 JSON")
+
+    async def main():
+        with pytest.raises(ValueError, match="第 3 行"):
+            await ReplayRunner().run(events(), speed=0, concurrency=10)
+        # run 返回前已取消并等待在途请求，而不是留给事件循环关闭时清理
+        return sender.started, sender.cancelled
+
+    assert asyncio.run(asyncio.wait_for(main(), timeout=5)) == (2, 2)
+
+
+def test_invalid_events_are_skipped(sender, monkeypatch):
+    async def send(scene, variables, dry_run=False, env=""):
+        return CallbackResponse(success=True, message="ok", response_status=200)
+
+    monkeypatch.setattr(sender, "send", send)
+    result = asyncio.run(ReplayRunner().run(
+        [{"scene": "pay", "t": 0}, {"t": 1}, {"scene": "pay", "t": "x"}], speed=0, concurrency=2
+    ))
+    assert result.skipped_reasons == {"invalid": 2}
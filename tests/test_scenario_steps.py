@@ -0,0 +1,148 @@
+"""批量场景步骤调度 (依赖图) 测试"""
+import asyncio
+import textwrap
+
+import pytest
+
+from app.api import scenario as scenario_api
+from app.models.schemas import CallbackResponse, Scenario, SceneStep
+from app.services.scene_loader import SceneLoader
+
+
+def _scenario(*steps: SceneStep) -> Scenario:
+    return Scenario(id="flow", name="flow", steps=list(steps))
+
+
+def _collect(scenario: Scenario) -> list[tuple[int, CallbackResponse]]:
+    async def main():
+        results = []
+        async for item in scenario_api._run_steps(scenario, "dev", {}, True, {}):
+            results.append(item)
+        return results
+    return asyncio.run(asyncio.wait_for(main(), timeout=5))
+
+
+def test_steps_run_after_dependencies(monkeypatch):
+    order = []
+
+    async def execute(step, env, common_vars, dry_run, extracted):
+        order.append(step.id)
+        return CallbackResponse(success=True, message="ok", scene_id=step.scene)
+
+    monkeypatch.setattr(scenario_api, "_execute_step", execute)
+    results = _collect(_scenario(
+        SceneStep(id="a", scene="s", depends_on=[]),
+        SceneStep(id="b", scene="s", depends_on=["a"]),
+        SceneStep(id="c", scene="s", depends_on=["b"]),
+    ))
+    assert order == ["a", "b", "c"]
+    assert [index for index, _ in results] == [0, 1, 2]
+
+
+def test_step_exception_is_raised_not_hung(monkeypatch):
+    async def execute(step, env, common_vars, dry_run, extracted):
+        if step.id == "a":
+            raise TypeError("boom")
+        return CallbackResponse(success=True, message="ok", scene_id=step.scene)
+
+    monkeypatch.setattr(scenario_api, "_execute_step", execute)
+    with pytest.raises(TypeError, match="boom"):
+        _collect(_scenario(
+            SceneStep(id="a", scene="s", depends_on=[]),
+            SceneStep(id="b", scene="s", depends_on=["a"]),
+        ))
+
+
+def test_dependents_of_failed_step_are_skipped(monkeypatch):
+    executed = []
+
+    async def execute(step, env, common_vars, dry_run, extracted):
+        executed.append(step.id)
+        if step.id == "a":
+            raise RuntimeError("boom")
+        return CallbackResponse(success=True, message="ok", scene_id=step.scene)
+
+    async def main():
+        scenario = _scenario(
+            SceneStep(id="a", scene="s", depends_on=[]),
+            SceneStep(id="b", scene="s", depends_on=["a"]),
+            SceneStep(id="c", scene="s", depends_on=["b"]),
+        )
+        steps = scenario_api._run_steps(scenario, "dev", {}, True, {})
+        with pytest.raises(RuntimeError):
+            await steps.__anext__()
+        # 异常之后已调度的依赖步骤不应再执行
+        await asyncio.sleep(0.05)
+
+    monkeypatch.setattr(scenario_api, "_execute_step", execute)
+    asyncio.run(asyncio.wait_for(main(), timeout=5))
+    assert executed == ["a"]
+
+
+def test_stream_emits_error_event(monkeypatch):
+    async def execute(step, env, common_vars, dry_run, extracted):
+        raise RuntimeError("boom")
+
+    async def main():
+        chunks = []
+        async for chunk in scenario_api._stream_steps(
+            _scenario(SceneStep(id="a", scene="s", depends_on=[])), "dev", {}, True, "ndjson"
+        ):
+            chunks.append(chunk)
+        return chunks
+
+    monkeypatch.setattr(scenario_api, "_execute_step", execute)
+    chunks = asyncio.run(asyncio.wait_for(main(), timeout=5))
+    assert '"error"' in chunks[-1] and "boom" in chunks[-1]
+
+
+def test_non_object_body_rejected():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/scenario/full-order-flow", params={"dry_run": "true"}, json=[1, 2]
+        )
+    assert response.status_code == 400
+
+
+def _load(tmp_path, steps: str):
+    path = tmp_path / "scenes.yaml"
+    path.write_text(textwrap.dedent("""\
+        scenes:
+          ping:
+            name: ping
+            url: http://127.0.0.1:9/ping
+        scenarios:
+          retry-flow:
+            name: retry-flow
+            steps:
+        """) + textwrap.indent(textwrap.dedent(steps), "      "), encoding="utf-8")
+    loader = SceneLoader()
+    loader.load(str(path))
+    return loader
+
+
+def test_repeated_scene_without_ids_gets_unique_ids(tmp_path):
+    loader = _load(tmp_path, """\
+        - scene: ping
+        - scene: ping
+        - id: ping#2
+          scene: ping
+        - scene: ping
+        """)
+    steps = loader.get_scenario("retry-flow").steps
+    assert [step.id for step in steps] == ["ping", "ping#3", "ping#2", "ping#4"]
+    # 未声明依赖时仍按顺序执行
+    assert [step.depends_on for step in steps] == [[], ["ping"], ["ping#3"], ["ping#2"]]
+
+
+def test_duplicate_explicit_ids_rejected(tmp_path):
+    with pytest.raises(ValueError, match="步骤 ID 重复: a"):
+        _load(tmp_path, """\
+            - id: a
+              scene: ping
+            - id: a
+              scene: ping
+            """)
@@ -0,0 +1,134 @@
+"""场景索引、索引缓存与回退路径测试"""
+import asyncio
+import os
+import pickle
+import textwrap
+
+import pytest
+
+from app.services.scene_cache import SceneCache
+from app.services.scene_index import build_index, index_file
+from app.services.scene_loader import SceneConfigError, SceneLoader, SceneReloadingError
+
+SCENES = textwrap.dedent("""\
+    environments:
+      dev:
+        base_url: "http://127.0.0.1:9"
+    scenes:
+      signed:
+        name: 签名场景
+        url: "{{base_url}}/notify"
+        body: '{"a": 1}'
+        signing:
+          preset: github
+          key: "super-secret-key"
+      plain:
+        name: 普通场景
+        url: "{{base_url}}/plain"
+    """)
+
+
+@pytest.fixture
+def scenes_file(tmp_path):
+    path = tmp_path / "scenes.yaml"
+    path.write_text(SCENES, encoding="utf-8")
+    return path
+
+
+def test_cache_stores_only_index(scenes_file, tmp_path):
+    cache_dir = tmp_path / "cache"
+    loader = SceneLoader(cache_dir=str(cache_dir))
+    loader.load(str(scenes_file))
+    assert loader.save_cache() == 1
+
+    (cache_file,) = cache_dir.iterdir()
+    raw = cache_file.read_bytes()
+    assert b"super-secret-key" not in raw
+    assert b"127.0.0.1" not in raw
+    with open(cache_file, "rb") as f:
+        pickle.load(f)
+        data = pickle.load(f)
+    assert set(data) == {"sections", "env_range"}
+
+    cached = SceneLoader(cache_dir=str(cache_dir))
+    cached.load(str(scenes_file))
+    file_index = cached._index.files[str(scenes_file)]
+    assert file_index.cached
+    assert file_index.sections == index_file(str(scenes_file)).sections
+    assert cached.get_scene("signed").signing.key == "super-secret-key"
+    assert cached._config.environments["dev"]["base_url"] == "http://127.0.0.1:9"
+
+
+def test_cache_miss_after_change(scenes_file, tmp_path):
+    cache = SceneCache(str(tmp_path / "cache"))
+    assert cache.save(index_file(str(scenes_file)))
+    scenes_file.write_text(SCENES.replace("/plain", "/changed"), encoding="utf-8")
+    os.utime(scenes_file, ns=(1, 1))
+    assert cache.load(str(scenes_file)) is None
+
+
+def test_unindexable_file_falls_back_to_full_parse(tmp_path):
+    path = tmp_path / "flow.yaml"
+    path.write_text('scenes: {"a": {"name": "A", "url": "http://x/a"}}\n', encoding="utf-8")
+    file_index = index_file(str(path))
+    assert file_index.data is not None
+    assert file_index.read("scenes", "a")["url"] == "http://x/a"
+    assert not SceneCache(str(tmp_path / "cache")).save(file_index)
+
+
+def test_unchanged_files_reuse_previous_index(scenes_file):
+    first = build_index(str(scenes_file))
+    second = build_index(str(scenes_file), first)
+    assert second.files[str(scenes_file)] is first.files[str(scenes_file)]
+
+
+def test_invalid_scene_reported_as_config_error(tmp_path):
+    path = tmp_path / "scenes.yaml"
+    path.write_text("scenes:\n  bad:\n    url: [1, 2]\n", encoding="utf-8")
+    loader = SceneLoader()
+    loader.load(str(path))
+    with pytest.raises(SceneConfigError, match="场景 bad 配置错误: url"):
+        loader.get_scene("bad")
+
+
+def test_stale_index_reloads_in_background(scenes_file):
+    loader = SceneLoader()
+    loader.load(str(scenes_file))
+    scenes_file.write_text(SCENES.replace("/plain", "/plain-v2"), encoding="utf-8")
+
+    async def main():
+        with pytest.raises(SceneReloadingError):
+            loader.get_scene("plain")
+        await loader._reload_task
+        return loader.get_scene("plain")
+
+    scene = asyncio.run(main())
+    assert scene.url.endswith("/plain-v2")
+
+
+def test_stale_index_reloads_synchronously_without_loop(scenes_file):
+    loader = SceneLoader()
+    loader.load(str(scenes_file))
+    scenes_file.write_text(SCENES.replace("/plain", "/plain-v2"), encoding="utf-8")
+    assert loader.get_scene("plain").url.endswith("/plain-v2")
+
+
+def test_list_scenes_skips_removed(scenes_file):
+    loader = SceneLoader()
+    loader.load(str(scenes_file))
+    # 未重载时 plain 的块已不存在，读取时同步重建索引后返回 None
+    scenes_file.write_text(SCENES.split("  plain:")[0], encoding="utf-8")
+    assert [scene.id for scene in loader.list_scenes()] == ["signed"]
+
+
+def test_environment_changes_reported_separately(scenes_file):
+    loader = SceneLoader()
+    loader.load(str(scenes_file))
+    scenes_file.write_text(
+        SCENES.replace('base_url: "http://127.0.0.1:9"', 'base_url: "http://127.0.0.1:10"\n  test: {}'),
+        encoding="utf-8",
+    )
+    loader.reload()
+    changes = loader.last_changes
+    assert changes["environments"] == ["dev", "test"]
+    assert "environments" not in changes["changed"]